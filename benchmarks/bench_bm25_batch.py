@@ -0,0 +1,65 @@
+"""
+Batched vs. one-at-a-time BM25.
+
+Builds an index over ``--chunks`` synthetic chunks, runs ``--queries``
+queries through ``bm25_score`` in a loop and through ``bm25_score_batch``,
+checks that both return the same rankings and reports queries/sec.
+
+    python benchmarks/bench_bm25_batch.py --chunks 20000 --queries 2000
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+
+from gridwise.store import build_inverted_index, bm25_score, bm25_score_batch, build_csr
+
+
+def make_chunks(n: int, vocab: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    # Zipf-like term frequencies, like real cell values
+    p = 1.0 / np.arange(1, vocab + 1)
+    p /= p.sum()
+    return [
+        {"id": i, "content": " ".join(rng.choice(words, size=rng.integers(20, 200), p=p))}
+        for i in range(n)
+    ], words
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=20_000)
+    ap.add_argument("--vocab", type=int, default=5_000)
+    ap.add_argument("--queries", type=int, default=2_000)
+    ap.add_argument("--topk", type=int, default=10)
+    args = ap.parse_args()
+
+    chunks, words = make_chunks(args.chunks, args.vocab)
+    index = build_inverted_index(chunks)
+    rng = np.random.default_rng(1)
+    queries = [" ".join(rng.choice(words, size=rng.integers(1, 5))) for _ in range(args.queries)]
+
+    t0 = time.perf_counter()
+    single = [bm25_score(q, chunks, index, topk=args.topk) for q in queries]
+    t_single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    build_csr(index)
+    t_csr = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batch = bm25_score_batch(queries, index, topk=args.topk, chunks=chunks)
+    t_batch = time.perf_counter() - t0
+
+    same = all(
+        [(h["id"], h["score"]) for h in a] == [(h["id"], h["score"]) for h in b]
+        for a, b in zip(single, batch)
+    )
+    print(f"chunks={args.chunks} queries={args.queries} identical={same}")
+    print(f"single: {args.queries / t_single:.0f} q/s")
+    print(f"batch:  {args.queries / t_batch:.0f} q/s (+{t_csr:.2f}s one-time CSR build)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Corpus index build and query throughput.
+
+Generates ``--files`` small synthetic sheets (``--sheets`` per file), encodes
+and chunks them, builds a ``CorpusIndex`` and runs ``--queries`` random
+queries. Reports build time, queries per second and p50/p99 latency.
+
+    python benchmarks/bench_corpus.py --files 2000 --shards 8 --queries 2000
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from gridwise.io.loaders import from_dataframe
+from gridwise.encode.vanilla import to_markdown
+from gridwise.encode.chunking import chunk_anchor_and_dict_safe
+from gridwise.corpus import CorpusIndex
+
+REGIONS = ["EMEA", "APAC", "AMER", "LATAM"]
+PRODUCTS = [f"Product {i}" for i in range(300)]
+
+
+def make_sources(files: int, sheets: int, rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    sources = []
+    for f in range(files):
+        chunks = []
+        for s in range(sheets):
+            df = pd.DataFrame({
+                "region": rng.choice(REGIONS, rows),
+                "product": rng.choice(PRODUCTS, rows),
+                "units": rng.integers(0, 500, rows),
+            })
+            text = to_markdown(from_dataframe(df, name=f"Sheet{s}"))
+            for ch in chunk_anchor_and_dict_safe(text, max_tokens=400):
+                chunks.append(ch)
+        sources.append((f"book_{f}.xlsx", chunks))
+    return sources
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--sheets", type=int, default=2)
+    ap.add_argument("--rows", type=int, default=60)
+    ap.add_argument("--shards", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--topk", type=int, default=10)
+    args = ap.parse_args()
+
+    sources = make_sources(args.files, args.sheets, args.rows)
+    t0 = time.perf_counter()
+    index = CorpusIndex.build(sources, n_shards=args.shards, max_workers=args.workers)
+    build_s = time.perf_counter() - t0
+
+    rng = np.random.default_rng(1)
+    queries = [f"{rng.choice(PRODUCTS)} {rng.choice(REGIONS)}" for _ in range(args.queries)]
+    index.search(queries[0], topk=args.topk)  # warm up the thread pool
+    lat = []
+    t0 = time.perf_counter()
+    for q in queries:
+        t = time.perf_counter()
+        index.search(q, topk=args.topk)
+        lat.append(time.perf_counter() - t)
+    total = time.perf_counter() - t0
+    index.close()
+
+    lat_ms = np.array(lat) * 1000
+    print(f"docs={len(index)} shards={args.shards} build_s={build_s:.2f}")
+    print(f"queries={len(queries)} qps={len(queries) / total:.0f} "
+          f"p50_ms={np.percentile(lat_ms, 50):.2f} p99_ms={np.percentile(lat_ms, 99):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Token savings of format-aware compaction on XLSX files.
+
+Loads each workbook with ``from_xlsx_rich`` and compares ``to_markdown`` with
+``compact_formats`` off and on (and the same for ``to_range_markdown``).
+Without arguments a report-style fixture with dates, currency, percentages
+and counts is generated first.
+
+    python benchmarks/bench_formats.py [book.xlsx ...]
+"""
+from __future__ import annotations
+import datetime as dt
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+from gridwise.io.xlsx_loader import from_xlsx_rich
+from gridwise.encode.vanilla import to_markdown
+from gridwise.encode.ranges import to_range_markdown
+from gridwise.eval.tokens import count_tokens
+
+
+def make_fixture(path: str, rows: int = 2000, seed: int = 0) -> str:
+    from openpyxl import Workbook
+
+    rnd = random.Random(seed)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sales"
+    ws.append(["Date", "Region", "Units", "Revenue", "Margin", "Shipped"])
+    start = dt.datetime(2024, 1, 1)
+    for i in range(rows):
+        ws.append([
+            start + dt.timedelta(days=i // 10),
+            rnd.choice(["EMEA", "APAC", "AMER"]),
+            rnd.randint(1, 500),
+            round(rnd.uniform(10, 5000), 2),
+            round(rnd.random(), 4),
+            start + dt.timedelta(days=i // 10 + 3, hours=rnd.randint(8, 17), minutes=rnd.choice([0, 30])),
+        ])
+    for (col, fmt) in (("A", "yyyy-mm-dd"), ("C", "#,##0"), ("D", '"$"#,##0.00'),
+                       ("E", "0.0%"), ("F", "yyyy-mm-dd h:mm")):
+        for cell in ws[col][1:]:
+            cell.number_format = fmt
+    wb.save(path)
+    return path
+
+
+def main(paths) -> None:
+    if not paths:
+        paths = [make_fixture(str(Path(tempfile.mkdtemp()) / "sales_fixture.xlsx"))]
+    print(f"{'file':<28} {'cells':>8} {'vanilla':>9} {'compact':>9} {'saved':>7} {'ranges':>9} {'r+compact':>10} {'saved':>7}")
+    for p in paths:
+        sheet = from_xlsx_rich(p)
+        t_v = count_tokens(to_markdown(sheet))
+        t_c = count_tokens(to_markdown(sheet, compact_formats=True))
+        t_r = count_tokens(to_range_markdown(sheet))
+        t_rc = count_tokens(to_range_markdown(sheet, compact_formats=True))
+        print(f"{Path(p).name:<28} {len(sheet.cells):>8} {t_v:>9} {t_c:>9} {1 - t_c / t_v:>7.1%} "
+              f"{t_r:>9} {t_rc:>10} {1 - t_rc / t_r:>7.1%}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,88 @@
+"""
+Budget planner vs. exhaustive parameter sweep.
+
+For each budget, runs ``plan_to_budget`` once, then runs ``encode()`` for every
+combination of the same levers and keeps the least lossy combination that
+fits. Reports wall time and achieved tokens for both.
+
+    python benchmarks/bench_planner.py --rows 20000 --budgets 60000,5000,800
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from gridwise.io.loaders import from_dataframe
+from gridwise.encode.vanilla import to_markdown
+from gridwise.encode.compressor import encode
+from gridwise.encode.compressor.planner import plan_to_budget
+from gridwise.eval.tokens import count_tokens
+
+# lever values, least lossy first
+DICT = [
+    {"dict_encode_all_strings": False, "dict_skip_if_shorter_than": None},
+    {"dict_encode_all_strings": True, "dict_skip_if_shorter_than": 3},
+]
+AGG = [
+    {"use_aggregation": False},
+    {"use_aggregation": True, "sample_head": 5, "sample_tail": 5, "sample_every": 50},
+    {"use_aggregation": True, "sample_head": 3, "sample_tail": 3, "sample_every": 200},
+    {"use_aggregation": True, "sample_head": 2, "sample_tail": 2, "sample_every": 1000},
+]
+COLLAPSE = [0, 50, 10, 2]
+
+
+def make_text(rows: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": rng.normal(100, 15, size=rows).round(2),
+        "region": rng.choice(["EMEA", "APAC", "AMER", "LATAM"], rows),
+        "customer": rng.choice([f"Customer {i}" for i in range(500)], rows),
+        "status": rng.choice(["Open", "Closed", "Pending"], rows),
+    })
+    return to_markdown(from_dataframe(df))
+
+
+def sweep(text: str, budget: int):
+    # evaluate every combination, then keep the least lossy one that fits
+    # (ordered by collapse level, then aggregation level, then dictionary)
+    results = []
+    for k, agg, dct in itertools.product(COLLAPSE, AGG, DICT):
+        enc = encode(text, use_anchors=True, use_inverted_index=True,
+                     k_keep_between=k, dict_min_freq=3, **{**{"use_aggregation": False}, **agg, **dct})
+        results.append((count_tokens(enc["content"]), {"k_keep_between": k, **agg, **dct}))
+    for t, settings in results:
+        if t <= budget:
+            return t, settings
+    return None, None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20_000)
+    ap.add_argument("--budgets", default="60000,5000,800")
+    args = ap.parse_args()
+
+    text = make_text(args.rows)
+    t_in = count_tokens(text)
+    print(f"rows={args.rows} chars={len(text)} tokens={t_in}")
+    print(f"{'budget':>8} {'planner_s':>10} {'planner_tok':>12} {'sweep_s':>9} {'sweep_tok':>10} {'speedup':>8}")
+    for budget in (int(b) for b in args.budgets.split(",")):
+        t0 = time.perf_counter()
+        _, meta = plan_to_budget(text, budget, use_aggregation=False,
+                                 dict_encode_all_strings=False, dict_skip_if_shorter_than=None,
+                                 tokens_in=t_in)
+        t_plan = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        sweep_tok, _ = sweep(text, budget)
+        t_sweep = time.perf_counter() - t0
+        print(f"{budget:>8} {t_plan:>10.2f} {meta['planner']['tokens']:>12} "
+              f"{t_sweep:>9.2f} {str(sweep_tok):>10} {t_sweep / t_plan:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
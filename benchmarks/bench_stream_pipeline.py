@@ -0,0 +1,59 @@
+"""
+Streaming encode: sequential pass 2 vs the reader/render/writer pipeline.
+
+Writes a synthetic CSV of ``--rows`` rows to local disk, encodes it with
+``workers=0`` (every step inline) and then with each ``--workers`` count,
+and reports wall time, rows per second and speedup. Outputs are compared
+byte for byte.
+
+    python benchmarks/bench_stream_pipeline.py --rows 500000 --workers 1,2,4
+"""
+from __future__ import annotations
+import argparse
+import filecmp
+import os
+import tempfile
+import time
+
+from gridwise.bench.synth import synth_frame
+from gridwise.streaming.csv_stream import stream_encode_csv_to_jsonl
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--shape", default="narrow")
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--batch-rows", type=int, default=2_000)
+    ap.add_argument("--dedup", action="store_true")
+    ap.add_argument("--aggregate", action="store_true")
+    ap.add_argument("--dir", default=None, help="Directory for the CSV and outputs (default: a temp dir)")
+    args = ap.parse_args()
+
+    tmp = args.dir or tempfile.mkdtemp(prefix="gridwise-stream-")
+    df = synth_frame(args.shape, args.rows * 6, seed=0)
+    csv_path = os.path.join(tmp, "input.csv")
+    df.to_csv(csv_path, index=False)
+    size_mb = os.path.getsize(csv_path) / 2**20
+    print(f"rows={len(df)} cols={df.shape[1]} csv_mb={size_mb:.1f}")
+
+    def run(workers: int) -> tuple:
+        out = os.path.join(tmp, f"out_w{workers}.jsonl")
+        t0 = time.perf_counter()
+        stream_encode_csv_to_jsonl(
+            csv_path, out, workers=workers, batch_rows=args.batch_rows,
+            dedup=args.dedup, aggregate=args.aggregate, checkpoint_interval=None,
+        )
+        return out, time.perf_counter() - t0
+
+    base_out, base_s = run(0)
+    print(f"workers=0  seconds={base_s:.2f}  rows_per_s={len(df) / base_s:,.0f}")
+    for w in [int(x) for x in args.workers.split(",")]:
+        out, s = run(w)
+        same = filecmp.cmp(base_out, out, shallow=False)
+        print(f"workers={w}  seconds={s:.2f}  rows_per_s={len(df) / s:,.0f}  "
+              f"speedup={base_s / s:.2f}x  identical={same}")
+
+
+if __name__ == "__main__":
+    main()
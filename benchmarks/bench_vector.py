@@ -0,0 +1,86 @@
+"""
+Hashing-vector index build and query latency.
+
+Encodes ``--sheets`` synthetic sheets, chunks them, builds a ``VectorIndex``
+in batches of ``--batch`` chunks and runs ``--queries`` random queries one at
+a time and as one ``search_batch`` call. Reports build time per chunk,
+single-query p50/p99 latency and batched queries per second.
+
+    python benchmarks/bench_vector.py --sheets 200 --dim 4096 --queries 500
+"""
+from __future__ import annotations
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from gridwise.io.loaders import from_dataframe
+from gridwise.encode.vanilla import to_markdown
+from gridwise.encode.chunking import chunk_anchor_and_dict_safe
+from gridwise.vector import VectorIndex
+
+REGIONS = ["EMEA", "APAC", "AMER", "LATAM"]
+PRODUCTS = [f"Product {i}" for i in range(300)]
+
+
+def make_chunks(sheets: int, rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for s in range(sheets):
+        df = pd.DataFrame({
+            "region": rng.choice(REGIONS, rows),
+            "product": rng.choice(PRODUCTS, rows),
+            "units": rng.integers(0, 500, rows),
+        })
+        text = to_markdown(from_dataframe(df, name=f"Sheet{s}"))
+        for ch in chunk_anchor_and_dict_safe(text, max_tokens=400):
+            chunks.append({**ch, "id": len(chunks)})
+    return chunks
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sheets", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=60)
+    ap.add_argument("--dim", type=int, default=4096)
+    ap.add_argument("--batch", type=int, default=1024)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--topk", type=int, default=10)
+    args = ap.parse_args()
+
+    chunks = make_chunks(args.sheets, args.rows)
+    tmp = tempfile.mkdtemp()
+    try:
+        vi = VectorIndex(str(Path(tmp) / "vectors"), dim=args.dim)
+        t0 = time.perf_counter()
+        vi.add(chunks, batch_size=args.batch)
+        build_s = time.perf_counter() - t0
+
+        vi = VectorIndex.open(vi.path)
+        rng = np.random.default_rng(1)
+        queries = [f"{rng.choice(PRODUCTS)} {rng.choice(REGIONS)}" for _ in range(args.queries)]
+        vi.search(queries[0], topk=args.topk)  # map the matrix
+        lat = []
+        for q in queries:
+            t = time.perf_counter()
+            vi.search(q, topk=args.topk)
+            lat.append(time.perf_counter() - t)
+        t0 = time.perf_counter()
+        vi.search_batch(queries, topk=args.topk)
+        batch_s = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    lat_ms = np.array(lat) * 1000
+    print(f"chunks={len(chunks)} dim={args.dim} build_s={build_s:.2f} "
+          f"build_us_per_chunk={build_s / len(chunks) * 1e6:.0f}")
+    print(f"single: p50_ms={np.percentile(lat_ms, 50):.2f} p99_ms={np.percentile(lat_ms, 99):.2f}")
+    print(f"batch: queries={len(queries)} qps={len(queries) / batch_s:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Load test for ``gridwise serve``.
+
+Opens ``--concurrency`` keep-alive connections and sends ``--requests``
+``GET /search`` requests in total, then prints QPS and client-side
+p50/p99 latency followed by the server's ``/stats``. Without ``--url`` it
+writes a synthetic chunk store, starts ``gridwise serve`` on it in a
+subprocess and stops it afterwards.
+
+    python benchmarks/load_test_serve.py --requests 5000 --concurrency 32
+    python benchmarks/load_test_serve.py --url 127.0.0.1:8765
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from gridwise.store import save_chunk_store
+
+WORDS = [f"w{i}" for i in range(3000)]
+
+
+async def request(reader, writer, host: str, path: str):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for ln in head.decode("latin-1").split("\r\n"):
+        if ln.lower().startswith("content-length:"):
+            length = int(ln.split(":", 1)[1])
+    return json.loads(await reader.readexactly(length))
+
+
+async def worker(host: str, port: int, queries, latencies) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for q in queries:
+            t0 = time.perf_counter()
+            await request(reader, writer, host, f"/search?k=10&q={quote(q)}")
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        writer.close()
+
+
+async def run(host: str, port: int, n: int, concurrency: int) -> None:
+    rng = np.random.default_rng(0)
+    queries = [" ".join(rng.choice(WORDS, size=rng.integers(1, 4))) for _ in range(n)]
+    latencies: list = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(host, port, queries[i::concurrency], latencies) for i in range(concurrency)))
+    total = time.perf_counter() - t0
+    lat = np.array(latencies) * 1000
+    print(f"requests={n} concurrency={concurrency} qps={n / total:.0f} "
+          f"p50_ms={np.percentile(lat, 50):.2f} p99_ms={np.percentile(lat, 99):.2f}")
+    reader, writer = await asyncio.open_connection(host, port)
+    print(json.dumps(await request(reader, writer, host, "/stats"), indent=2))
+    writer.close()
+
+
+async def wait_ready(host: str, port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", help="host:port of a running server (default: start one)")
+    ap.add_argument("--chunks", type=int, default=20_000, help="synthetic chunks when starting a server")
+    ap.add_argument("--port", type=int, default=8799)
+    ap.add_argument("--requests", type=int, default=5_000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    args = ap.parse_args()
+
+    proc = None
+    if args.url:
+        host, port = args.url.rsplit(":", 1)
+        port = int(port)
+    else:
+        host, port = "127.0.0.1", args.port
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "chunks.jsonl")
+        rng = np.random.default_rng(1)
+        save_chunk_store(
+            ({"id": i, "content": " ".join(rng.choice(WORDS, size=120))} for i in range(args.chunks)), path
+        )
+        proc = subprocess.Popen([sys.executable, "-m", "gridwise.cli", "serve", path, "--port", str(port)])
+    try:
+        asyncio.run(wait_ready(host, port))
+        asyncio.run(run(host, port, args.requests, args.concurrency))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
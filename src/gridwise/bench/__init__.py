@@ -0,0 +1,10 @@
+from .synth import SHAPES, synth_frame, synth_sheet
+from .suite import (
+    BENCHMARKS, PRESETS, append_history, compare, load_baseline, load_history, run_suite, save_baseline,
+)
+
+__all__ = [
+    "SHAPES", "synth_frame", "synth_sheet",
+    "BENCHMARKS", "PRESETS", "run_suite", "append_history", "load_history",
+    "save_baseline", "load_baseline", "compare",
+]
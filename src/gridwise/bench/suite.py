@@ -0,0 +1,379 @@
+from __future__ import annotations
+import json, platform, statistics, subprocess, sys, tempfile, time, tracemalloc
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from gridwise import __version__
+from gridwise.bench.synth import SHAPES, synth_frame, synth_sheet
+from gridwise.encode.best import best_encode
+from gridwise.encode.compressor import apply_aggregation, apply_anchors, apply_dedup, apply_inverted_index
+from gridwise.encode.vanilla import to_markdown
+from gridwise.eval.tokens import count_tokens
+from gridwise.io.loaders import from_csv, from_xlsx
+from gridwise.store import _tokenize, bm25_score, build_inverted_index, load_chunks_jsonl
+from gridwise.streaming.csv_stream import stream_encode_csv_to_jsonl
+
+BENCHMARKS = (
+    "load_csv", "load_xlsx", "to_markdown", "anchors", "dedup", "dictionary", "aggregation",
+    "best_encode", "stream_encode", "index_build", "bm25",
+)
+
+# sizes in cells
+PRESETS: Dict[str, List[int]] = {
+    "quick": [10_000],
+    "default": [10_000, 100_000],
+    "full": [10_000, 100_000, 1_000_000, 10_000_000],
+}
+
+# openpyxl writes and reads slowly; larger cases skip load_xlsx
+XLSX_MAX_CELLS = 200_000
+BM25_QUERIES = 200
+# absolute differences below these are never reported as regressions
+NOISE_FLOOR = {"seconds": 0.005, "peak_mb": 1.0, "tokens_out": 0}
+
+
+def _measure(fn: Callable[[], Any], repeat: int, memory: bool) -> Tuple[float, Optional[float], Any]:
+    """Median wall time over ``repeat`` runs, then (optionally) one traced run for peak memory in MB."""
+    times: List[float] = []
+    out = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return statistics.median(times), peak, out
+
+
+def _text_of(out: Any) -> Optional[str]:
+    if isinstance(out, tuple):
+        out = out[0]
+    if isinstance(out, str):
+        return out
+    text = getattr(out, "text", None)
+    return text if isinstance(text, str) else None
+
+
+def _queries(chunks: List[Dict], n: int, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed)
+    vocab = sorted({t for ch in chunks for t in _tokenize(ch["content"]) if t.isalpha() and len(t) > 2})
+    if not vocab:
+        return []
+    return [" ".join(rng.choice(vocab, size=min(3, len(vocab)), replace=False)) for _ in range(n)]
+
+
+def _case(shape: str, size: int, names: Sequence[str], repeat: int, memory: bool, seed: int,
+          workdir: Path, progress: Optional[Callable[[Dict], None]]) -> List[Dict]:
+    df = synth_frame(shape, size, seed)
+    sheet = synth_sheet(shape, size, seed)
+    n_cells = len(sheet.cells)
+    csv_path = workdir / f"{shape}_{size}.csv"
+    df.to_csv(csv_path, index=False)
+
+    results: List[Dict] = []
+    state: Dict[str, Any] = {}
+
+    def bench(name: str, fn: Callable[[], Any], **extra: Any) -> Any:
+        seconds, peak, out = _measure(fn, repeat, memory)
+        text = _text_of(out)
+        rec = {
+            "name": name,
+            "shape": shape,
+            "size": size,
+            "cells": n_cells,
+            "seconds": round(seconds, 6),
+            "cells_per_s": round(n_cells / seconds, 1) if seconds > 0 else None,
+            "peak_mb": round(peak, 3) if peak is not None else None,
+            "tokens_out": count_tokens(text) if text else None,
+            **extra,
+        }
+        results.append(rec)
+        if progress is not None:
+            progress(rec)
+        return out
+
+    def vanilla() -> str:
+        if "vanilla" not in state:
+            state["vanilla"] = to_markdown(sheet)
+        return state["vanilla"]
+
+    def anchored() -> str:
+        if "anchored" not in state:
+            state["anchored"] = apply_anchors(vanilla())[0]
+        return state["anchored"]
+
+    def dictionary() -> Tuple[str, Dict]:
+        if "dictionary" not in state:
+            state["dictionary"] = apply_inverted_index(anchored())
+        return state["dictionary"]
+
+    def encoded():
+        if "best" not in state:
+            state["best"] = best_encode(sheet, compress_min_tokens=0)
+        return state["best"]
+
+    def index() -> Dict:
+        if "index" not in state:
+            state["index"] = build_inverted_index(encoded().chunks)
+        return state["index"]
+
+    for name in names:
+        if name == "load_csv":
+            bench(name, lambda: from_csv(str(csv_path)))
+        elif name == "load_xlsx":
+            if size > XLSX_MAX_CELLS:
+                continue
+            xlsx_path = workdir / f"{shape}_{size}.xlsx"
+            df.to_excel(xlsx_path, index=False, engine="openpyxl")
+            bench(name, partial(from_xlsx, str(xlsx_path)))
+        elif name == "to_markdown":
+            state["vanilla"] = bench(name, lambda: to_markdown(sheet))
+        elif name == "anchors":
+            state["anchored"] = bench(name, lambda: apply_anchors(vanilla()))[0]
+        elif name == "dedup":
+            bench(name, lambda: apply_dedup(anchored()))
+        elif name == "dictionary":
+            state["dictionary"] = bench(name, lambda: apply_inverted_index(anchored()))
+        elif name == "aggregation":
+            bench(name, lambda: apply_aggregation(dictionary()[0]))
+        elif name == "best_encode":
+            state["best"] = bench(name, lambda: best_encode(sheet, compress_min_tokens=0))
+        elif name == "stream_encode":
+            out_path = workdir / f"{shape}_{size}.jsonl"
+
+            def stream(out_path: Path = out_path) -> str:
+                stream_encode_csv_to_jsonl(str(csv_path), str(out_path))
+                return "\n".join(ch["content"] for ch in load_chunks_jsonl(str(out_path)))
+
+            bench(name, stream)
+        elif name == "index_build":
+            chunks = encoded().chunks
+            state["index"] = bench(name, partial(build_inverted_index, chunks), chunks=len(chunks))
+        elif name == "bm25":
+            chunks = encoded().chunks
+            ix = index()
+            queries = _queries(chunks, BM25_QUERIES, seed)
+            if not queries:
+                continue
+
+            def search(queries: List[str] = queries, chunks: List[Dict] = chunks, ix: Dict = ix) -> None:
+                for q in queries:
+                    bm25_score(q, chunks, ix, topk=10)
+
+            bench(name, search, queries=len(queries), chunks=len(chunks))
+            rec = results[-1]
+            rec["qps"] = round(len(queries) / rec["seconds"], 1) if rec["seconds"] > 0 else None
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if out.returncode != 0:
+        return None
+    return out.stdout.strip() or None
+
+
+def _tokenizer() -> str:
+    try:
+        import tiktoken  # noqa: F401
+        return "tiktoken"
+    except Exception:
+        return "chars/4"
+
+
+def run_suite(
+    shapes: Optional[Iterable[str]] = None,
+    sizes: Optional[Iterable[int]] = None,
+    benchmarks: Optional[Iterable[str]] = None,
+    *,
+    repeat: int = 1,
+    memory: bool = True,
+    seed: int = 0,
+    progress: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """
+    Run the benchmark suite over every ``shape x size`` case.
+
+    Each case generates a synthetic sheet (``synth_sheet``) and writes it as
+    CSV (and XLSX up to ``XLSX_MAX_CELLS``) to a temporary directory, then
+    times each benchmark in ``BENCHMARKS`` order. Stages reuse the output of
+    the stage before them, e.g. ``aggregation`` runs on the ``dictionary``
+    output. Timings are the median of ``repeat`` runs; with ``memory=True``
+    one extra run under ``tracemalloc`` gives the peak allocation.
+    ``progress`` is called with each result as it is produced.
+
+    Returns
+    -------
+    dict
+        A run record: ``timestamp``, ``commit``, environment fields and
+        ``results``, a list of ``{"name", "shape", "size", "cells",
+        "seconds", "cells_per_s", "peak_mb", "tokens_out", ...}`` dicts.
+        Append it to a history file with ``append_history``.
+    """
+    shapes = list(shapes or SHAPES)
+    sizes = list(sizes or PRESETS["default"])
+    names = list(benchmarks or BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS] + [s for s in shapes if s not in SHAPES]
+    if unknown:
+        raise ValueError(f"unknown benchmark or shape: {', '.join(unknown)}")
+    run: Dict = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "gridwise": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "tokenizer": _tokenizer(),
+        "repeat": repeat,
+        "seed": seed,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="gridwise-bench-") as tmp:
+        for shape in shapes:
+            for size in sizes:
+                run["results"].extend(_case(shape, size, names, repeat, memory, seed, Path(tmp), progress))
+    return run
+
+
+def load_history(path: str) -> List[Dict]:
+    p = Path(path)
+    if not p.exists():
+        return []
+    return json.loads(p.read_text(encoding="utf-8")).get("runs", [])
+
+
+def append_history(run: Dict, path: str) -> None:
+    """Append ``run`` to the JSON history at ``path`` (``{"runs": [...]}``), written atomically."""
+    runs = load_history(path)
+    runs.append(run)
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(json.dumps({"runs": runs}, indent=1), encoding="utf-8")
+    tmp.replace(p)
+
+
+def save_baseline(run: Dict, path: str) -> None:
+    Path(path).write_text(json.dumps(run, indent=1), encoding="utf-8")
+
+
+def load_baseline(path: str) -> Dict:
+    """A baseline file holds one run; a history file yields its latest run."""
+    obj = json.loads(Path(path).read_text(encoding="utf-8"))
+    if "runs" in obj:
+        if not obj["runs"]:
+            raise ValueError(f"{path} has no runs")
+        return obj["runs"][-1]
+    return obj
+
+
+def compare(run: Dict, baseline: Dict, threshold: float = 0.2) -> List[Dict]:
+    """
+    Compare ``run`` with ``baseline`` case by case (matched on name, shape
+    and size). Reports ``seconds``, ``peak_mb`` and ``tokens_out``; a metric
+    counts as a regression when it grew by more than ``threshold`` (a
+    fraction), except ``tokens_out``, where any growth does. Differences
+    below ``NOISE_FLOOR`` (5 ms, 1 MB) never count, so tiny cases do not
+    flag on timer and allocator jitter.
+    """
+    base = {(r["name"], r["shape"], r["size"]): r for r in baseline.get("results", [])}
+    out: List[Dict] = []
+    for r in run.get("results", []):
+        b = base.get((r["name"], r["shape"], r["size"]))
+        if b is None:
+            continue
+        for metric in ("seconds", "peak_mb", "tokens_out"):
+            cur, old = r.get(metric), b.get(metric)
+            if cur is None or old is None or old <= 0:
+                continue
+            ratio = cur / old
+            limit = 1.0 if metric == "tokens_out" else 1.0 + threshold
+            regression = ratio > limit and cur - old > NOISE_FLOOR[metric]
+            out.append({
+                "name": r["name"], "shape": r["shape"], "size": r["size"], "metric": metric,
+                "baseline": old, "current": cur, "ratio": round(ratio, 3), "regression": regression,
+            })
+    return out
+
+
+def _table(rows: List[List[str]]) -> str:
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+    lines = ["  ".join(c.ljust(w) if i < 3 else c.rjust(w) for i, (c, w) in enumerate(zip(r, widths))).rstrip()
+             for r in rows]
+    lines.insert(1, "-" * len(lines[0]))
+    return "\n".join(lines)
+
+
+def format_results(run: Dict) -> str:
+    rows = [["benchmark", "shape", "size", "cells", "seconds", "cells/s", "peak MB", "tokens"]]
+    for r in run["results"]:
+        rows.append([
+            r["name"], r["shape"], str(r["size"]), str(r["cells"]), f"{r['seconds']:.4f}",
+            f"{r['cells_per_s']:.0f}" if r["cells_per_s"] else "",
+            f"{r['peak_mb']:.1f}" if r["peak_mb"] is not None else "",
+            str(r["tokens_out"]) if r["tokens_out"] is not None else "",
+        ])
+    return _table(rows)
+
+
+def format_comparison(rows: List[Dict], only_regressions: bool = False) -> str:
+    table = [["benchmark", "shape", "size", "metric", "baseline", "current", "ratio", ""]]
+    for c in rows:
+        if only_regressions and not c["regression"]:
+            continue
+        table.append([c["name"], c["shape"], str(c["size"]), c["metric"], f"{c['baseline']:g}",
+                      f"{c['current']:g}", f"{c['ratio']:.2f}", "REGRESSION" if c["regression"] else ""])
+    return _table(table) if len(table) > 1 else "no comparable results"
+
+
+def main(args: Any) -> int:
+    """Entry point for ``gridwise bench``; returns the process exit code."""
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else PRESETS[args.preset]
+    shapes = args.shapes.split(",") if args.shapes else None
+    names = args.only.split(",") if args.only else None
+
+    def progress(rec: Dict) -> None:
+        print(f"  {rec['shape']:<15} {rec['size']:>9} {rec['name']:<14} {rec['seconds']:.4f}s",
+              file=sys.stderr, flush=True)
+
+    # read before this run is written, since the baseline may be the history file
+    baseline = None
+    if args.baseline:
+        if Path(args.baseline).exists():
+            baseline = load_baseline(args.baseline)
+        else:
+            print(f"No baseline at {args.baseline} yet; nothing to compare", file=sys.stderr)
+
+    run = run_suite(shapes, sizes, names, repeat=args.repeat, memory=not args.no_memory,
+                    seed=args.seed, progress=progress)
+    print(format_results(run))
+    if args.history:
+        append_history(run, args.history)
+        print(f"Appended run → {args.history}")
+    if args.save_baseline:
+        save_baseline(run, args.save_baseline)
+        print(f"Saved baseline → {args.save_baseline}")
+    if baseline is not None:
+        rows = compare(run, baseline, threshold=args.threshold)
+        print(format_comparison(rows))
+        if args.fail_on_regression and any(c["regression"] for c in rows):
+            return 1
+    return 0
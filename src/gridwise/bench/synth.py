@@ -0,0 +1,140 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from gridwise.core.model import Cell, Sheet
+from gridwise.core.dtypes import infer_column
+from gridwise.core.utils import idx_to_addr
+from gridwise.io.loaders import from_dataframe
+
+_REGIONS = ["EMEA", "APAC", "AMER", "LATAM"]
+_STATUS = ["Open", "Closed", "Pending", "Escalated", "Resolved"]
+_WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+
+
+def _dims(n_cells: int, ncols: int) -> Tuple[int, int]:
+    ncols = max(1, min(ncols, n_cells))
+    return max(1, n_cells // ncols), ncols
+
+
+def _narrow(rng: np.random.Generator, n_cells: int) -> pd.DataFrame:
+    nrows, _ = _dims(n_cells, 6)
+    return pd.DataFrame({
+        "Date": pd.date_range("2020-01-01", periods=nrows, freq="h").strftime("%Y-%m-%d %H:%M"),
+        "Region": rng.choice(_REGIONS, nrows),
+        "Status": rng.choice(_STATUS, nrows),
+        "Units": rng.integers(0, 500, nrows),
+        "Price": np.round(rng.gamma(2.0, 20.0, nrows), 2),
+        "Owner": rng.choice([f"user{i}" for i in range(40)], nrows),
+    })
+
+
+def _wide(rng: np.random.Generator, n_cells: int) -> pd.DataFrame:
+    nrows, ncols = _dims(n_cells, 200)
+    data = {}
+    for j in range(ncols):
+        if j % 4 == 0:
+            data[f"cat_{j}"] = rng.choice(_STATUS, nrows)
+        else:
+            data[f"m_{j}"] = rng.integers(0, 1000, nrows)
+    return pd.DataFrame(data)
+
+
+def _low_card_text(rng: np.random.Generator, n_cells: int) -> pd.DataFrame:
+    nrows, ncols = _dims(n_cells, 8)
+    return pd.DataFrame({f"Label{j}": rng.choice(_STATUS if j % 2 else _REGIONS, nrows) for j in range(ncols)})
+
+
+def _high_card_text(rng: np.random.Generator, n_cells: int) -> pd.DataFrame:
+    nrows, ncols = _dims(n_cells, 6)
+    words = np.array(_WORDS)
+    data = {}
+    for j in range(ncols):
+        a = words[rng.integers(0, len(words), nrows)]
+        b = words[rng.integers(0, len(words), nrows)]
+        n = rng.integers(0, 10**6, nrows)
+        data[f"Text{j}"] = [f"{x} {y} #{k}" for x, y, k in zip(a, b, n)]
+    return pd.DataFrame(data)
+
+
+def _numeric(rng: np.random.Generator, n_cells: int) -> pd.DataFrame:
+    nrows, ncols = _dims(n_cells, 12)
+    data = {}
+    for j in range(ncols):
+        if j % 3 == 0:
+            data[f"n{j}"] = rng.integers(-1000, 1000, nrows)
+        else:
+            data[f"x{j}"] = np.round(rng.normal(100.0, 25.0, nrows), 3)
+    return pd.DataFrame(data)
+
+
+def _sparse(rng: np.random.Generator, n_cells: int) -> pd.DataFrame:
+    nrows, ncols = _dims(n_cells, 20)
+    df = pd.DataFrame({f"c{j}": rng.integers(0, 100, nrows).astype(float) for j in range(ncols)})
+    return df.mask(rng.random(df.shape) < 0.9)
+
+
+def _merged_report(rng: np.random.Generator, n_cells: int) -> pd.DataFrame:
+    nrows, ncols = _dims(n_cells, 9)
+    data = {"Region": rng.choice(_REGIONS, nrows)}
+    for j in range(1, ncols):
+        data[f"Q{(j - 1) // 2 + 1} {'Plan' if j % 2 else 'Actual'}"] = rng.integers(0, 10_000, nrows)
+    return pd.DataFrame(data)
+
+
+# shape name -> frame generator(rng, n_cells); every frame has about n_cells cells
+SHAPES: Dict[str, Callable[[np.random.Generator, int], pd.DataFrame]] = {
+    "narrow": _narrow,
+    "wide": _wide,
+    "low_card_text": _low_card_text,
+    "high_card_text": _high_card_text,
+    "numeric": _numeric,
+    "sparse": _sparse,
+    "merged_report": _merged_report,
+}
+
+
+def _seed(shape: str, n_cells: int, seed: int) -> np.random.Generator:
+    # independent of PYTHONHASHSEED and of which other shapes are generated
+    key = sum((i + 1) * ord(ch) for i, ch in enumerate(shape))
+    return np.random.default_rng([seed, key, n_cells])
+
+
+def synth_frame(shape: str, n_cells: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Deterministic synthetic table of about ``n_cells`` cells in one of the
+    ``SHAPES``; the same ``(shape, n_cells, seed)`` always gives the same frame.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"unknown shape {shape!r}; expected one of {sorted(SHAPES)}")
+    return SHAPES[shape](_seed(shape, n_cells, seed), n_cells)
+
+
+def _report_sheet(df: pd.DataFrame, name: str) -> Sheet:
+    """Lay ``df`` out as a report: merged title row, merged quarter groups, then the table."""
+    ncols = df.shape[1]
+    cells: List[Cell] = [Cell(0, 0, "A1", f"{name} - quarterly report", "text", "header")]
+    merged = [(0, 0, 0, ncols - 1)] if ncols > 1 else []
+    for j in range(1, ncols, 2):
+        cells.append(Cell(1, j, idx_to_addr(1, j), f"Q{(j - 1) // 2 + 1}", "text", "header"))
+        if j + 1 < ncols:
+            merged.append((1, j, 1, j + 1))
+    for j, col in enumerate(df.columns):
+        cells.append(Cell(2, j, idx_to_addr(2, j), str(col), "text", "header"))
+    values = df.to_numpy(dtype=object)
+    labels = [infer_column(df.iloc[:, j]) for j in range(ncols)]
+    for i in range(values.shape[0]):
+        for j in range(ncols):
+            cells.append(Cell(i + 3, j, idx_to_addr(i + 3, j), values[i, j], labels[j][i]))
+    return Sheet(name=name, nrows=values.shape[0] + 3, ncols=ncols, cells=cells, merged_regions=merged or None)
+
+
+def synth_sheet(shape: str, n_cells: int, seed: int = 0) -> Sheet:
+    """``synth_frame`` as a ``Sheet``; ``merged_report`` gets merged title and group header rows."""
+    df = synth_frame(shape, n_cells, seed)
+    name = f"{shape}_{n_cells}"
+    if shape == "merged_report":
+        return _report_sheet(df, name)
+    return from_dataframe(df, name=name)
@@ -1,11 +1,11 @@
 from __future__ import annotations
-import argparse, sys
+import argparse, sys, time
 from pathlib import Path
 
-from gridwise.io.loaders import from_csv, from_xlsx
-from gridwise.encode.best import best_encode
-from gridwise.store import save_chunks_jsonl, save_to_txt
-from gridwise.streaming.csv_stream import stream_encode_csv_to_jsonl
+from gridwise import profiling
+
+# subcommands import what they need when they run, so `--help` and short
+# invocations do not pay for pandas/openpyxl/numpy
 
 
 def cmd_encode(args):
@@ -13,17 +13,30 @@ def cmd_encode(args):
     if not path.exists():
         print(f"File not found: {path}", file=sys.stderr); sys.exit(1)
 
+    from gridwise.core.dtypes import DATE_FORMATS, TypeInference
+    types = TypeInference(
+        date_formats=tuple(args.date_format) if args.date_format else DATE_FORMATS,
+        max_date_len=args.max_date_len,
+    )
     if path.suffix.lower() == ".csv":
-        sheet = from_csv(str(path))
+        from gridwise.io.loaders import from_csv
+        sheet = from_csv(str(path), types=types)
     elif path.suffix.lower() in (".xlsx", ".xls"):
-        sheet = from_xlsx(str(path), sheet_name=args.sheet)
+        if args.rich:
+            from gridwise.io.xlsx_loader import from_xlsx_rich
+            sheet = from_xlsx_rich(str(path), sheet_name=args.sheet, types=types, sparse=args.sparse)
+        else:
+            from gridwise.io.loaders import from_xlsx
+            sheet = from_xlsx(str(path), sheet_name=args.sheet, types=types)
     else:
         print("Only .csv and .xlsx are supported", file=sys.stderr); sys.exit(2)
+    if args.sparse:
+        sheet = sheet.to_sparse()
+    from gridwise.store import save_chunks_jsonl, save_to_txt
 
     skip = None if args.dict_skip_if_shorter_than == 0 else args.dict_skip_if_shorter_than
 
-    res = best_encode(
-        sheet,
+    kwargs = dict(
         include_format=True,
         compress_min_tokens=args.compress_min_tokens,
         max_tokens_per_chunk=args.max_tokens,
@@ -33,7 +46,19 @@ def cmd_encode(args):
         output_mode=args.mode,  
         dict_encode_all_strings=not args.no_dict_encode_all,  
         dict_skip_if_shorter_than=skip,
+        budget_tokens=args.budget_tokens,
+        use_structural_anchors=args.skeleton,
+        skeleton_k=args.skeleton_k,
+        merge_ranges=args.merge_ranges,
+        compact_formats=args.compact_formats,
+        use_dedup=args.dedup,
     )
+    if args.tables:
+        from gridwise.encode.tables import encode_tables
+        res = encode_tables(sheet, max_workers=args.workers, **kwargs)
+    else:
+        from gridwise.encode.best import best_encode
+        res = best_encode(sheet, **kwargs)
 
     if args.text:
         save_to_txt(args.text, res.text)
@@ -44,6 +69,69 @@ def cmd_encode(args):
     save_chunks_jsonl(res.chunks, out_jsonl)
     print(f"Saved {len(res.chunks)} chunks → {out_jsonl}")
 
+def _fmt_eta(seconds):
+    if seconds is None:
+        return "--:--:--"
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+def _progress_printer():
+    last = [0.0]
+
+    def show(ev):
+        now = time.monotonic()
+        if now - last[0] < 0.5 and ev["fraction"] < 1.0:
+            return
+        last[0] = now
+        print(f"\rpass {ev['pass']}/2 {100 * ev['fraction']:5.1f}%  {ev['rows']:,} rows  "
+              f"{ev['rows_per_s']:,.0f} rows/s  ETA {_fmt_eta(ev['eta_s'])}",
+              end="\n" if ev["fraction"] >= 1.0 else "", file=sys.stderr, flush=True)
+
+    return show
+
+def cmd_stream_encode(args):
+    path = Path(args.path)
+    if not path.exists():
+        print(f"File not found: {path}", file=sys.stderr); sys.exit(1)
+    from gridwise.streaming.csv_stream import stream_encode_csv_to_jsonl
+    out_jsonl = args.store or (str(path.with_suffix("")) + ".gridwise.jsonl")
+    if args.chunksize is not None:
+        print("--chunksize is deprecated; use --block-mb", file=sys.stderr)
+    out, index = stream_encode_csv_to_jsonl(
+        str(path),
+        out_jsonl,
+        usecols=args.usecols.split(",") if args.usecols else None,
+        where=args.where,
+        block_bytes=int(args.block_mb * (1 << 20)),
+        max_tokens_per_chunk=args.max_tokens,
+        overlap_tokens=args.overlap,
+        build_dictionary=not args.no_dictionary,
+        sheet_name=args.sheet,
+        output_mode=args.mode,
+        aggregate=args.aggregate,
+        sample_every=args.sample_every,
+        dedup=args.dedup,
+        checkpoint_interval=None if args.checkpoint_interval <= 0 else args.checkpoint_interval,
+        resume=args.resume,
+        progress=None if args.no_progress else _progress_printer(),
+        incremental=args.incremental,
+        index_path=args.index,
+        chunksize=args.chunksize,
+    )
+    print(f"Saved chunks → {out}")
+    if index:
+        print(f"Saved index → {index}")
+
+def cmd_serve(args):
+    from gridwise.serve import run
+    run(args.chunks, index_path=args.index, host=args.host, port=args.port,
+        reload_interval=args.reload_interval)
+
+def cmd_bench(args):
+    from gridwise.bench.suite import main as bench_main
+    sys.exit(bench_main(args))
+
 def main():
     p = argparse.ArgumentParser(prog="gridwise", description="GridWise CLI")
     sub = p.add_subparsers(dest="cmd", required=True)
@@ -54,7 +142,15 @@ def main():
     )
     enc.add_argument("path", help="Path to .csv or .xlsx")
     enc.add_argument("--sheet", help="Worksheet name (for .xlsx)")
+    enc.add_argument("--rich", action="store_true",
+                     help="Load .xlsx with openpyxl (number formats, merged regions, frozen panes)")
     enc.add_argument("--text", help="Also save raw encoded text to this file")
+    enc.add_argument("--sparse", action="store_true",
+                     help="Keep only non-empty cells, cut the sheet to its data and skip blank rows")
+    enc.add_argument("--date-format", action="append",
+                     help="strptime format (or ISO8601) that marks a string cell as a date; repeatable "
+                          "(default: ISO 8601 and common US/European forms)")
+    enc.add_argument("--max-date-len", type=int, default=25, help="Longer strings are never typed as dates")
     enc.add_argument("--store", help="Output JSONL path (default: <file>.gridwise.jsonl)")
     enc.add_argument("--max-tokens", type=int, default=4000)
     enc.add_argument("--overlap", type=int, default=200)
@@ -68,6 +164,22 @@ def main():
                     help="Disable encoding all quoted strings (fallback to min-freq)")
     enc.add_argument("--dict-skip-if-shorter-than", type=int, default=0,
                  help="Skip strings shorter than N chars (0 = encode all)")
+    enc.add_argument("--budget-tokens", type=int, default=None,
+                     help="Escalate compression until the whole encoded text fits N tokens")
+    enc.add_argument("--skeleton", action="store_true",
+                     help="Compress from the structural-anchor skeleton (drops homogeneous regions)")
+    enc.add_argument("--skeleton-k", type=int, default=4)
+    enc.add_argument("--merge-ranges", action="store_true",
+                     help="Write runs of equal cells as ranges (B2:B400='Yes') and omit empty cells")
+    enc.add_argument("--compact-formats", action="store_true",
+                     help="ISO dates and per-range [META] fmt declarations instead of per-cell ::fmt")
+    enc.add_argument("--tables", action="store_true",
+                     help="Detect independent tables and encode each with its own header and dictionary")
+    enc.add_argument("--workers", type=int, default=None, help="Worker processes for --tables")
+    enc.add_argument("--dedup", action="store_true",
+                     help="Replace repeated rows/blocks with [REPEAT of row N x K] back-references")
+    enc.add_argument("--profile", choices=["table", "json"], default=None,
+                     help="Print per-stage timings and counters to stderr")
 
 
     enc.set_defaults(func=cmd_encode)
@@ -81,15 +193,71 @@ def main():
     se.add_argument("--store", help="Output JSONL path (default: <file>.gridwise.jsonl)")
     se.add_argument("--sheet", help="Sheet name for metadata/title")
     se.add_argument("--usecols", help="Comma-separated columns to include (e.g., Date,Region,Sales)")
-    se.add_argument("--chunksize", type=int, default=100_000)
+    se.add_argument("--where", action="append",
+                    help="Row filter in pandas query syntax, e.g. \"Region == 'EMEA' and Date >= '2024'\" "
+                         "(repeatable; all must hold). Rows keep their original numbers")
+    se.add_argument("--block-mb", type=float, default=16.0, help="CSV read block size in MiB")
+    se.add_argument("--chunksize", type=int, default=None,
+                    help="Deprecated: rows per read block, converted to a block size; use --block-mb")
     se.add_argument("--max-tokens", type=int, default=4_000)
     se.add_argument("--overlap", type=int, default=200)
     se.add_argument("--no-dictionary", action="store_true")
     se.add_argument("--min-freq", type=int, default=3)
     se.add_argument("--mode", choices=["compressed", "expanded"], default="compressed")
+    se.add_argument("--aggregate", action="store_true",
+                    help="Sample rows and append online [AGG] stats (bounded memory)")
+    se.add_argument("--sample-every", type=int, default=50)
+    se.add_argument("--dedup", action="store_true",
+                    help="Replace repeated rows/blocks with [REPEAT of row N x K] back-references")
+    se.add_argument("--resume", action="store_true",
+                    help="Continue from the checkpoint next to the output (<store>.ckpt) if there is one")
+    se.add_argument("--checkpoint-interval", type=float, default=60.0,
+                    help="Seconds between pass-2 checkpoints (0 disables checkpointing)")
+    se.add_argument("--incremental", action="store_true",
+                    help="Encode only rows appended since the last --incremental run (state in <store>.state)")
+    se.add_argument("--index", help="Also keep a BM25 index of the chunks here (updated incrementally)")
+    se.add_argument("--no-progress", action="store_true", help="Do not print rows/s and ETA to stderr")
+    se.add_argument("--profile", choices=["table", "json"], default=None,
+                    help="Print per-stage timings and counters to stderr")
+    se.set_defaults(func=cmd_stream_encode)
+
+    # serve
+    sv = sub.add_parser("serve", help="Serve BM25 search over a chunk store on localhost (HTTP/JSON)")
+    sv.add_argument("chunks", help="Chunk JSONL or chunk store (save_chunk_store) path")
+    sv.add_argument("--index", help="BM25 index written by save_index (its .csr arrays are memory-mapped); "
+                                    "built from the chunks if omitted")
+    sv.add_argument("--host", default="127.0.0.1")
+    sv.add_argument("--port", type=int, default=8765)
+    sv.add_argument("--reload-interval", type=float, default=2.0,
+                    help="Seconds between checks for rebuilt files")
+    sv.set_defaults(func=cmd_serve)
+
+    # bench
+    bn = sub.add_parser("bench", help="Run the synthetic benchmark suite and record the results")
+    bn.add_argument("--preset", choices=["quick", "default", "full"], default="default",
+                    help="Sheet sizes: quick=10k, default=10k,100k, full=10k..10M cells")
+    bn.add_argument("--sizes", help="Comma-separated sizes in cells (overrides --preset)")
+    bn.add_argument("--shapes", help="Comma-separated shapes (default: all)")
+    bn.add_argument("--only", help="Comma-separated benchmarks to run (default: all)")
+    bn.add_argument("--repeat", type=int, default=1, help="Timed runs per benchmark (median is kept)")
+    bn.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory run")
+    bn.add_argument("--seed", type=int, default=0)
+    bn.add_argument("--history", default="gridwise-bench.json",
+                    help="JSON history file the run is appended to ('' to skip)")
+    bn.add_argument("--baseline", help="Compare against this baseline (or the latest run of a history file)")
+    bn.add_argument("--save-baseline", help="Also write this run as a baseline file")
+    bn.add_argument("--threshold", type=float, default=0.2,
+                    help="Allowed slowdown / memory growth before a case counts as a regression")
+    bn.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any regression is found")
+    bn.set_defaults(func=cmd_bench)
 
     args = p.parse_args()
-    args.func(args)
+    if getattr(args, "profile", None):
+        with profiling.profile() as prof:
+            args.func(args)
+        print(profiling.format_report(prof.report(), args.profile), file=sys.stderr)
+    else:
+        args.func(args)
 
 
 if __name__ == "__main__":
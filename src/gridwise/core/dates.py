@@ -0,0 +1,19 @@
+from __future__ import annotations
+from typing import Tuple
+
+# Date detection settings shared by the scalar check (gridwise.core.utils,
+# which must stay free of pandas) and the column check (gridwise.core.dtypes).
+
+# tried in order by pandas.to_datetime; a string is a date if any of them parses it
+DATE_FORMATS: Tuple[str, ...] = (
+    "ISO8601",
+    "%m/%d/%Y", "%d/%m/%Y", "%m/%d/%y", "%d/%m/%y", "%Y/%m/%d",
+    "%d-%b-%Y", "%d-%b-%y", "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y",
+    "%H:%M", "%H:%M:%S",
+)
+
+# longer strings are always text
+MAX_DATE_LEN = 25
+
+# a date string has a digit and a separator; anything else is not parsed at all
+DATE_CANDIDATE = r"^(?=.*\d)(?=.*[-/:., ])"
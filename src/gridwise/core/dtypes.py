@@ -0,0 +1,207 @@
+from __future__ import annotations
+import datetime as _dt
+import decimal
+import numbers
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from gridwise.core.dates import DATE_CANDIDATE, DATE_FORMATS, MAX_DATE_LEN
+
+
+@dataclass(frozen=True)
+class TypeInference:
+    """
+    Settings for column type inference.
+
+    Parameters
+    ----------
+    date_formats : tuple of str
+        Formats (``strptime`` codes, or ``"ISO8601"``) a string must match
+        to be labeled ``"date"``.
+    max_date_len : int
+        Longer strings are always ``"text"``.
+    sample_size : int
+        Columns with more distinct date-like strings than this are checked
+        on an evenly spaced sample first; if nothing in the sample parses
+        the rest is labeled ``"text"`` unparsed, otherwise it is parsed
+        with only the formats that matched the sample.
+    """
+
+    date_formats: Tuple[str, ...] = DATE_FORMATS
+    max_date_len: int = MAX_DATE_LEN
+    sample_size: int = 2_000
+
+
+DEFAULT_INFERENCE = TypeInference()
+
+
+def _date_strings(values: np.ndarray, config: TypeInference) -> np.ndarray:
+    """Boolean mask of the strings in ``values`` that parse as dates; each distinct string is checked once."""
+    codes, uniq = pd.factorize(values)
+    u = pd.Series(uniq, dtype=object)
+    cand = (u.str.len().le(config.max_date_len) & u.str.contains(DATE_CANDIDATE, regex=True)).to_numpy()
+    is_date = np.zeros(len(uniq), dtype=bool)
+    if not cand.any():
+        return is_date[codes]
+    pos = np.flatnonzero(cand)
+    formats = config.date_formats
+    if len(pos) > config.sample_size:
+        step = len(pos) / config.sample_size
+        sample = uniq[pos[(np.arange(config.sample_size) * step).astype(np.int64)]]
+        _, formats = _parse_dates(sample, formats)
+        if not formats:
+            return is_date[codes]
+    parsed, _ = _parse_dates(uniq[pos], formats)
+    is_date[pos[parsed]] = True
+    return is_date[codes]
+
+
+def _parse_dates(values: np.ndarray, formats: Tuple[str, ...]) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """Which of ``values`` parse with one of ``formats``, and the formats that parsed any."""
+    parsed = np.zeros(len(values), dtype=bool)
+    used = []
+    for fmt in formats:
+        todo = ~parsed
+        if not todo.any():
+            break
+        ok = pd.to_datetime(
+            pd.Series(values[todo], dtype=object), format=fmt, errors="coerce", utc=True
+        ).notna().to_numpy()
+        if ok.any():
+            parsed[np.flatnonzero(todo)[ok]] = True
+            used.append(fmt)
+    return parsed, tuple(used)
+
+
+def _is_object(dtype) -> bool:
+    return isinstance(dtype, np.dtype) and dtype.kind == "O"
+
+
+@lru_cache(maxsize=4096)
+def is_date_string(value: str, config: Optional[TypeInference] = None) -> bool:
+    """Whether one string is a date under ``config``; the scalar form of the string check in ``infer_column``."""
+    config = config or DEFAULT_INFERENCE
+    return bool(_date_strings(np.array([value], dtype=object), config)[0])
+
+
+def _label_strings(values: np.ndarray, config: TypeInference) -> np.ndarray:
+    labels = np.full(len(values), "text", dtype=object)
+    if len(values):
+        labels[_date_strings(values, config)] = "date"
+    return labels
+
+
+def _label_for_type(t: type) -> Optional[str]:
+    """Label shared by every value of type ``t``; None where it depends on the value (strings, floats, datetime64)."""
+    if t is type(None) or t is type(pd.NaT) or t is type(pd.NA):
+        return "empty"
+    if issubclass(t, (bool, np.bool_)):
+        return "bool"
+    if issubclass(t, (str, float, np.floating, np.datetime64)):
+        return None
+    if issubclass(t, (numbers.Real, decimal.Decimal)):
+        return "number"
+    if issubclass(t, (_dt.datetime, _dt.date, _dt.time)):
+        return "date"
+    return "text"
+
+
+def _label_objects(values: np.ndarray, config: TypeInference) -> np.ndarray:
+    """Labels for an object array, decided per Python type rather than per value."""
+    n = len(values)
+    types = list(map(type, values))
+    ids = {t: i for i, t in enumerate(dict.fromkeys(types))}
+    codes = np.fromiter(map(ids.__getitem__, types), dtype=np.int64, count=n)
+    labels = np.full(n, "text", dtype=object)
+    for t, i in ids.items():
+        mask = codes == i
+        label = _label_for_type(t)
+        if label is not None:
+            labels[mask] = label
+        elif issubclass(t, str):
+            labels[mask] = _label_strings(values[mask], config)
+        elif issubclass(t, np.datetime64):
+            labels[mask] = np.where(np.isnat(values[mask].astype("datetime64[ns]")), "empty", "date")
+        else:
+            v = values[mask].astype(np.float64)
+            labels[mask] = np.where(np.isnan(v), "empty", "number")
+    return labels
+
+
+def infer_column(values: Any, config: Optional[TypeInference] = None) -> np.ndarray:
+    """
+    Label every value of a column as ``"empty"``, ``"bool"``, ``"number"``,
+    ``"date"`` or ``"text"``, as ``infer_dtype`` would one value at a time.
+
+    Parameters
+    ----------
+    values : pandas.Series, pyarrow.Array/ChunkedArray, numpy array or list
+        The column.
+    config : TypeInference, optional
+        Date formats and sampling; ``DEFAULT_INFERENCE`` if omitted.
+
+    Returns
+    -------
+    numpy.ndarray
+        Object array of labels, one per value.
+
+    Notes
+    -----
+    Typed columns take a fast path on their dtype: bool, numeric and
+    datetime columns are labeled from the dtype and the missing-value mask,
+    and categoricals by labeling their categories once. String columns are
+    filtered with vectorized predicates (length, a digit and a separator)
+    and only the distinct candidates are parsed with ``pandas.to_datetime``
+    against ``config.date_formats``. Object columns are split by Python
+    type, so each type is classified once; NumPy scalars count as the
+    Python types they stand for.
+    """
+    config = config or DEFAULT_INFERENCE
+    if hasattr(values, "to_pandas") and not isinstance(values, pd.Series):
+        values = values.to_pandas()
+    if not isinstance(values, pd.Series):
+        # lists keep their Python values; only arrays bring a dtype to go by
+        values = pd.Series(values, dtype=None if isinstance(values, np.ndarray) else object)
+    s = values
+    dtype = s.dtype
+    n = len(s)
+    if isinstance(dtype, pd.CategoricalDtype):
+        cats = infer_column(pd.Series(s.cat.categories), config)
+        codes = s.cat.codes.to_numpy()
+        labels = cats.take(codes, mode="clip") if len(cats) else np.full(n, "empty", dtype=object)
+        labels[codes < 0] = "empty"
+        return labels
+    if pd.api.types.is_bool_dtype(dtype):
+        label = "bool"
+    elif pd.api.types.is_numeric_dtype(dtype):
+        label = "number"
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        label = "date"
+    elif pd.api.types.is_string_dtype(dtype) and not _is_object(dtype):
+        missing = s.isna().to_numpy()
+        labels = np.full(n, "empty", dtype=object)
+        labels[~missing] = _label_strings(s[~missing].to_numpy(dtype=object), config)
+        return labels
+    else:
+        return _label_objects(s.to_numpy(dtype=object), config)
+    labels = np.full(n, label, dtype=object)
+    labels[s.isna().to_numpy()] = "empty"
+    return labels
+
+
+def string_counts(values: pd.Series) -> Counter:
+    """How often each string value occurs in a column; other values are skipped."""
+    dtype = values.dtype
+    if pd.api.types.is_string_dtype(dtype) and not _is_object(dtype):
+        return Counter(values.dropna().value_counts(sort=False).to_dict())
+    if not _is_object(dtype):
+        return Counter()
+    if pd.api.types.infer_dtype(values, skipna=True) != "string":
+        arr = values.to_numpy(dtype=object)
+        values = pd.Series(arr[np.fromiter((isinstance(v, str) for v in arr), dtype=bool, count=len(arr))], dtype=object)
+    return Counter(values.dropna().value_counts(sort=False).to_dict())
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import datetime as _dt
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+# short type tags for Excel number formats
+TAGS = ("text", "date", "time", "datetime", "pct", "cur", "sci", "dec", "int", "frac")
+
+_QUOTED_RE = re.compile(r'"[^"]*"|\\.')
+_BRACKET_RE = re.compile(r"\[[^\]]*\]")
+_CURRENCY_RE = re.compile(r"[$€£¥₹]|\[\$[^\]]*\]")
+# "m" means minutes when it follows hours or precedes seconds, months otherwise;
+# AM/PM markers are time-only
+_MINUTES_RE = re.compile(r"h+\W*m+|m+\W*s+|am/pm|a/p", re.I)
+_DATE_RE = re.compile(r"[ydm]", re.I)
+_TIME_RE = re.compile(r"[hs]|am/pm|a/p", re.I)
+
+
+@lru_cache(maxsize=4096)
+def format_tag(fmt: Optional[str]) -> Optional[str]:
+    """
+    Map an Excel number format string to a short type tag.
+
+    Returns None for "General", empty formats and the ``"header"`` marker.
+
+    Examples
+    --------
+    >>> format_tag("0.00%")
+    'pct'
+    >>> format_tag('"$"#,##0.00')
+    'cur'
+    >>> format_tag("yyyy-mm-dd h:mm")
+    'datetime'
+    >>> format_tag("General") is None
+    True
+    """
+    if not fmt or fmt in ("General", "header"):
+        return None
+    if fmt == "@":
+        return "text"
+    # only the first (positive) section decides the type
+    section = fmt.split(";")[0]
+    if _CURRENCY_RE.search(section):
+        return "cur"
+    core = _BRACKET_RE.sub("", _QUOTED_RE.sub("", section))
+    has_date = bool(_DATE_RE.search(_MINUTES_RE.sub("", core)))
+    has_time = bool(_TIME_RE.search(core))
+    if has_date and has_time:
+        return "datetime"
+    if has_date:
+        return "date"
+    if has_time:
+        return "time"
+    if "%" in core:
+        return "pct"
+    if "E+" in core.upper() or "E-" in core.upper():
+        return "sci"
+    if "?/" in core or "#/" in core:
+        return "frac"
+    if "." in core:
+        return "dec"
+    if "0" in core or "#" in core:
+        return "int"
+    return None
+
+
+def compact_value(value: Any) -> str:
+    """
+    Render a cell value in its compact form.
+
+    Dates and times become ISO strings (``2024-07-15``, ``2024-07-15 09:30``,
+    ``09:30:00``) instead of ``repr`` of the Python object; NumPy scalars are
+    unwrapped first so ``np.float64(1.5)`` renders as ``1.5``. Strings keep
+    their quoted ``repr`` so dictionary encoding still finds them.
+    """
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        try:
+            value = value.item()
+        except (TypeError, ValueError):
+            pass
+    if isinstance(value, str):
+        return repr(value)
+    if isinstance(value, float) and value != value:
+        return "NaN"
+    if isinstance(value, _dt.datetime):
+        if value.hour == value.minute == value.second == value.microsecond == 0:
+            return value.date().isoformat()
+        return value.isoformat(sep=" ", timespec="minutes" if value.second == 0 else "seconds")
+    if isinstance(value, (_dt.date, _dt.time)):
+        return value.isoformat()
+    if isinstance(value, _dt.timedelta):
+        return str(value)
+    return repr(value)
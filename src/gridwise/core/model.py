@@ -1,6 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Optional, List, Tuple, Dict
 
+from gridwise.core.regions import RegionIndex
+
 @dataclass(frozen= True)
 class Cell:
     row: int
@@ -19,6 +21,86 @@ class Sheet:
     cells: List[Cell]
     merged_regions: Optional[List[Tuple[int, int, int, int]]] = None
     frozen: Optional[Tuple[int, int]] = None
+    # True when `cells` holds only non-empty cells, sorted by (row, col)
+    sparse: bool = False
+    _region_index: Optional[RegionIndex] = field(default=None, init=False, repr=False, compare=False)
+    _row_offsets: Optional[List[int]] = field(default=None, init=False, repr=False, compare=False)
+
+    def region_index(self) -> RegionIndex:
+        """Interval index over `merged_regions`, built on first use."""
+        if self._region_index is None or len(self._region_index) != len(self.merged_regions or ()):
+            self._region_index = RegionIndex(self.merged_regions or ())
+        return self._region_index
+
+    def region_at(self, row: int, col: int) -> Optional[Tuple[int, int, int, int]]:
+        """The merged region (r1, c1, r2, c2) covering (row, col), if any."""
+        if not self.merged_regions:
+            return None
+        return self.region_index().region_at(row, col)
+
+    def resolve(self, row: int, col: int) -> Tuple[int, int]:
+        """Map a coordinate covered by a merged region to the region's top-left cell."""
+        r = self.region_at(row, col)
+        return (r[0], r[1]) if r else (row, col)
+
+    def row_offsets(self) -> List[int]:
+        """
+        Row offsets into `cells` of a sparse sheet: the cells of row ``r`` are
+        ``cells[offsets[r]:offsets[r + 1]]``. Built on first use.
+        """
+        if not self.sparse:
+            raise ValueError("row_offsets() needs a sparse sheet; see Sheet.to_sparse()")
+        if self._row_offsets is None or self._row_offsets[-1] != len(self.cells):
+            offsets = [0] * (self.nrows + 1)
+            for c in self.cells:
+                offsets[c.row + 1] += 1
+            for r in range(self.nrows):
+                offsets[r + 1] += offsets[r]
+            self._row_offsets = offsets
+        return self._row_offsets
+
+    def row_cells(self, row: int) -> List[Cell]:
+        """The cells of ``row``, left to right (sparse sheets only)."""
+        offsets = self.row_offsets()
+        return self.cells[offsets[row] : offsets[row + 1]]
+
+    def bbox(self) -> Optional[Tuple[int, int, int, int]]:
+        """Bounding box (r1, c1, r2, c2) of the non-empty cells and merged regions; None if there are none."""
+        return _bbox(self.cells, self.merged_regions)
+
+    def to_sparse(self) -> "Sheet":
+        """
+        This sheet with only its non-empty cells, sorted by (row, col), and
+        ``nrows``/``ncols`` cut down to the end of the data. Addresses are
+        unchanged, so leading blank rows and columns are still counted.
+        """
+        if self.sparse:
+            return self
+        cells = sorted((c for c in self.cells if not is_blank(c)), key=lambda c: (c.row, c.col))
+        box = _bbox(cells, self.merged_regions)
+        return Sheet(
+            name=self.name,
+            nrows=box[2] + 1 if box else 0,
+            ncols=box[3] + 1 if box else 0,
+            cells=cells,
+            merged_regions=self.merged_regions,
+            frozen=self.frozen,
+            sparse=True,
+        )
+
+
+def _bbox(cells: List[Cell], merged_regions) -> Optional[Tuple[int, int, int, int]]:
+    boxes = [(c.row, c.col, c.row, c.col) for c in cells if not is_blank(c)]
+    boxes.extend(merged_regions or ())
+    if not boxes:
+        return None
+    r1, c1, r2, c2 = zip(*boxes)
+    return min(r1), min(c1), max(r2), max(c2)
+
+
+def is_blank(c: Cell) -> bool:
+    """True for cells without a value (None or an empty string), whatever their format."""
+    return c.dtype == "empty" or c.value is None or (isinstance(c.value, str) and not c.value)
     
     
 
@@ -32,10 +114,13 @@ class BestEncodeResult:
       - tokens_compressed: token count of the compressed serialization if computed; otherwise None
       - chunks: list of {"id": int, "content": str} windows suitable to send to an LLM
       - meta: optional stage metadata (e.g., anchors/dictionary/aggregation details)
+      - document: the chosen output as an EncodedDocument (lines, dictionary, code
+        usage, anchor positions), when the encoder built one
     """
     text: str
     kind: str
     tokens_vanilla: int
     tokens_compressed: Optional[int]
     chunks: List[Dict]
-    meta: Dict
\ No newline at end of file
+    meta: Dict
+    document: Optional[Any] = None
\ No newline at end of file
@@ -0,0 +1,182 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from gridwise.core.model import Sheet
+
+Region = Tuple[int, int, int, int]  # (r1, c1, r2, c2), zero-based, inclusive
+
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left = left
+        self.right = right
+
+
+class RegionIndex:
+    """
+    Point lookup over non-overlapping rectangular regions (e.g. merged cells).
+
+    A static centered interval tree on the regions' row spans answers "which
+    region covers (row, col)?" in O(log n + k), where k is the number of
+    regions spanning that row.
+    """
+
+    def __init__(self, regions: Iterable[Region]) -> None:
+        self.regions: List[Region] = list(regions)
+        self._root = self._build(self.regions)
+
+    def _build(self, regs: List[Region]) -> Optional[_Node]:
+        if not regs:
+            return None
+        points = sorted(p for r in regs for p in (r[0], r[2]))
+        center = points[len(points) // 2]
+        left = [r for r in regs if r[2] < center]
+        right = [r for r in regs if r[0] > center]
+        here = [r for r in regs if r[0] <= center <= r[2]]
+        return _Node(
+            center,
+            sorted(here, key=lambda r: r[0]),
+            sorted(here, key=lambda r: -r[2]),
+            self._build(left),
+            self._build(right),
+        )
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def region_at(self, row: int, col: int) -> Optional[Region]:
+        node = self._root
+        while node is not None:
+            if row < node.center:
+                for r in node.by_start:
+                    if r[0] > row:
+                        break
+                    if r[1] <= col <= r[3]:
+                        return r
+                node = node.left
+            elif row > node.center:
+                for r in node.by_end:
+                    if r[2] < row:
+                        break
+                    if r[1] <= col <= r[3]:
+                        return r
+                node = node.right
+            else:
+                for r in node.by_start:
+                    if r[1] <= col <= r[3]:
+                        return r
+                return None
+        return None
+
+    def is_covered(self, row: int, col: int) -> bool:
+        """True if (row, col) lies inside a region but is not its top-left cell."""
+        r = self.region_at(row, col)
+        return r is not None and (r[0], r[1]) != (row, col)
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _row_runs(cols: List[int]) -> List[Tuple[int, int]]:
+    runs: List[Tuple[int, int]] = []
+    for c in cols:
+        if runs and c == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], c)
+        else:
+            runs.append((c, c))
+    return runs
+
+
+def _merge_overlapping(boxes: List[List[int]]) -> List[List[int]]:
+    # bounding boxes of different components can still overlap (e.g. an L-shaped
+    # table wrapping a smaller one); merge until stable
+    changed = True
+    while changed:
+        changed = False
+        boxes.sort()
+        out: List[List[int]] = []
+        for b in boxes:
+            for o in out:
+                if b[0] <= o[2] and o[0] <= b[2] and b[1] <= o[3] and o[1] <= b[3]:
+                    o[0], o[1] = min(o[0], b[0]), min(o[1], b[1])
+                    o[2], o[3] = max(o[2], b[2]), max(o[3], b[3])
+                    o[4] += b[4]
+                    changed = True
+                    break
+            else:
+                out.append(b)
+        boxes = out
+    return boxes
+
+
+def detect_table_regions(sheet: Sheet, min_cells: int = 1) -> List[Region]:
+    """
+    Find independent tables: connected components of non-empty cells
+    (``is_blank`` is False, as for blank-row skipping and sparse sheets).
+
+    Non-empty cells are grouped into horizontal runs per row; runs in adjacent
+    rows that touch (including diagonally) are joined with union-find, so the
+    cost is linear in the number of runs rather than the grid size. Merged
+    regions count as filled. Components whose bounding boxes overlap are
+    merged, and components with fewer than ``min_cells`` cells are dropped.
+
+    Returns the bounding boxes ``(r1, c1, r2, c2)`` in reading order
+    (top-to-bottom, then left-to-right).
+    """
+    from gridwise.core.model import is_blank  # model imports this module
+
+    filled: Dict[int, set] = {}
+    for c in sheet.cells:
+        if not is_blank(c):
+            filled.setdefault(c.row, set()).add(c.col)
+    for r1, c1, r2, c2 in sheet.merged_regions or ():
+        for r in range(r1, r2 + 1):
+            filled.setdefault(r, set()).update(range(c1, c2 + 1))
+
+    runs: List[Tuple[int, int, int]] = []  # (row, start col, end col)
+    parent: List[int] = []
+    prev: List[int] = []  # run ids of the previous non-empty row
+    prev_row = -2
+    for r in sorted(filled):
+        cur: List[int] = []
+        above = prev if r == prev_row + 1 else []
+        k = 0
+        for a, b in _row_runs(sorted(filled[r])):
+            rid = len(runs)
+            runs.append((r, a, b))
+            parent.append(rid)
+            cur.append(rid)
+            # runs above are sorted by column: skip those ending left of us
+            while k < len(above) and runs[above[k]][2] < a - 1:
+                k += 1
+            j = k
+            while j < len(above) and runs[above[j]][1] <= b + 1:
+                ra, rb = _find(parent, above[j]), _find(parent, rid)
+                if ra != rb:
+                    parent[rb] = ra
+                j += 1
+        prev, prev_row = cur, r
+
+    comps: Dict[int, List[int]] = {}
+    for rid, (r, a, b) in enumerate(runs):
+        root = _find(parent, rid)
+        box = comps.get(root)
+        if box is None:
+            comps[root] = [r, a, r, b, b - a + 1]
+        else:
+            box[0], box[1] = min(box[0], r), min(box[1], a)
+            box[2], box[3] = max(box[2], r), max(box[3], b)
+            box[4] += b - a + 1
+
+    boxes = _merge_overlapping(list(comps.values()))
+    return sorted((b[0], b[1], b[2], b[3]) for b in boxes if b[4] >= min_cells)
@@ -1,4 +1,12 @@
-import math
+from __future__ import annotations
+import datetime as _dt
+import decimal
+import numbers
+import re
+
+from gridwise.core.dates import DATE_CANDIDATE, MAX_DATE_LEN
+
+_DATE_CANDIDATE_RE = re.compile(DATE_CANDIDATE)
 
 def idx_to_addr(row: int, col: int) -> str:
     
@@ -33,6 +41,24 @@ def idx_to_addr(row: int, col: int) -> str:
         return res
     return f"{col_to_name(col)}{row+1}"
 
+def addr_to_idx(addr: str) -> tuple[int, int]:
+    """
+    Inverse of ``idx_to_addr``: convert "A1"-style addresses to zero-based (row, col).
+
+    Examples
+    --------
+    >>> addr_to_idx("A1")
+    (0, 0)
+    >>> addr_to_idx("AB5")
+    (4, 27)
+    """
+    i = 0
+    col = 0
+    while i < len(addr) and addr[i].isalpha():
+        col = col * 26 + (ord(addr[i]) - 64)
+        i += 1
+    return int(addr[i:]) - 1, col - 1
+
 def infer_dtype(value) -> str:
     """
     Infer a coarse data type label for a spreadsheet cell value.
@@ -46,17 +72,20 @@ def infer_dtype(value) -> str:
     -------
     str
         One of:
-        - "empty" : None or NaN
+        - "empty" : None, NaN or NaT
         - "bool"  : Boolean values
-        - "number": Integers or floats
-        - "date"  : Strings containing digits and date-like symbols
-        - "text"  : All other strings
+        - "number": Integers, floats and decimals (NumPy scalars included)
+        - "date"  : Dates, datetimes and times, and strings that parse as one
+        - "text"  : All other values
 
     Notes
     -----
-    - Strings are labeled as "date" if they contain both digits and 
-      characters like '-', '/', ':' and are reasonably short (<= 25 chars).
-    - Longer strings with such characters are treated as free text.
+    - Strings are labeled as "date" only if they parse with one of
+      ``gridwise.core.dates.DATE_FORMATS`` and are reasonably short
+      (``MAX_DATE_LEN``, 25 chars).
+    - This classifies one value without pandas (only date-like strings are
+      parsed, and those results are cached); to label a whole column use
+      ``gridwise.core.dtypes.infer_column``, which gives the same labels.
 
     Examples
     --------
@@ -68,16 +97,28 @@ def infer_dtype(value) -> str:
     'bool'
     >>> infer_dtype("2024-07-15")
     'date'
+    >>> infer_dtype("A-12")
+    'text'
     >>> infer_dtype("Meeting notes: July 15, 2024")
     'text'
     """
-    
-    if value is None or (isinstance(value, float) and math.isnan(value)):
+    # scalar fast path: no pandas unless a string looks like a date
+    if value is None:
         return "empty"
-    if isinstance(value, bool):
+    if isinstance(value, str):
+        if len(value) > MAX_DATE_LEN or not _DATE_CANDIDATE_RE.match(value):
+            return "text"
+        from gridwise.core.dtypes import is_date_string
+        return "date" if is_date_string(value) else "text"
+    kind = getattr(getattr(value, "dtype", None), "kind", None)
+    if isinstance(value, bool) or kind == "b":
         return "bool"
-    if isinstance(value, (int, float)):
+    if type(value).__name__ in ("NAType", "NaTType"):
+        return "empty"
+    if isinstance(value, numbers.Real):
+        return "empty" if value != value else "number"
+    if isinstance(value, decimal.Decimal):
         return "number"
-    if isinstance(value, str) and any(ch in value for ch in ("-", "/", ":")) and any(ch.isdigit() for ch in value):
-        return "date" if len(value) <= 25 else "text"
+    if isinstance(value, (_dt.datetime, _dt.date, _dt.time)) or kind == "M":
+        return "empty" if value != value else "date"
     return "text"
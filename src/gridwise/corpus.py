@@ -0,0 +1,233 @@
+from __future__ import annotations
+import heapq, json, math, pickle, zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from urllib.parse import unquote
+import numpy as np
+
+from gridwise.store import ChunkStore, _tokenize, load_chunks_jsonl, save_chunk_store
+
+# a source is a path to a chunk JSONL file, or a (name, chunks) pair
+Source = Union[str, Tuple[str, List[Dict]]]
+
+ID_SEP = "#"
+
+_INDEX_VERSION = 2
+
+
+def _escape(part: str) -> str:
+    return part.replace("%", "%25").replace(ID_SEP, "%23")
+
+
+def doc_id(file: str, sheet: Optional[str], chunk: object) -> str:
+    """
+    Namespaced document id ``file#sheet#chunk``, unique across a corpus.
+    ``%`` and ``#`` in the parts are percent-encoded, so file and sheet
+    names may contain them.
+    """
+    return ID_SEP.join(_escape(str(p)) for p in (file, sheet or "", chunk))
+
+
+def split_doc_id(did: str) -> Tuple[str, str, str]:
+    """Inverse of ``doc_id``."""
+    file, sheet, chunk = (unquote(p) for p in did.split(ID_SEP))
+    return file, sheet, chunk
+
+
+def shard_of(file: str, n_shards: int) -> int:
+    """Stable hash partition (CRC32 of the file name), so a file's chunks share a shard."""
+    return zlib.crc32(file.encode("utf-8")) % n_shards
+
+
+class _Shard:
+    """
+    One partition: postings per term as parallel (doc, tf) arrays over the
+    shard's local document numbers, document lengths, each document's
+    (file, sheet, chunk) parts, and the chunks themselves (a list in
+    memory, a ``ChunkStore`` once saved).
+    """
+
+    def __init__(self, ids: List[str], refs: List[Tuple[str, str, str]], doc_len: np.ndarray,
+                 terms: Dict[str, Tuple[np.ndarray, np.ndarray]], chunks) -> None:
+        self.ids = ids
+        self.refs = refs
+        self.doc_len = doc_len
+        self.terms = terms
+        self.chunks = chunks
+
+    def score(self, q_terms: Sequence[str], idf: Dict[str, float], avgdl: float,
+              k1: float, b: float, topk: int) -> List[Tuple[float, str, int]]:
+        if not self.ids:
+            return []
+        scores = np.zeros(len(self.ids))
+        norm = k1 * (1 - b + b * (self.doc_len / avgdl))
+        hit = False
+        for t in q_terms:
+            post = self.terms.get(t)
+            if post is None:
+                continue
+            docs, tf = post
+            scores[docs] += idf[t] * (tf * (k1 + 1)) / (tf + norm[docs])
+            hit = True
+        if not hit:
+            return []
+        cand = np.flatnonzero(scores)
+        if len(cand) > topk:
+            cand = cand[np.argpartition(-scores[cand], topk - 1)[:topk]]
+        return [(float(scores[i]), self.ids[i], int(i)) for i in cand]
+
+
+def _build_shard(sources: List[Source]) -> _Shard:
+    ids: List[str] = []
+    refs: List[Tuple[str, str, str]] = []
+    lens: List[int] = []
+    chunks: List[Dict] = []
+    postings: Dict[str, Tuple[List[int], List[int]]] = {}
+    for src in sources:
+        if isinstance(src, str):
+            name, items = src, load_chunks_jsonl(src)
+        else:
+            name, items = src
+        for ch in items:
+            n = len(ids)
+            did = doc_id(name, ch.get("sheet"), ch["id"])
+            ids.append(did)
+            refs.append((name, ch.get("sheet") or "", str(ch["id"])))
+            chunks.append({**ch, "id": did})
+            tf_local = Counter(_tokenize(ch["content"]))
+            lens.append(sum(tf_local.values()))
+            for t, tf in tf_local.items():
+                docs, tfs = postings.setdefault(t, ([], []))
+                docs.append(n)
+                tfs.append(tf)
+    terms = {
+        t: (np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float64))
+        for t, (docs, tfs) in postings.items()
+    }
+    return _Shard(ids, refs, np.asarray(lens, dtype=np.float64), terms, chunks)
+
+
+class CorpusIndex:
+    """
+    BM25 index over many encoded files and sheets.
+
+    Documents get namespaced ids (``file#sheet#chunk``, see ``doc_id``) so
+    chunk numbers from different sheets never collide. Files are
+    hash-partitioned into ``n_shards`` shards (``shard_of``), which are
+    built in parallel in a process pool.
+
+    ``search`` fans a query out to all shards on a thread pool (scoring is
+    NumPy-vectorized per term, so threads overlap). Shards score with
+    corpus-wide statistics, i.e. the global document count, document
+    frequencies and average length, so results match a single index over
+    the whole corpus; per-shard top-k lists are merged with a heap.
+    """
+
+    def __init__(self, shards: List[_Shard], max_workers: Optional[int] = None) -> None:
+        self.shards = shards
+        self.N = sum(len(s.ids) for s in shards)
+        total = sum(float(s.doc_len.sum()) for s in shards)
+        self.avgdl = total / self.N if self.N else 1.0
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def build(
+        cls,
+        sources: Iterable[Source],
+        n_shards: int = 8,
+        max_workers: Optional[int] = None,
+    ) -> "CorpusIndex":
+        """
+        Index ``sources``: paths to chunk JSONL files (the path is the file
+        name in the ids) or ``(name, chunks)`` pairs. Chunks are expected to
+        carry a ``sheet`` key (as produced by the encoders); without one the
+        sheet part of the id is empty.
+        """
+        parts: List[List[Source]] = [[] for _ in range(n_shards)]
+        for src in sources:
+            name = src if isinstance(src, str) else src[0]
+            parts[shard_of(name, n_shards)].append(src)
+        if max_workers == 1:
+            shards = [_build_shard(p) for p in parts]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as ex:
+                shards = list(ex.map(_build_shard, parts))
+        return cls(shards, max_workers=max_workers)
+
+    def __len__(self) -> int:
+        return self.N
+
+    def _idf(self, q_terms: Sequence[str]) -> Dict[str, float]:
+        idf: Dict[str, float] = {}
+        for t in set(q_terms):
+            ft = sum(len(s.terms[t][0]) for s in self.shards if t in s.terms)
+            if ft:
+                idf[t] = math.log(1 + (self.N - ft + 0.5) / (ft + 0.5))
+        return idf
+
+    def search(self, query: str, topk: int = 5, k1: float = 1.5, b: float = 0.75) -> List[Dict]:
+        """
+        Top-``topk`` chunks for ``query`` across the corpus, best first, as
+        ``{"id", "file", "sheet", "chunk", "score", "content"}`` dicts.
+        """
+        if not query.strip() or not self.N:
+            return []
+        q_terms = _tokenize(query)
+        idf = self._idf(q_terms)
+        q_terms = [t for t in q_terms if t in idf]
+        if not q_terms:
+            return []
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = [
+            (n, self._pool.submit(s.score, q_terms, idf, self.avgdl, k1, b, topk))
+            for n, s in enumerate(self.shards)
+        ]
+        hits = [(sc, did, n, local) for n, f in futures for sc, did, local in f.result()]
+        best = heapq.nsmallest(topk, hits, key=lambda h: (-h[0], h[1]))
+        out: List[Dict] = []
+        for sc, did, n, local in best:
+            file, sheet, chunk = self.shards[n].refs[local]
+            ch = self.shards[n].chunks[local]
+            out.append({"id": did, "file": file, "sheet": sheet, "chunk": chunk,
+                        "score": sc, "content": ch["content"]})
+        return out
+
+    def save(self, directory: str, compression: Optional[str] = None) -> None:
+        """Write each shard's postings (pickle) and chunks (``save_chunk_store``) under ``directory``."""
+        d = Path(directory)
+        d.mkdir(parents=True, exist_ok=True)
+        for n, s in enumerate(self.shards):
+            with open(d / f"shard_{n}.pkl", "wb") as f:
+                pickle.dump({"ids": s.ids, "refs": s.refs, "doc_len": s.doc_len, "terms": s.terms}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            chunks = s.chunks if isinstance(s.chunks, list) else list(s.chunks)
+            save_chunk_store(({**ch, "id": i} for i, ch in enumerate(chunks)),
+                             str(d / f"shard_{n}.chunks"), compression=compression)
+        (d / "manifest.json").write_text(json.dumps({"version": _INDEX_VERSION, "n_shards": len(self.shards), "docs": self.N}))
+
+    @classmethod
+    def load(cls, directory: str, max_workers: Optional[int] = None) -> "CorpusIndex":
+        """Open an index written by ``save``; chunk contents are read lazily from the shard stores."""
+        d = Path(directory)
+        manifest = json.loads((d / "manifest.json").read_text())
+        if manifest.get("version") != _INDEX_VERSION:
+            raise ValueError(f"{directory} is a version {manifest.get('version')} corpus index; rebuild it")
+        shards: List[_Shard] = []
+        for n in range(manifest["n_shards"]):
+            with open(d / f"shard_{n}.pkl", "rb") as f:
+                obj = pickle.load(f)
+            shards.append(_Shard(obj["ids"], obj["refs"], obj["doc_len"], obj["terms"],
+                                 ChunkStore(str(d / f"shard_{n}.chunks"))))
+        return cls(shards, max_workers=max_workers)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for s in self.shards:
+            if isinstance(s.chunks, ChunkStore):
+                s.chunks.close()
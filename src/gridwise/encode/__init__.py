@@ -1,6 +1,9 @@
 from .vanilla import to_markdown
-from .chunking import chunk_anchor_and_dict_safe
+from .chunking import chunk_anchor_and_dict_safe, chunk_document
+from .document import EncodedDocument
 from .compressor import encode
 from .best import best_encode, BestEncodeResult
+from .skeleton import extract_skeleton
+from .tables import encode_tables
 
-__all__ = ["to_markdown", "chunk_anchor_and_dict_safe", "encode", "best_encode", "BestEncodeResult"]
+__all__ = ["to_markdown", "chunk_anchor_and_dict_safe", "chunk_document", "EncodedDocument", "encode", "best_encode", "BestEncodeResult", "extract_skeleton", "encode_tables"]
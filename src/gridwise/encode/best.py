@@ -2,10 +2,13 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Literal
 
+from gridwise import profiling
 from gridwise.encode.vanilla import to_markdown
+from gridwise.encode.ranges import to_range_markdown
 from gridwise.encode.compressor import encode as compress
-from gridwise.encode.chunking import chunk_anchor_and_dict_safe
-from gridwise.encode.post import parse_dict_block, expand_text_with_dict
+from gridwise.encode.chunking import chunk_document
+from gridwise.encode.document import EncodedDocument
+from gridwise.encode.skeleton import extract_skeleton
 from gridwise.eval.tokens import count_tokens
 from gridwise.core.model import Sheet, BestEncodeResult
 
@@ -26,6 +29,13 @@ def best_encode(
     dict_min_freq: int = 3,
     dict_encode_all_strings: bool = False,
     dict_skip_if_shorter_than: int | None = None,
+    budget_tokens: int | None = None,
+    use_structural_anchors: bool = False,
+    skeleton_k: int = 4,
+    merge_ranges: bool = False,
+    compact_formats: bool = False,
+    skip_blank_rows: bool = False,
+    use_dedup: bool = False,
 ) -> BestEncodeResult:
     """
     Encode a spreadsheet into a token-efficient text representation with optional
@@ -61,6 +71,37 @@ def best_encode(
     dict_skip_if_shorter_than : int or None, default=3
         Skip dictionary encoding for strings shorter than this many tokens.
         If None, encode all strings regardless of length.
+    budget_tokens : int or None, default=None
+        Target size for the whole compressed text. If set, the compression
+        settings are chosen by the budget planner (see `plan_to_budget`), which
+        escalates dictionary, aggregation and anchor-collapse settings until the
+        text fits; the chosen settings are reported in
+        `meta["compression_meta"]["planner"]`. A text over the budget is
+        compressed even when it is shorter than `compress_min_tokens`, and
+        `meta["budget"]` reports the final size and whether it fits.
+    use_structural_anchors : bool, default=False
+        If True, compress from the sheet's structural skeleton (see
+        `extract_skeleton`): only rows/columns within `skeleton_k` of a
+        dtype/format/emptiness boundary are kept. Lossy; the skeleton
+        metadata is reported in `meta["skeleton"]`.
+    skeleton_k : int, default=4
+        Neighborhood kept around each structural anchor row/column.
+    merge_ranges : bool, default=False
+        If True, serialize with `to_range_markdown`: contiguous cells sharing a
+        value are written once as a range (`B2:B400='Yes'`) and empty cells are
+        omitted. Expand with `gridwise.encode.post.expand_ranges`.
+    compact_formats : bool, default=False
+        If True, render dates/times as ISO strings and declare number formats
+        once per range (`[META] fmt=B2:B500 cur`) instead of on every cell.
+        Most useful with sheets from `from_xlsx_rich`.
+    skip_blank_rows : bool, default=False
+        If True, rows without cells produce no (empty) line. Used for sheets
+        that keep original addresses but cover only part of the grid, such as
+        the per-table sub-sheets of `encode_tables`.
+    use_dedup : bool, default=False
+        If True, replace runs of identical rows and repeating row blocks with
+        `[REPEAT of row 17 x 40]` back-references during compression. Expand
+        with `gridwise.encode.post.expand_repeats`.
 
     Returns
     -------
@@ -72,6 +113,8 @@ def best_encode(
         - tokens_compressed (int | None): token count after compression.
         - chunks (List[dict]): list of {"id", "content"} chunks for retrieval.
         - meta (dict): extra metadata (dictionary mappings, anchors, etc.).
+        - document (EncodedDocument): the chosen output as lines, dictionary,
+          code usage and anchor positions; `text` is its text.
 
     Notes
     -----
@@ -80,57 +123,92 @@ def best_encode(
     - Dictionary compression replaces repeated values with short codes
       and appends a `[DICT-BEGIN]…[DICT-END]` block at the end.
     """
-    # 1) vanilla
-    md = to_markdown(sheet, include_format=include_format)
-    t_md = count_tokens(md)
+    with profiling.profile() as prof, profiling.stage("best_encode", cells=len(sheet.cells)):
+        # 1) vanilla
+        if merge_ranges:
+            md = to_range_markdown(sheet, include_format=include_format, compact_formats=compact_formats)
+        else:
+            md = to_markdown(
+                sheet, include_format=include_format, skip_blank_rows=skip_blank_rows, compact_formats=compact_formats
+            )
+        t_md = count_tokens(md)
+
+        doc = EncodedDocument(md.split("\n"), text=md)
+        kind = "vanilla"
+        comp_meta: Dict = {}
+        t_comp: Optional[int] = None
 
-    chosen_text = md
-    kind = "vanilla"
-    comp_meta: Dict = {}
-    t_comp: Optional[int] = None
+        base_text = md
+        t_base: Optional[int] = t_md
+        skel_meta: Dict = {}
+        if use_structural_anchors:
+            skel, skel_meta = extract_skeleton(sheet, k=skeleton_k)
+            if merge_ranges:
+                base_text = to_range_markdown(skel, include_format=include_format, compact_formats=compact_formats)
+            else:
+                base_text = to_markdown(
+                    skel, include_format=include_format, skip_blank_rows=True, compact_formats=compact_formats
+                )
+            t_base = None
 
-    # 2) compress if useful
-    if t_md >= compress_min_tokens:
-        enc = compress(
-                md,
-                budget_tokens=max_tokens_per_chunk,
+        # 2) compress if useful, or if the text is over the requested budget
+        over_budget = budget_tokens is not None and t_md > budget_tokens
+        if t_md >= compress_min_tokens or over_budget:
+            enc = compress(
+                base_text,
+                budget_tokens=budget_tokens if budget_tokens is not None else max_tokens_per_chunk,
+                fit_budget=budget_tokens is not None,
+                tokens_in=t_base,
                 use_anchors=use_anchors,
                 use_inverted_index=use_inverted_index,
                 use_aggregation=use_aggregation,
+                use_dedup=use_dedup,
                 dict_min_freq=dict_min_freq,
                 dict_encode_all_strings=dict_encode_all_strings,   
                 dict_skip_if_shorter_than=dict_skip_if_shorter_than,
             )
-        comp_text = enc["content"]
-        t_comp = count_tokens(comp_text)
-        if t_comp < t_md:
-            chosen_text = comp_text
-            kind = "compressed"
-            comp_meta = enc.get("meta", {})
+            t_comp = count_tokens(enc["content"])
+            if t_comp < t_md:
+                doc = enc["document"]
+                kind = "compressed"
+                comp_meta = enc.get("meta", {})
 
-    mapping = parse_dict_block(chosen_text)
-    if output_mode == "expanded" and mapping:
-        chosen_text = expand_text_with_dict(chosen_text, mapping)
-        kind = f"{kind}+expanded"
-    elif output_mode == "auto" and mapping:
-        expanded = expand_text_with_dict(chosen_text, mapping)
-        if count_tokens(expanded) < count_tokens(chosen_text):
-            chosen_text = expanded
+        # the dictionary comes with the document; the text is not parsed back
+        if output_mode == "expanded" and doc.dictionary:
+            doc = doc.expanded()
             kind = f"{kind}+expanded"
+        elif output_mode == "auto" and doc.dictionary:
+            expanded = doc.expanded()
+            if count_tokens(expanded.text) < count_tokens(doc.text):
+                doc = expanded
+                kind = f"{kind}+expanded"
 
-    chunks = chunk_anchor_and_dict_safe(
-        chosen_text,
-        max_tokens=max_tokens_per_chunk,
-        overlap_tokens=overlap_tokens,
-        token_counter=count_tokens,
-    )
+        chunks = chunk_document(
+            doc,
+            max_tokens=max_tokens_per_chunk,
+            overlap_tokens=overlap_tokens,
+            token_counter=count_tokens,
+        )
 
-    meta_out: Dict = {"compression_meta": comp_meta} if comp_meta else {}
-    return BestEncodeResult(
-        text=chosen_text,
-        kind=kind,
-        tokens_vanilla=t_md,
-        tokens_compressed=t_comp,
-        chunks=chunks,
-        meta=meta_out,
-    )
\ No newline at end of file
+        meta_out: Dict = {"compression_meta": comp_meta} if comp_meta else {}
+        if budget_tokens is not None:
+            if kind == "vanilla":
+                t_final = t_md
+            elif kind == "compressed":
+                t_final = t_comp
+            else:
+                t_final = count_tokens(doc.text)
+            meta_out["budget"] = {"budget_tokens": budget_tokens, "tokens": t_final, "fits": t_final <= budget_tokens}
+        if skel_meta and kind.startswith("compressed"):
+            meta_out["skeleton"] = skel_meta
+        res = BestEncodeResult(
+            text=doc.text,
+            kind=kind,
+            tokens_vanilla=t_md,
+            tokens_compressed=t_comp,
+            chunks=chunks,
+            meta=meta_out,
+            document=doc,
+        )
+    res.meta["timings"] = prof.report()
+    return res
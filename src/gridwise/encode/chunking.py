@@ -1,20 +1,104 @@
 import re
-from typing import List, Dict, Callable, Optional
+from typing import List, Dict, Callable, Optional, Tuple
+from gridwise import profiling
+from gridwise.encode.document import EncodedDocument
 
-_DICT_RE = re.compile(r"\[DICT-BEGIN\](?:.|\n)*?\[DICT-END\]\s*$", re.MULTILINE)
-_ANCHOR_RE = re.compile(r"(?=^\[ANCHOR\].*$)", re.MULTILINE)
+# entry addresses: "A12=", " | B12=", "[ANCHOR]A1=" or ranges "A3:C5="
+_ENTRY_RE = re.compile(r"(?:^|(?<= \| )|(?<=\]))([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?=")
+_SHEET_RE = re.compile(r"^(?:\[ANCHOR\])?# Sheet: (.*?)(?: \(\S+x\S+\))?$")
+_REPEAT_RE = re.compile(r"^\[REPEAT of rows? (\d+)(?:-(\d+))? x (\d+)\]$")
 
-def chunk_anchor_and_dict_safe(
-    text: str,
+
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n - 1
+
+
+def _col_name(c: int) -> str:
+    res = ""
+    c += 1
+    while c > 0:
+        c, rem = divmod(c - 1, 26)
+        res = chr(65 + rem) + res
+    return res
+
+
+class ChunkAnnotator:
+    """
+    Derive retrieval metadata from chunk contents, in chunk order.
+
+    For each chunk it reports the ``sheet`` name, the first/last spreadsheet
+    row (1-based, as in the addresses) as ``row_start``/``row_end``, the
+    column letters present as ``cols``, and ``context``: the most recent
+    header line, so a chunk from the middle of a sheet still knows what its
+    columns mean. Sheet name and header carry over from earlier chunks.
+    Rows stood for by ``[REPEAT ...]`` markers are included in the span.
+    Chunks without cell rows (e.g. the DICT block) get ``None`` rows.
+    """
+
+    def __init__(self, sheet: Optional[str] = None) -> None:
+        self.sheet = sheet
+        self.context: Optional[str] = None
+
+    def __call__(self, content: str) -> Dict:
+        r_min: Optional[int] = None
+        r_max: Optional[int] = None
+        cols: Dict[int, str] = {}
+        for ln in content.split("\n"):
+            if ln.startswith("[DICT"):
+                break
+            m = _SHEET_RE.match(ln)
+            if m:
+                self.sheet = m.group(1)
+                continue
+            m = _REPEAT_RE.match(ln)
+            if m and r_max is not None:
+                a, b, n = int(m.group(1)), int(m.group(2) or m.group(1)), int(m.group(3))
+                r_max += (b - a + 1) * n
+                continue
+            if "::header" in ln:
+                self.context = ln[8:] if ln.startswith("[ANCHOR]") else ln
+            for e in _ENTRY_RE.finditer(ln):
+                r1 = int(e.group(2))
+                r2 = int(e.group(4)) if e.group(4) else r1
+                r_min = r1 if r_min is None else min(r_min, r1)
+                r_max = r2 if r_max is None else max(r_max, r2)
+                c1 = _col_index(e.group(1))
+                c2 = _col_index(e.group(3)) if e.group(3) else c1
+                for c in range(c1, c2 + 1):
+                    if c not in cols:
+                        cols[c] = e.group(1) if c == c1 else _col_name(c)
+        return {
+            "sheet": self.sheet,
+            "row_start": r_min,
+            "row_end": r_max,
+            "cols": [cols[c] for c in sorted(cols)],
+            "context": self.context,
+        }
+
+
+@profiling.staged("chunk")
+def chunk_document(
+    doc: EncodedDocument,
     max_tokens: int,
     overlap_tokens: int = 0,
     token_counter: Optional[Callable[[str], int]] = None,
+    annotate: bool = True,
 ) -> List[Dict]:
     """
-    Chunk `text` without splitting inside the trailing DICT block.
-    Prefer to split on [ANCHOR] boundaries. If an anchor segment
-    exceeds `max_tokens`, fall back to line-packing within that segment.
-    The DICT block (if present) is emitted as the final chunk.
+    Chunk an `EncodedDocument` without splitting inside its DICT block.
+    Prefer to split on [ANCHOR] boundaries (`doc.anchors`). If an anchor
+    segment exceeds `max_tokens`, fall back to line-packing within that
+    segment. The DICT block (if present) is emitted as the final chunk.
+
+    Sizes come from `doc.line_tokens`, so every line is tokenized once;
+    only overlap tails and over-long lines cut into pieces are counted
+    separately.
+
+    With `annotate=True` each chunk also carries the `ChunkAnnotator`
+    metadata: `sheet`, `row_start`, `row_end`, `cols` and `context`.
     """
     if token_counter is None:
         def token_counter(s: str) -> int:
@@ -23,44 +107,29 @@ def chunk_anchor_and_dict_safe(
     chunks: List[Dict] = []
     next_id = 0
 
-    dict_match = _DICT_RE.search(text)
-    dict_block = ""
-    body = text
-    if dict_match:
-        dict_block = dict_match.group(0)
-        body = text[: dict_match.start()].rstrip()
-
-    anchor_positions = [m.start() for m in _ANCHOR_RE.finditer(body)]
-    segments: List[str] = []
-    if anchor_positions:
-        anchor_positions.append(len(body))
-        for a, b in zip(anchor_positions[:-1], anchor_positions[1:]):
-            seg = body[a:b].lstrip("\n")
-            if seg:
-                segments.append(seg)
-    else:
-        if body:
-            segments.append(body)
-
-    def pack_lines(lines: List[str]) -> List[str]:
-        out: List[str] = []
+    lines = doc.lines
+    line_tokens = doc.line_tokens(token_counter)
+    n_lines = len(lines)
+
+    def pack_lines(seg: range) -> List[Tuple[str, int]]:
+        out: List[Tuple[str, int]] = []
         buf: List[str] = []
         buf_tokens = 0
 
         def flush():
             nonlocal buf, buf_tokens
             if buf:
-                out.append("\n".join(buf))
+                out.append(("\n".join(buf), buf_tokens))
                 buf, buf_tokens = [], 0
 
-        for ln in lines:
-            t = token_counter(ln + "\n")
+        for i in seg:
+            ln, t = lines[i], line_tokens[i]
             if t > max_tokens and not buf:
                 s = ln
                 while s:
                     approx_chars = max_tokens * 4
                     piece = s[:approx_chars]
-                    out.append(piece)
+                    out.append((piece, token_counter(piece + "\n")))
                     s = s[approx_chars:]
                 continue
 
@@ -89,25 +158,50 @@ def chunk_anchor_and_dict_safe(
             buf[:] = []
             buf_tokens = 0
 
-    for seg in segments:
-        seg_tokens = token_counter(seg + "\n")
+    for seg in doc.segments():
+        # a segment that is followed by another keeps its line break
+        seg_text = "\n".join(lines[seg.start : seg.stop]) + ("\n" if seg.stop < n_lines else "")
+        if not seg_text:
+            continue
+        seg_tokens = sum(line_tokens[seg.start : seg.stop])
         if seg_tokens <= max_tokens:
             if buf_tokens + seg_tokens > max_tokens and buf:
                 flush_buf()
-            buf.append(seg)
+            buf.append(seg_text)
             buf_tokens += seg_tokens
         else:
-            seg_lines = seg.splitlines()
-            packed = pack_lines(seg_lines)
-            for piece in packed:
-                t = token_counter(piece + "\n")
+            for piece, t in pack_lines(seg):
                 if buf_tokens + t > max_tokens and buf:
                     flush_buf()
                 buf.append(piece)
                 buf_tokens += t
     flush_buf()
 
-    if dict_block.strip():
-        chunks.append({"id": next_id, "content": dict_block.rstrip()})
+    if doc.dict_lines:
+        chunks.append({"id": next_id, "content": "\n".join(doc.dict_lines)})
 
+    if annotate:
+        annotator = ChunkAnnotator()
+        for ch in chunks:
+            ch.update(annotator(ch["content"]))
     return chunks
+
+
+def chunk_anchor_and_dict_safe(
+    text: str,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    token_counter: Optional[Callable[[str], int]] = None,
+    annotate: bool = True,
+) -> List[Dict]:
+    """
+    Chunk `text` without splitting inside the trailing DICT block: parses it
+    into an `EncodedDocument` and runs `chunk_document` on that.
+    """
+    return chunk_document(
+        EncodedDocument.from_text(text),
+        max_tokens,
+        overlap_tokens=overlap_tokens,
+        token_counter=token_counter,
+        annotate=annotate,
+    )
@@ -1,28 +1,91 @@
 # gridwise/encode/compressor/encode.py
+from gridwise import profiling
 from .anchors import apply_anchors
+from .dedup import apply_dedup, sampled_max_block
 from .invert_index import apply_inverted_index
 from .aggregate import apply_aggregation
-from .dict_rebuild import force_rebuild_dict_block
+from .dict_rebuild import build_document, force_rebuild_dict_block  # noqa: F401
+from .planner import plan_document, plan_to_budget  # noqa: F401
 
+# dictionary-stage metadata that is handed on to later stages rather than reported
+_DICT_STATE_KEYS = ("rev_dicts", "code_counts")
+
+@profiling.staged("compress")
 def encode(
     text: str,
     *,
     use_anchors: bool = True,
     use_inverted_index: bool = True,
     use_aggregation: bool = True,
+    use_dedup: bool = False,
     budget_tokens: int = 8192,
+    fit_budget: bool = False,
     dict_min_freq: int = 3,
     dict_encode_all_strings: bool = True,
-    dict_skip_if_shorter_than: int | None = 3, 
+    dict_skip_if_shorter_than: int | None = 3,
+    k_keep_between: int = 0,
+    sample_head: int = 5,
+    sample_tail: int = 5,
+    sample_every: int = 50,
+    dedup_max_block: int = 4,
+    tokens_in: int | None = None,
 ):
+    """
+    Run the compression stages (anchors -> dedup -> inverted index ->
+    aggregation -> dictionary rebuild) over vanilla-encoded text.
+
+    With ``use_dedup=True`` runs of identical rows and repeating blocks of up
+    to ``dedup_max_block`` rows become ``[REPEAT of row 17 x 40]`` markers
+    (see ``apply_dedup``; expand with ``gridwise.encode.post.expand_repeats``).
+    When aggregation is on as well, only repeats of the rows directly above
+    are referenced, and blocks are at most ``sample_tail`` rows long, since
+    sampling may drop any other earlier row.
+
+    With ``fit_budget=True`` the stage settings are chosen by
+    ``plan_to_budget``: starting from the arguments given here, it escalates
+    through the dictionary, aggregation and anchor-collapse levers until the
+    output fits ``budget_tokens``, and reports the chosen settings under
+    ``meta["planner"]``. ``tokens_in`` (the token count of ``text``, if the
+    caller already has it) seeds the planner's token estimates.
+
+    The result's ``"document"`` is the output as an ``EncodedDocument``
+    (lines, dictionary, code usage, anchor positions); ``"content"`` is its
+    text.
+    """
+    if fit_budget:
+        doc, meta = plan_document(
+            text,
+            budget_tokens,
+            use_anchors=use_anchors,
+            use_inverted_index=use_inverted_index,
+            use_aggregation=use_aggregation,
+            use_dedup=use_dedup,
+            dedup_max_block=dedup_max_block,
+            dict_min_freq=dict_min_freq,
+            dict_encode_all_strings=dict_encode_all_strings,
+            dict_skip_if_shorter_than=dict_skip_if_shorter_than,
+            k_keep_between=k_keep_between,
+            sample_head=sample_head,
+            sample_tail=sample_tail,
+            sample_every=sample_every,
+            tokens_in=tokens_in,
+        )
+        return {"kind": "compressed", "content": doc.text, "document": doc, "meta": meta, "budget": budget_tokens}
+
     content = text
     meta: dict = {}
 
     if use_anchors:
-        content, m = apply_anchors(content)
+        content, m = apply_anchors(content, k_keep_between=k_keep_between)
         meta["anchors"] = m
 
+    if use_dedup:
+        max_block = sampled_max_block(dedup_max_block, sample_tail) if use_aggregation else dedup_max_block
+        content, m = apply_dedup(content, max_block=max_block, far_refs=not use_aggregation)
+        meta["dedup"] = m
+
     rev_dicts = {}
+    code_counts = None
     if use_inverted_index:
         content, m = apply_inverted_index(
             content,
@@ -30,13 +93,17 @@ def encode(
             encode_all_strings=dict_encode_all_strings,
             skip_if_shorter_than=dict_skip_if_shorter_than,
         )
-        meta["dictionary"] = {k: v for k,v in m.items() if k != "rev_dicts"}
+        meta["dictionary"] = {k: v for k,v in m.items() if k not in _DICT_STATE_KEYS}
         rev_dicts = m["rev_dicts"]
+        code_counts = m["code_counts"]
 
     if use_aggregation:
-        content, m = apply_aggregation(content)
+        content, m = apply_aggregation(
+            content, sample_head=sample_head, sample_tail=sample_tail, sample_every=sample_every
+        )
         meta["aggregation"] = m
+        code_counts = None  # sampling dropped rows: recount
 
-    content = force_rebuild_dict_block(content, rev_dicts)
+    doc = build_document(content, rev_dicts, code_counts)
 
-    return {"kind": "compressed", "content": content, "meta": meta, "budget": budget_tokens}
+    return {"kind": "compressed", "content": doc.text, "document": doc, "meta": meta, "budget": budget_tokens}
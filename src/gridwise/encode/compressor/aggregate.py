@@ -1,13 +1,14 @@
 from __future__ import annotations
 from typing import Tuple, Dict, List, Optional
 import re
-import statistics
+import numpy as np
+from gridwise import profiling
 
 CELL_RE = re.compile(r"(?P<addr>([A-Z]+)\d+)=(?P<val>[^|]+?)(?P<fmt>::[^|]+)?(?=$| \| )")
 NUM_RE  = re.compile(r"^[\-+]?\d+(\.\d+)?$")
 
 def _is_anchor_line(ln: str) -> bool:
-    return ln.startswith("[ANCHOR]") or ln.startswith("[META]") or ln.startswith("[DICT")
+    return ln.startswith(("[ANCHOR]", "[META]", "[DICT", "[REPEAT"))
 
 def _val_to_float(v: str) -> Optional[float]:
     t = v.strip().strip("'")
@@ -18,6 +19,7 @@ def _val_to_float(v: str) -> Optional[float]:
             return None
     return None
 
+@profiling.staged("aggregation")
 def apply_aggregation(
     text: str,
     sample_head: int = 5,
@@ -47,71 +49,59 @@ def apply_aggregation(
     out: List[str] = []
     i = 0
 
-    def _percentile(vals: List[float], p: float) -> float:
-        xs = sorted(vals)
-        if not xs:
-            return float("nan")
-        k = max(0, min(len(xs) - 1, int(round((p / 100.0) * (len(xs) - 1)))))
-        return xs[k]
+    def _pct_index(n: int, p: float) -> int:
+        return max(0, min(n - 1, int(round((p / 100.0) * (n - 1)))))
 
     def emit_span(i0: int, i1: int):
         span = lines[i0 : i1 + 1]
-        if len(span) <= sample_head + sample_tail:
+        n_span = len(span)
+        if n_span <= sample_head + sample_tail:
             out.extend(span)
             return
 
-        # numeric per column letters
-        col_vals: Dict[str, List[float]] = {}
-        parsed_rows = []
-        for ln in span:
-            row_cells = []
+        # numeric per column letters: one regex pass, one float parse per cell
+        col_rows: Dict[str, List[int]] = {}
+        col_floats: Dict[str, List[float]] = {}
+        for r_i, ln in enumerate(span):
             for m in CELL_RE.finditer(ln):
-                addr = m.group("addr")
-                col_letters = re.match(r"([A-Z]+)", addr).group(1)
-                val = m.group("val")
-                row_cells.append((col_letters, val))
-                f = _val_to_float(val)
-                if f is not None:
-                    col_vals.setdefault(col_letters, []).append(f)
-            parsed_rows.append(row_cells)
+                t = m.group("val").strip().strip("'")
+                if not NUM_RE.match(t):
+                    continue
+                col_letters = m.group(2)
+                col_rows.setdefault(col_letters, []).append(r_i)
+                col_floats.setdefault(col_letters, []).append(float(t))
 
         stats_per_col: Dict[str, Dict[str, float]] = {}
-        for col, vals in col_vals.items():
-            if len(vals) >= sample_head + sample_tail + 1:
-                mean = statistics.fmean(vals)
-                stdev = statistics.pstdev(vals) if len(vals) > 1 else 0.0
-                stats_per_col[col] = {
-                    "count": float(len(vals)),
-                    "min": float(min(vals)),
-                    "max": float(max(vals)),
-                    "mean": float(mean),
-                    "p10": float(_percentile(vals, 10)),
-                    "p90": float(_percentile(vals, 90)),
-                    "stdev": float(stdev),
-                }
-
-        outlier_rows: set[int] = set()
-        if stats_per_col:
-            for r_i, row_cells in enumerate(parsed_rows):
-                for (col_letters, val) in row_cells:
-                    f = _val_to_float(val)
-                    if f is None or col_letters not in stats_per_col:
-                        continue
-                    st = stats_per_col[col_letters]
-                    if st["stdev"] > 0:
-                        z = abs((f - st["mean"]) / st["stdev"])
-                        if z >= z_outlier:
-                            outlier_rows.add(r_i)
-
-        keep = set(range(0, min(sample_head, len(span))))
-        keep.update(range(max(0, len(span) - sample_tail), len(span)))
-        for k in range(sample_head, max(0, len(span) - sample_tail), sample_every):
-            keep.add(k)
-        keep.update(outlier_rows)
-
-        for idx, ln in enumerate(span):
-            if idx in keep:
-                out.append(ln)
+        outlier_mask = np.zeros(n_span, dtype=bool)
+        for col, rows in col_rows.items():
+            # every numeric cell counts, even where a line holds the column twice
+            vals = np.asarray(col_floats[col])
+            n = len(vals)
+            if n < sample_head + sample_tail + 1:
+                continue
+            mean = float(vals.mean())
+            stdev = float(vals.std()) if n > 1 else 0.0
+            k10, k90 = _pct_index(n, 10), _pct_index(n, 90)
+            part = np.partition(vals, (k10, k90))
+            stats_per_col[col] = {
+                "count": float(n),
+                "min": float(vals.min()),
+                "max": float(vals.max()),
+                "mean": mean,
+                "p10": float(part[k10]),
+                "p90": float(part[k90]),
+                "stdev": stdev,
+            }
+            if stdev > 0:
+                outlier_mask[np.asarray(rows)[np.abs((vals - mean) / stdev) >= z_outlier]] = True
+
+        keep_mask = outlier_mask
+        keep_mask[: min(sample_head, n_span)] = True
+        keep_mask[max(0, n_span - sample_tail) :] = True
+        keep_mask[sample_head : max(0, n_span - sample_tail) : sample_every] = True
+        keep_idx = np.flatnonzero(keep_mask)
+
+        out.extend(span[k] for k in keep_idx)
 
         if stats_per_col:
             stats_parts = []
@@ -121,7 +111,7 @@ def apply_aggregation(
                     f"{col}:count={int(st['count'])},min={st['min']:.4g},max={st['max']:.4g},"
                     f"mean={st['mean']:.4g},p10={st['p10']:.4g},p90={st['p90']:.4g}"
                 )
-            out.append(f"[AGG span={len(span)} kept={len(keep)} stats={' | '.join(stats_parts)}]")
+            out.append(f"[AGG span={n_span} kept={len(keep_idx)} stats={' | '.join(stats_parts)}]")
 
     while i < N:
         if _is_anchor_line(lines[i]):
@@ -1,9 +1,11 @@
 from __future__ import annotations
 from typing import Tuple, Dict, List
 import re
+from gridwise import profiling
 
 TOTALS_RE = re.compile(r"(?i)\b(total|subtotal|sum|avg|average)\b")
 
+@profiling.staged("anchors")
 def apply_anchors(text: str, k_keep_between: int = 0) -> Tuple[str, Dict]:
     """
     Mark and preserve anchor lines in encoded spreadsheet text, optionally collapsing 
@@ -0,0 +1,222 @@
+from __future__ import annotations
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import hashlib, re
+from gridwise import profiling
+
+# a cell address at the start of an entry: "A12=" or " | B12="
+ADDR_RE = re.compile(r"(?:^| \| )([A-Z]+)(\d+)(?==)")
+REPEAT_RE = re.compile(r"^\[REPEAT of rows? (\d+)(?:-(\d+))? x (\d+)\]$")
+_PREFIX = "[ANCHOR]"
+
+
+def row_key(line: str) -> Optional[Tuple[int, str]]:
+    """
+    Split a single-row line into (row number, value key).
+
+    The key is the line with the row numbers removed from its addresses, so two
+    rows holding the same values in the same columns share a key. Returns None
+    for lines that are not one spreadsheet row (markers, blank lines, ranges
+    spanning rows).
+    """
+    rows: List[str] = []
+
+    def strip(m: re.Match) -> str:
+        rows.append(m.group(2))
+        return m.group(0)[: -len(m.group(2))]
+
+    key = ADDR_RE.sub(strip, line)
+    if not rows or any(r != rows[0] for r in rows):
+        return None
+    return int(rows[0]), key
+
+
+def row_hash(key: str) -> int:
+    """
+    64-bit fingerprint of a row key. Unlike ``hash`` it is the same in every
+    process, so a pickled ``RowDeduper`` stays valid when a run is resumed.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def with_row(line: str, row: int) -> str:
+    """Rewrite every entry address in ``line`` to point at ``row``."""
+    return ADDR_RE.sub(lambda m: f"{m.group(0)[: -len(m.group(2))]}{row}", line)
+
+
+def repeat_marker(src_start: int, src_end: int, times: int) -> str:
+    if src_start == src_end:
+        return f"[REPEAT of row {src_start} x {times}]"
+    return f"[REPEAT of rows {src_start}-{src_end} x {times}]"
+
+
+class RowDeduper:
+    """
+    Incremental duplicate-row and repeating-block elimination.
+
+    Lines are pushed one at a time; ``push`` returns whatever can already be
+    emitted and ``finish`` flushes the rest, so the same object serves the
+    in-memory ``apply_dedup`` stage and the streaming CSV encoder.
+
+    Each data row is keyed by its values with the row numbers stripped from
+    its addresses, and compared by the ``row_hash`` of that key; a matching
+    hash is confirmed against the key itself, so a collision never turns a
+    row into a wrong back-reference. For every block length
+    ``k <= max_block`` a run counter tracks how many consecutive rows equal
+    the row ``k`` above (a block of ``k`` rows repeats once its run reaches
+    ``k``), at ``O(max_block)`` hash comparisons per row. While some run
+    covers all pending rows they are held back, and when the last run
+    breaks the longest whole number of repeated blocks is replaced with a
+    back-reference:
+
+        [REPEAT of row 17 x 40]        rows 18-57 are copies of row 17
+        [REPEAT of rows 17-19 x 5]     the next 15 rows repeat rows 17-19
+
+    With ``far_refs=True`` a row that repeats any earlier row (not just the
+    one above) is also replaced, e.g. row 500 by ``[REPEAT of row 17 x 1]``;
+    up to ``max_history`` distinct rows are remembered for this.
+
+    Repeated rows always take the row numbers that directly follow the
+    previous line, so markers only stand for consecutive rows. Structural
+    lines (``[...]`` markers, blank rows) end any pending run and are passed
+    through; ``[ANCHOR]`` rows are passed through but still count as rows.
+    """
+
+    def __init__(self, max_block: int = 4, far_refs: bool = True, max_history: int = 100_000) -> None:
+        self.max_block = max_block
+        self.far_refs = far_refs
+        self.max_history = max_history
+        self.seen: Dict[int, Tuple[int, str]] = {}  # row_hash -> (first row, key)
+        self.rows_in = 0
+        self.rows_out = 0
+        self.markers = 0
+        self._reset_run()
+
+    def _reset_run(self) -> None:
+        self._recent: deque = deque(maxlen=self.max_block)  # (row, hash, key) of the last rows
+        self._runs = [0] * (self.max_block + 1)  # _runs[k]: rows equal to the row k above
+        self._pending: List[Tuple[int, str]] = []  # (row, line) held back
+        self._last_row: Optional[int] = None
+
+    def _flush_pending(self) -> List[str]:
+        pend = self._pending
+        if not pend:
+            return []
+        self._pending = []
+        n = len(pend)
+        # pick the block length whose whole repetitions cover the most rows
+        best_k, best_cover = 0, 0
+        for k in range(1, self.max_block + 1):
+            if self._runs[k] >= n:
+                cover = (n // k) * k
+                if cover > best_cover:
+                    best_k, best_cover = k, cover
+        out: List[str] = []
+        if best_k:
+            start = pend[0][0] - best_k
+            marker = repeat_marker(start, start + best_k - 1, best_cover // best_k)
+            if len(marker) < sum(len(ln) for _, ln in pend[:best_cover]):
+                out.append(marker)
+                self.markers += 1
+                pend = pend[best_cover:]
+        out.extend(ln for _, ln in pend)
+        self.rows_out += len(pend)
+        return out
+
+    def _structural(self, line: str) -> List[str]:
+        out = self._flush_pending()
+        self._reset_run()
+        out.append(line)
+        return out
+
+    def push(self, line: str) -> List[str]:
+        anchor = line.startswith(_PREFIX)
+        parsed = row_key(line[len(_PREFIX):] if anchor else line)
+        if parsed is None or (line.startswith("[") and not anchor):
+            return self._structural(line)
+        row, key = parsed
+        h = row_hash(key)
+        self.rows_in += 1
+
+        out: List[str] = []
+        follows = self._last_row is not None and row == self._last_row + 1
+        if self._last_row is not None and not follows:
+            out.extend(self._flush_pending())
+            self._reset_run()
+        if anchor:
+            out.extend(self._flush_pending())
+            self._reset_run()
+            self._last_row = row
+            self.rows_out += 1
+            out.append(line)
+            return out
+
+        recent = self._recent
+        new_runs = [0] * (self.max_block + 1)
+        for k in range(1, min(self.max_block, len(recent)) + 1):
+            _, h_k, key_k = recent[-k]
+            if h_k == h and key_k == key:
+                new_runs[k] = self._runs[k] + 1
+
+        if self._pending and not any(r > len(self._pending) for r in new_runs):
+            out.extend(self._flush_pending())
+        self._runs = new_runs
+        recent.append((row, h, key))
+        self._last_row = row
+
+        if any(new_runs):
+            self._pending.append((row, line))
+            return out
+
+        # a marker takes the row after the previous line, so only use one right after a row
+        hit = self.seen.get(h) if self.far_refs and follows else None
+        ref = hit[0] if hit is not None and hit[1] == key else None
+        if ref is not None and ref < row:
+            marker = repeat_marker(ref, ref, 1)
+            if len(marker) < len(line):
+                self.markers += 1
+                out.append(marker)
+                return out
+        if h not in self.seen and len(self.seen) < self.max_history:
+            self.seen[h] = (row, key)
+        self.rows_out += 1
+        out.append(line)
+        return out
+
+    def finish(self) -> List[str]:
+        out = self._flush_pending()
+        self._reset_run()
+        return out
+
+
+def sampled_max_block(max_block: int, sample_tail: int) -> int:
+    """
+    The ``max_block`` to dedup with when aggregation samples the output.
+
+    A marker (``far_refs=False``) refers to the rows directly above it, which
+    end the span aggregation sees before the marker; only the last
+    ``sample_tail`` rows of a span are sure to be kept, so longer blocks
+    could refer to rows that were dropped.
+    """
+    return max(0, min(max_block, sample_tail))
+
+
+@profiling.staged("dedup")
+def apply_dedup(text: str, max_block: int = 4, far_refs: bool = True) -> Tuple[str, Dict]:
+    """
+    Replace duplicate rows and repeating row blocks with ``[REPEAT ...]``
+    back-references (see ``RowDeduper``). Expand with
+    ``gridwise.encode.post.expand_repeats``.
+
+    Returns
+    -------
+    (str, dict)
+        The text and metadata with input/output row counts and marker count.
+    """
+    d = RowDeduper(max_block=max_block, far_refs=far_refs)
+    out: List[str] = []
+    for ln in text.splitlines():
+        out.extend(d.push(ln))
+    out.extend(d.finish())
+    meta = {"rows_in": d.rows_in, "rows_out": d.rows_out, "markers": d.markers, "max_block": max_block}
+    return "\n".join(out), meta
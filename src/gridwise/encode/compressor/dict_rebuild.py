@@ -1,32 +1,40 @@
 # gridwise/encode/compressor/dict_rebuild.py
 from __future__ import annotations
 import re
-from typing import Dict, List
-from collections import defaultdict
+from typing import Dict, Optional
+from collections import Counter
+from gridwise import profiling
+from gridwise.encode.document import EncodedDocument, code_column, code_number
 
-_CODE_RE = re.compile(r"@C\{([A-Z]+)\}t(\d+)\b")
 _ALL_DICTS_RE = re.compile(r"\[DICT-BEGIN\].*?\[DICT-END\]\s*", re.S)
 
-def force_rebuild_dict_block(text: str, rev_dicts: Dict[str, Dict[str, str]]) -> str:
-    base = re.sub(_ALL_DICTS_RE, "", text).rstrip()
-
-    used = defaultdict(set)  # col -> {t}
-    for col, num in _CODE_RE.findall(base):
-        used[col].add(int(num))
+@profiling.staged("dict_rebuild")
+def build_document(
+    text: str,
+    rev_dicts: Dict[str, Dict[str, str]],
+    code_counts: Optional[Counter] = None,
+) -> EncodedDocument:
+    """
+    Wrap compressed ``text`` as an ``EncodedDocument`` whose DICT block lists
+    exactly the codes used in the body, per column, in code order (codes
+    missing from ``rev_dicts`` get ``<MISSING>``). Existing DICT blocks are
+    dropped. ``code_counts`` (code -> uses), when the dictionary stage already
+    has them, saves scanning the text for codes.
+    """
+    if "[DICT-BEGIN]" in text:
+        text = re.sub(_ALL_DICTS_RE, "", text)
+    base = text.rstrip()
+    doc = EncodedDocument(base.split("\n"), code_counts=code_counts)
+    used = sorted((c for c, n in doc.code_counts.items() if n > 0), key=lambda c: (code_column(c), code_number(c)))
+    if used:
+        doc = EncodedDocument(
+            doc.lines,
+            {c: rev_dicts.get(code_column(c), {}).get(c, "<MISSING>") for c in used},
+            code_counts=doc.code_counts,
+            anchors=doc.anchors,
+        )
+    return doc
 
-    if not any(used.values()):
-        return base
-
-    lines: List[str] = ["[DICT-BEGIN]"]
-    for col in sorted(used.keys()):
-        tnums = sorted(used[col])
-        if not tnums:
-            continue
-        lines.append(f"[COL {col}]")
-        rev = rev_dicts.get(col, {})
-        for t in tnums:
-            code = f"@C{{{col}}}t{t}"
-            raw = rev.get(code)
-            lines.append(f"{code}={raw if raw is not None else '<MISSING>'}")
-    lines.append("[DICT-END]")
-    return base + "\n" + "\n".join(lines) + "\n"
+def force_rebuild_dict_block(text: str, rev_dicts: Dict[str, Dict[str, str]]) -> str:
+    """``build_document(text, rev_dicts).text``: the body followed by a DICT block of the codes it uses."""
+    return build_document(text, rev_dicts).text
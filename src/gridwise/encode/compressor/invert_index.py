@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Tuple, Dict, List, DefaultDict, Optional
 import re
 from collections import defaultdict, Counter
+from gridwise import profiling
 
 CELL_RE = re.compile(
     r"(?P<addr>([A-Z]+)\d+)="
@@ -25,6 +26,7 @@ def _unquote_keep(s: str) -> tuple[str, str]:
     norm = " ".join(raw.split())
     return norm, quoted
 
+@profiling.staged("dictionary")
 def apply_inverted_index(
     text: str,
     *,
@@ -68,6 +70,7 @@ def apply_inverted_index(
           * ``per_column`` (bool) — dictionaries are built per column
           * ``encode_all_strings`` / ``min_freq`` / ``skip_if_shorter_than`` (settings)
           * ``rev_dicts`` — reverse dictionaries mapping codes → exemplar quoted values
+          * ``code_counts`` — how many cells each code replaced
 
     Notes
     -----
@@ -123,6 +126,7 @@ def apply_inverted_index(
         col_norm2code[col] = mapping
         rev_dicts[col] = { mapping[norm]: col_norm_to_exemplar[col][norm] for norm in vocab }
 
+    code_counts: Counter = Counter()
     out_lines: List[str] = []
     for ln, ms in zip(lines, matches_per_line):
         if not ms:
@@ -136,6 +140,7 @@ def apply_inverted_index(
                 continue
             code = col_norm2code.get(col, {}).get(norm)
             if code:
+                code_counts[code] += 1
                 s, e = m.span("val")
                 new_ln = new_ln[:s] + code + new_ln[e:]
         out_lines.append(new_ln)
@@ -149,5 +154,6 @@ def apply_inverted_index(
         "min_freq": min_freq,
         "skip_if_shorter_than": skip_if_shorter_than,
         "rev_dicts": {k: dict(v) for k,v in rev_dicts.items()},
+        "code_counts": code_counts,
     }
     return replaced, meta
@@ -0,0 +1,227 @@
+from __future__ import annotations
+from typing import Dict, List, Tuple
+from collections import deque
+import heapq
+import math
+
+from .aggregate import CELL_RE, NUM_RE
+
+# running stats drift while a span streams by, so candidates enter the outlier
+# reservoir at a looser threshold and are re-checked exactly in finish()
+_CANDIDATE_SLACK = 0.75
+
+
+class RunningStats:
+    """Welford mean/variance plus running min/max for one column."""
+
+    __slots__ = ("n", "mean", "_m2", "min", "max")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def push(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def stdev(self) -> float:
+        # population stdev, same as statistics.pstdev / np.std
+        return math.sqrt(self._m2 / self.n) if self.n > 1 else 0.0
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016) in O(k log(n/k)) memory.
+
+    Until ``k`` values have been pushed nothing is compacted and quantiles are
+    exact, using the same nearest-rank rule as ``apply_aggregation``.
+    Compaction alternates between keeping even and odd positions, so results
+    are deterministic for a given input order.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2.0 / 3.0) -> None:
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.compactors: List[List[float]] = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._flip = False
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.compactors) - h - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def push(self, x: float) -> None:
+        self.compactors[0].append(x)
+        self.n += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self) -> None:
+        for h in range(len(self.compactors)):
+            if len(self.compactors[h]) < self._capacity(h):
+                continue
+            if h + 1 >= len(self.compactors):
+                self.compactors.append([])
+                self._max_size = sum(self._capacity(x) for x in range(len(self.compactors)))
+            buf = sorted(self.compactors[h])
+            keep = [buf.pop()] if len(buf) % 2 else []
+            self._flip = not self._flip
+            self.compactors[h + 1].extend(buf[int(self._flip) :: 2])
+            self.compactors[h] = keep
+            self._size = sum(len(comp) for comp in self.compactors)
+            if self._size < self._max_size:
+                break
+
+    def quantile(self, q: float) -> float:
+        items = sorted((v, 1 << h) for h, comp in enumerate(self.compactors) for v in comp)
+        if not items:
+            return float("nan")
+        rank = max(0, min(self.n - 1, int(round(q * (self.n - 1)))))
+        cum = 0
+        for v, w in items:
+            cum += w
+            if cum > rank:
+                return v
+        return items[-1][0]
+
+
+class OnlineAggregator:
+    """
+    Streaming counterpart of ``apply_aggregation`` for one unbounded span.
+
+    Feed rows with ``push()`` and emit whatever it returns; call ``finish()``
+    at the end of the span to get the remaining rows and the ``[AGG ...]``
+    summary line. Memory is bounded by ``sample_tail`` (ring buffer),
+    ``max_outliers`` (outlier reservoir) and the per-column quantile sketches,
+    independent of span length.
+
+    Differences from the batch stage:
+    - p10/p90 are KLL estimates once a column holds more than ``sketch_k`` values.
+    - Outlier candidates are scored against the running mean/stdev when they
+      leave the tail ring buffer. The ``max_outliers`` most extreme candidates
+      are kept, re-checked against the final stats in ``finish()``, and emitted
+      (in row order) before the tail rows. Rows that only look extreme
+      against the final stats and never against the running ones are missed.
+    """
+
+    def __init__(
+        self,
+        sample_head: int = 5,
+        sample_tail: int = 5,
+        sample_every: int = 50,
+        z_outlier: float = 3.0,
+        max_outliers: int = 64,
+        sketch_k: int = 200,
+    ) -> None:
+        self.sample_head = sample_head
+        self.sample_tail = sample_tail
+        self.sample_every = sample_every
+        self.z_outlier = z_outlier
+        self.max_outliers = max_outliers
+        self.sketch_k = sketch_k
+        self._reset()
+
+    def _reset(self) -> None:
+        self.n = 0
+        self.kept = 0
+        self.stats: Dict[str, RunningStats] = {}
+        self.sketches: Dict[str, KLLSketch] = {}
+        self._ring: deque = deque()
+        self._outliers: List[Tuple[float, int, str, List[Tuple[str, float]]]] = []
+
+    def _min_count(self) -> int:
+        return self.sample_head + self.sample_tail + 1
+
+    def _parse(self, line: str) -> List[Tuple[str, float]]:
+        vals: List[Tuple[str, float]] = []
+        for m in CELL_RE.finditer(line):
+            t = m.group("val").strip().strip("'")
+            if NUM_RE.match(t):
+                vals.append((m.group(2), float(t)))
+        return vals
+
+    def _zscore(self, vals: List[Tuple[str, float]]) -> float:
+        best = 0.0
+        for col, f in vals:
+            st = self.stats.get(col)
+            if st is None or st.n < self._min_count():
+                continue
+            sd = st.stdev
+            if sd > 0:
+                best = max(best, abs((f - st.mean) / sd))
+        return best
+
+    def push(self, line: str) -> List[str]:
+        idx = self.n
+        self.n += 1
+        vals = self._parse(line)
+        for col, f in vals:
+            st = self.stats.get(col)
+            if st is None:
+                st = self.stats[col] = RunningStats()
+                self.sketches[col] = KLLSketch(self.sketch_k)
+            st.push(f)
+            self.sketches[col].push(f)
+
+        if idx < self.sample_head:
+            self.kept += 1
+            return [line]
+
+        self._ring.append((idx, line, vals))
+        if len(self._ring) <= self.sample_tail:
+            return []
+        e_idx, e_line, e_vals = self._ring.popleft()
+        if (e_idx - self.sample_head) % self.sample_every == 0:
+            self.kept += 1
+            return [e_line]
+        z = self._zscore(e_vals)
+        if z >= self.z_outlier * _CANDIDATE_SLACK:
+            item = (z, e_idx, e_line, e_vals)
+            if len(self._outliers) < self.max_outliers:
+                heapq.heappush(self._outliers, item)
+            elif z > self._outliers[0][0]:
+                heapq.heapreplace(self._outliers, item)
+        return []
+
+    def finish(self) -> List[str]:
+        out: List[str] = []
+        if self.n <= self.sample_head + self.sample_tail:
+            out.extend(line for _, line, _ in self._ring)
+            self._reset()
+            return out
+
+        # bounded second pass: re-score the reservoir against the final stats
+        survivors = sorted(
+            (idx, line) for _, idx, line, vals in self._outliers if self._zscore(vals) >= self.z_outlier
+        )
+        out.extend(line for _, line in survivors)
+        out.extend(line for _, line, _ in self._ring)
+        kept = self.kept + len(survivors) + len(self._ring)
+
+        stats_parts = []
+        for col in sorted(self.stats.keys()):
+            st = self.stats[col]
+            if st.n < self._min_count():
+                continue
+            sk = self.sketches[col]
+            stats_parts.append(
+                f"{col}:count={st.n},min={st.min:.4g},max={st.max:.4g},"
+                f"mean={st.mean:.4g},p10={sk.quantile(0.10):.4g},p90={sk.quantile(0.90):.4g}"
+            )
+        if stats_parts:
+            out.append(f"[AGG span={self.n} kept={kept} stats={' | '.join(stats_parts)}]")
+        self._reset()
+        return out
@@ -0,0 +1,255 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple, Callable
+import time
+
+from gridwise import profiling
+from gridwise.eval.tokens import count_tokens
+from .anchors import apply_anchors
+from .dedup import apply_dedup, sampled_max_block
+from .invert_index import apply_inverted_index
+from .aggregate import apply_aggregation
+from .dict_rebuild import build_document
+from gridwise.encode.document import EncodedDocument
+
+# Escalation ladder, cheapest (least lossy) first. Each step is applied on top
+# of the previous ones and of the caller's settings, and only ever tightens
+# them (see _TIGHTEN): lossless dictionary settings (values repeated often,
+# then twice, then every string) and duplicate-row elimination, then sampling
+# via the aggregation stage, then collapsing the spans between anchors.
+LADDER: List[Dict] = [
+    {},
+    {"use_inverted_index": True},
+    {"dict_min_freq": 2},
+    {"dict_encode_all_strings": True},
+    {"use_dedup": True},
+    {"use_aggregation": True},
+    {"sample_head": 3, "sample_tail": 3, "sample_every": 200},
+    {"sample_head": 2, "sample_tail": 2, "sample_every": 1000},
+    {"use_anchors": True, "k_keep_between": 50},
+    {"k_keep_between": 10},
+    {"k_keep_between": 2},
+]
+
+# how a ladder value combines with the current one: the more aggressive wins.
+# Switches only turn on; fewer kept rows/lines and a lower dictionary
+# frequency are more aggressive; k_keep_between=0 means "keep every line".
+_TIGHTEN: Dict[str, Callable] = {
+    "use_anchors": lambda cur, v: cur or v,
+    "use_inverted_index": lambda cur, v: cur or v,
+    "dict_encode_all_strings": lambda cur, v: cur or v,
+    "use_dedup": lambda cur, v: cur or v,
+    "use_aggregation": lambda cur, v: cur or v,
+    "dict_min_freq": min,
+    "sample_head": min,
+    "sample_tail": min,
+    "sample_every": max,
+    "k_keep_between": lambda cur, v: v if cur == 0 else min(cur, v),
+}
+
+
+def _effective(settings: Dict) -> Dict:
+    """``settings`` without the values that cannot change the output."""
+    out = dict(settings)
+    if out["dict_encode_all_strings"]:
+        out["dict_min_freq"] = None  # every string is encoded whatever its frequency
+    return out
+
+
+def _escalate(settings: Dict, delta: Dict) -> Dict:
+    """``settings`` tightened by one ladder step."""
+    out = dict(settings)
+    for k, v in delta.items():
+        out[k] = _TIGHTEN[k](settings[k], v)
+    return out
+
+
+# only count exactly when the estimate is within this factor of the budget
+_VERIFY_SLACK = 1.15
+
+_ANCHOR_KEYS = ("use_anchors", "k_keep_between")
+_DICT_KEYS = ("use_inverted_index", "dict_min_freq", "dict_encode_all_strings", "dict_skip_if_shorter_than")
+_AGG_KEYS = ("use_aggregation", "sample_head", "sample_tail", "sample_every")
+
+
+def _key(settings: Dict, keys: Tuple[str, ...]) -> Tuple:
+    return tuple(settings[k] for k in keys)
+
+
+class _StageCache:
+    """Memoizes stage outputs so ladder steps only re-run the stages they change."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.anchors: Dict[Tuple, Tuple[str, Dict]] = {}
+        self.dedups: Dict[Tuple, Tuple[str, Dict]] = {}
+        self.dicts: Dict[Tuple, Tuple[str, Dict]] = {}
+        self.aggs: Dict[Tuple, Tuple[EncodedDocument, Dict]] = {}
+        self.stage_runs = 0
+
+    def run(self, s: Dict) -> Tuple[EncodedDocument, Dict]:
+        ka = _key(s, _ANCHOR_KEYS)
+        if ka not in self.anchors:
+            self.stage_runs += 1
+            self.anchors[ka] = (
+                apply_anchors(self.text, k_keep_between=s["k_keep_between"])
+                if s["use_anchors"] else (self.text, {})
+            )
+        # back-references to arbitrary earlier rows only survive without sampling,
+        # and then only blocks within the sampled tail
+        far_refs = not s["use_aggregation"]
+        max_block = s["dedup_max_block"] if far_refs else sampled_max_block(s["dedup_max_block"], s["sample_tail"])
+        kr = ka + ((True, max_block, far_refs) if s["use_dedup"] else (False,))
+        if kr not in self.dedups:
+            self.stage_runs += 1
+            content = self.anchors[ka][0]
+            self.dedups[kr] = (
+                apply_dedup(content, max_block=max_block, far_refs=far_refs)
+                if s["use_dedup"] else (content, {})
+            )
+        kd = kr + _key(s, _DICT_KEYS)
+        if kd not in self.dicts:
+            self.stage_runs += 1
+            content = self.dedups[kr][0]
+            self.dicts[kd] = (
+                apply_inverted_index(
+                    content,
+                    min_freq=s["dict_min_freq"],
+                    encode_all_strings=s["dict_encode_all_strings"],
+                    skip_if_shorter_than=s["dict_skip_if_shorter_than"],
+                )
+                if s["use_inverted_index"] else (content, {"rev_dicts": {}, "code_counts": None})
+            )
+        kg = kd + _key(s, _AGG_KEYS)
+        if kg not in self.aggs:
+            self.stage_runs += 1
+            content, m_dict = self.dicts[kd]
+            m_agg: Dict = {}
+            code_counts = m_dict["code_counts"]
+            if s["use_aggregation"]:
+                content, m_agg = apply_aggregation(
+                    content,
+                    sample_head=s["sample_head"],
+                    sample_tail=s["sample_tail"],
+                    sample_every=s["sample_every"],
+                )
+                code_counts = None  # sampling dropped rows: recount
+            self.aggs[kg] = (build_document(content, m_dict["rev_dicts"], code_counts), m_agg)
+
+        meta: Dict = {}
+        if s["use_anchors"]:
+            meta["anchors"] = self.anchors[ka][1]
+        if s["use_dedup"]:
+            meta["dedup"] = self.dedups[kr][1]
+        if s["use_inverted_index"]:
+            meta["dictionary"] = {k: v for k, v in self.dicts[kd][1].items() if k not in ("rev_dicts", "code_counts")}
+        if s["use_aggregation"]:
+            meta["aggregation"] = self.aggs[kg][1]
+        return self.aggs[kg][0], meta
+
+
+@profiling.staged("plan")
+def plan_document(
+    text: str,
+    budget_tokens: int,
+    *,
+    use_anchors: bool = True,
+    use_inverted_index: bool = True,
+    use_aggregation: bool = False,
+    use_dedup: bool = False,
+    dedup_max_block: int = 4,
+    dict_min_freq: int = 3,
+    dict_encode_all_strings: bool = True,
+    dict_skip_if_shorter_than: Optional[int] = 3,
+    k_keep_between: int = 0,
+    sample_head: int = 5,
+    sample_tail: int = 5,
+    sample_every: int = 50,
+    tokens_in: Optional[int] = None,
+    token_counter: Optional[Callable[[str], int]] = None,
+) -> Tuple[EncodedDocument, Dict]:
+    """
+    Pick the cheapest compression settings whose output fits ``budget_tokens``.
+
+    Starting from the given settings, walks ``LADDER`` one step at a time and
+    stops at the first step whose output fits. Steps only tighten the
+    caller's settings (a dictionary frequency is lowered, never raised; a
+    skip threshold or dedup block size the caller chose is kept). Stage outputs are cached, so a
+    step only re-runs the stages whose parameters it changes. Sizes are first
+    estimated from a chars-per-token ratio calibrated on every exact count;
+    the tokenizer only runs when an estimate lands near the budget. If no step
+    fits, the last (most aggressive) output is returned with ``fits=False``.
+
+    Returns
+    -------
+    (EncodedDocument, dict)
+        Compressed document and stage metadata, plus ``meta["planner"]`` with the
+        chosen ``settings``, achieved ``tokens``, ``fits``, the ladder ``step``
+        and counters for ``steps_tried``, ``exact_counts`` and ``stage_runs``.
+    """
+    counter = token_counter or count_tokens
+    t0 = time.perf_counter()
+
+    settings: Dict = {
+        "use_anchors": use_anchors,
+        "k_keep_between": k_keep_between,
+        "use_inverted_index": use_inverted_index,
+        "dict_min_freq": dict_min_freq,
+        "dict_encode_all_strings": dict_encode_all_strings,
+        "dict_skip_if_shorter_than": dict_skip_if_shorter_than,
+        "use_aggregation": use_aggregation,
+        "use_dedup": use_dedup,
+        "dedup_max_block": dedup_max_block,
+        "sample_head": sample_head,
+        "sample_tail": sample_tail,
+        "sample_every": sample_every,
+    }
+
+    if tokens_in is None:
+        tokens_in = counter(text)
+    ratio = tokens_in / max(1, len(text))
+    exact_counts = 0
+
+    cache = _StageCache(text)
+    doc, meta = EncodedDocument.from_text(text), {}
+    tokens: Optional[int] = None
+    fits = False
+    step = 0
+    for step, delta in enumerate(LADDER):
+        candidate = _escalate(settings, delta)
+        if step > 0 and _effective(candidate) == _effective(settings):
+            continue
+        settings = candidate
+        doc, meta = cache.run(settings)
+        content = doc.text
+        tokens = None
+        if len(content) * ratio <= budget_tokens * _VERIFY_SLACK:
+            tokens = counter(content)
+            exact_counts += 1
+            ratio = tokens / max(1, len(content))
+            if tokens <= budget_tokens:
+                fits = True
+                break
+
+    if tokens is None:
+        tokens = counter(doc.text)
+        exact_counts += 1
+
+    meta["planner"] = {
+        "budget_tokens": budget_tokens,
+        "fits": fits,
+        "tokens": tokens,
+        "tokens_in": tokens_in,
+        "step": step,
+        "settings": dict(settings),
+        "steps_tried": step + 1,
+        "exact_counts": exact_counts,
+        "stage_runs": cache.stage_runs,
+        "seconds": round(time.perf_counter() - t0, 4),
+    }
+    return doc, meta
+
+
+def plan_to_budget(text: str, budget_tokens: int, **kwargs) -> Tuple[str, Dict]:
+    """``plan_document`` returning the compressed text instead of the document."""
+    doc, meta = plan_document(text, budget_tokens, **kwargs)
+    return doc.text, meta
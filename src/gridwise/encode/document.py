@@ -0,0 +1,135 @@
+from __future__ import annotations
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from gridwise.eval.tokens import count_tokens, count_tokens_many
+
+_DICT_RE = re.compile(r"\[DICT-BEGIN\](?:.|\n)*?\[DICT-END\]\s*$", re.MULTILINE)
+_DICT_LINE_RE = re.compile(r"^(@C\{[A-Z]+\}t\d+)=(.+)$")
+_CODE_RE = re.compile(r"@C\{[A-Z]+\}t\d+")
+_USED_CODE_RE = re.compile(r"@C\{[A-Z]+\}t\d+\b")
+
+
+def code_column(code: str) -> str:
+    """Column letters of a dictionary code: ``@C{AB}t7`` -> ``AB``."""
+    return code[3 : code.index("}")]
+
+
+def code_number(code: str) -> int:
+    """Number of a dictionary code within its column: ``@C{AB}t7`` -> 7."""
+    return int(code[code.index("}") + 2 :])
+
+
+def dict_block_lines(dictionary: Dict[str, str]) -> List[str]:
+    """``[DICT-BEGIN]``/``[COL X]``/``code=value``/``[DICT-END]`` lines for ``dictionary``, in its order."""
+    if not dictionary:
+        return []
+    lines = ["[DICT-BEGIN]"]
+    col = None
+    for code, value in dictionary.items():
+        c = code_column(code)
+        if c != col:
+            lines.append(f"[COL {c}]")
+            col = c
+        lines.append(f"{code}={value}")
+    lines.append("[DICT-END]")
+    return lines
+
+
+class EncodedDocument:
+    """
+    An encoded sheet as the stages produced it: the body ``lines``, the
+    ``dictionary`` (code -> quoted value, in DICT-block order) and its block
+    lines, per-code usage counts, the positions of ``[ANCHOR]`` lines and,
+    on demand, per-line token counts.
+
+    ``text`` (body, then the DICT block) is built on first access, so
+    chunking and expansion work on the lines without splitting the text or
+    searching it for the DICT block again. ``from_text`` parses an existing
+    text once; its ``text`` is that string unchanged.
+    """
+
+    def __init__(
+        self,
+        lines: List[str],
+        dictionary: Optional[Dict[str, str]] = None,
+        *,
+        dict_lines: Optional[List[str]] = None,
+        code_counts: Optional[Counter] = None,
+        anchors: Optional[List[int]] = None,
+        text: Optional[str] = None,
+    ) -> None:
+        self.lines = lines
+        self.dictionary: Dict[str, str] = dictionary or {}
+        self.dict_lines = dict_lines if dict_lines is not None else dict_block_lines(self.dictionary)
+        self.anchors = anchors if anchors is not None else [
+            i for i, ln in enumerate(lines) if ln.startswith("[ANCHOR]")
+        ]
+        self._code_counts = code_counts
+        self._text = text
+        self._line_tokens: Optional[List[int]] = None
+        self._line_tokens_counter: Optional[Callable[[str], int]] = None
+
+    @classmethod
+    def from_text(cls, text: str) -> "EncodedDocument":
+        """Split ``text`` into body lines and its (first) DICT block."""
+        m = _DICT_RE.search(text) if "[DICT-BEGIN]" in text else None
+        if m is None:
+            return cls(text.split("\n"), text=text)
+        dict_lines = m.group(0).rstrip().split("\n")
+        dictionary: Dict[str, str] = {}
+        for ln in dict_lines:
+            mm = _DICT_LINE_RE.match(ln.strip())
+            if mm:
+                dictionary[mm.group(1)] = mm.group(2)
+        return cls(text[: m.start()].rstrip().split("\n"), dictionary, dict_lines=dict_lines, text=text)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            body = "\n".join(self.lines)
+            self._text = body + "\n" + "\n".join(self.dict_lines) + "\n" if self.dict_lines else body
+        return self._text
+
+    @property
+    def code_counts(self) -> Counter:
+        """How often each dictionary code occurs in the body."""
+        if self._code_counts is None:
+            counts: Counter = Counter()
+            for ln in self.lines:
+                if "@C{" in ln:
+                    counts.update(_USED_CODE_RE.findall(ln))
+            self._code_counts = counts
+        return self._code_counts
+
+    def line_tokens(self, token_counter: Callable[[str], int]) -> List[int]:
+        """Token count of each body line with its line break; computed once per counter."""
+        if self._line_tokens is None or self._line_tokens_counter is not token_counter:
+            texts = [ln + "\n" for ln in self.lines]
+            if token_counter is count_tokens:
+                self._line_tokens = count_tokens_many(texts)
+            else:
+                self._line_tokens = [token_counter(t) for t in texts]
+            self._line_tokens_counter = token_counter
+        return self._line_tokens
+
+    def segments(self) -> List[range]:
+        """Line ranges that start at an ``[ANCHOR]`` line (the whole body when there is none)."""
+        n = len(self.lines)
+        if not self.anchors:
+            return [range(0, n)]
+        bounds = self.anchors + [n]
+        return [range(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def expanded(self) -> "EncodedDocument":
+        """A copy with dictionary codes in the body replaced by their values; the DICT block is kept."""
+        mapping = self.dictionary
+        if not mapping:
+            return self
+
+        def sub(m: re.Match) -> str:
+            return mapping.get(m.group(0), m.group(0))
+
+        lines = [_CODE_RE.sub(sub, ln) if "@C{" in ln else ln for ln in self.lines]
+        return EncodedDocument(lines, mapping, dict_lines=self.dict_lines, anchors=self.anchors)
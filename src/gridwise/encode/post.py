@@ -1,10 +1,16 @@
 from __future__ import annotations
 import re
-from typing import Dict, List
+from functools import partial
+from typing import Dict, List, Optional
+
+from gridwise.core.utils import addr_to_idx, idx_to_addr
+from gridwise.encode.compressor.dedup import REPEAT_RE, row_key, with_row
+from gridwise import profiling
 
 _DICT_BLOCK_RE = re.compile(r"\[DICT-BEGIN\](.*?)\[DICT-END\]", re.S)
 _DICT_LINE_RE  = re.compile(r"^(@C\{[A-Z]+\}t\d+)=(.+)$")
 _CODE_RE       = re.compile(r"@C\{[A-Z]+\}t\d+")
+_RANGE_RE      = re.compile(r"(?<![A-Za-z0-9])([A-Z]+\d+):([A-Z]+\d+)=([^|]*?)(?= \| |$)", re.M)
 
 def parse_dict_block(text: str) -> Dict[str, str]:
     m = _DICT_BLOCK_RE.search(text)
@@ -19,7 +25,60 @@ def parse_dict_block(text: str) -> Dict[str, str]:
             mapping[mm.group(1)] = mm.group(2)
     return mapping
 
-def expand_text_with_dict(text: str, mapping: Dict[str, str]) -> str:
+def _expand_range(m: re.Match) -> str:
+    r1, c1 = addr_to_idx(m.group(1))
+    r2, c2 = addr_to_idx(m.group(2))
+    rest = m.group(3)
+    return " | ".join(
+        f"{idx_to_addr(r, c)}={rest}" for r in range(r1, r2 + 1) for c in range(c1, c2 + 1)
+    )
+
+def expand_ranges(text: str) -> str:
+    """
+    Expand range entries written by ``to_range_markdown`` (``B2:B4='Yes'``)
+    back into per-cell entries (``B2='Yes' | B3='Yes' | B4='Yes'``), row-major,
+    in place on the same line.
+    """
+    if ":" not in text:
+        return text
+    return _RANGE_RE.sub(_expand_range, text)
+
+def expand_repeats(text: str, rows: Optional[Dict[int, str]] = None) -> str:
+    """
+    Expand ``[REPEAT of row R x N]`` / ``[REPEAT of rows R1-R2 x N]`` markers
+    written by the dedup stage back into rows, numbered after the preceding
+    line. ``rows`` (row number -> line) may be passed in to resolve
+    references across chunks; it is updated in place. Markers whose source
+    rows are unknown are left as they are.
+    """
+    if "[REPEAT of row" not in text and rows is None:
+        return text
+    rows = {} if rows is None else rows
+    last: Optional[int] = max(rows) if rows else None
+    out: List[str] = []
+    for ln in text.split("\n"):
+        m = REPEAT_RE.match(ln)
+        if m and last is not None:
+            a, b, n = int(m.group(1)), int(m.group(2) or m.group(1)), int(m.group(3))
+            if all(r in rows for r in range(a, b + 1)):
+                for _ in range(n):
+                    for r in range(a, b + 1):
+                        last += 1
+                        rows[last] = with_row(rows[r], last)
+                        out.append(rows[last])
+                continue
+        out.append(ln)
+        parsed = row_key(ln[8:] if ln.startswith("[ANCHOR]") else ln)
+        if parsed is not None:
+            last = parsed[0]
+            # keep the first copy: chunk overlaps repeat (possibly cut) earlier rows
+            rows.setdefault(last, ln[8:] if ln.startswith("[ANCHOR]") else ln)
+    return "\n".join(out)
+
+@profiling.staged("expand_dict")
+def expand_text_with_dict(text: str, mapping: Dict[str, str], expand_ranges_too: bool = False) -> str:
+    if expand_ranges_too:
+        text = expand_ranges(text)
     if not mapping:
         return text
     m = _DICT_BLOCK_RE.search(text)
@@ -34,21 +93,34 @@ def expand_text_with_dict(text: str, mapping: Dict[str, str]) -> str:
     expanded_suffix = _CODE_RE.sub(lambda mm: mapping.get(mm.group(0), mm.group(0)), suffix)
     return expanded_prefix + dict_block + expanded_suffix
 
-def expand_chunks_with_dict(chunks: List[dict]) -> List[dict]:
-    mapping: Dict[str, str] = {}
-    for ch in reversed(chunks):
+def _lookup(mapping: Dict[str, str], m: re.Match) -> str:
+    return mapping.get(m.group(0), m.group(0))
+
+
+def expand_chunks_with_dict(chunks: List[dict], expand_ranges_too: bool = False) -> List[dict]:
+    """
+    Expand dictionary codes in every chunk using the DICT block chunk.
+
+    Chunks tagged with a ``"table"`` key (see ``encode_tables``) are expanded
+    with their own table's dictionary. Other keys are kept.
+    """
+    mappings: Dict[object, Dict[str, str]] = {}
+    for ch in chunks:
         if "[DICT-BEGIN]" in ch["content"]:
             mapping = parse_dict_block(ch["content"])
             if mapping:
-                break
-    if not mapping:
+                mappings[ch.get("table")] = mapping
+    if not mappings and not expand_ranges_too:
         return chunks[:]
 
     out: List[dict] = []
     for ch in chunks:
+        mapping = mappings.get(ch.get("table"), {})
         content = ch["content"]
+        if expand_ranges_too:
+            content = expand_ranges(content)
         if "[DICT-BEGIN]" in content:
-            out.append({"id": ch["id"], "content": expand_text_with_dict(content, mapping)})
+            out.append({**ch, "content": expand_text_with_dict(content, mapping)})
         else:
-            out.append({"id": ch["id"], "content": _CODE_RE.sub(lambda mm: mapping.get(mm.group(0), mm.group(0)), content)})
+            out.append({**ch, "content": _CODE_RE.sub(partial(_lookup, mapping), content)})
     return out
@@ -0,0 +1,150 @@
+from __future__ import annotations
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from gridwise.core.model import Sheet, Cell
+from gridwise.core.formats import compact_value, format_tag
+from gridwise.core.utils import idx_to_addr
+from gridwise.encode.vanilla import preamble, render_value
+from gridwise import profiling
+
+# (row_start, row_end, key, first cell of the run)
+Run = Tuple[int, int, Hashable, Cell]
+
+
+def column_runs(
+    sheet: Sheet, key: Callable[[Cell], Optional[Hashable]], contiguous: bool = True
+) -> Dict[int, List[Run]]:
+    """
+    Scan each column top to bottom and group vertically contiguous cells with
+    equal ``key(cell)`` into runs. Cells whose key is None are skipped and
+    break the run. With ``contiguous=False`` runs also bridge rows that have
+    no cell at all (gaps in ``sheet.cells``).
+    """
+    by_col: Dict[int, List[Cell]] = {}
+    for c in sheet.cells:
+        by_col.setdefault(c.col, []).append(c)
+
+    runs: Dict[int, List[Run]] = {}
+    for col, cells in by_col.items():
+        cells.sort(key=lambda c: c.row)
+        out: List[Run] = []
+        start: Optional[Cell] = None
+        start_key: Optional[Hashable] = None
+        prev_row = -2
+        for c in cells:
+            k = key(c)
+            if start is not None and k is not None and k == start_key and (c.row == prev_row + 1 or not contiguous):
+                prev_row = c.row
+                continue
+            if start is not None:
+                out.append((start.row, prev_row, start_key, start))
+            start, start_key, prev_row = (c, k, c.row) if k is not None else (None, None, -2)
+        if start is not None:
+            out.append((start.row, prev_row, start_key, start))
+        runs[col] = out
+    return runs
+
+
+def merge_rectangles(runs: Dict[int, List[Run]]) -> List[Tuple[int, int, int, int, Hashable]]:
+    """Join runs with the same rows and key in adjacent columns into (r1, c1, r2, c2, key) rectangles."""
+    rects: List[List] = []
+    open_rects: Dict[Tuple[int, int, Hashable], List] = {}
+    for col in sorted(runs):
+        for r1, r2, k, _ in runs[col]:
+            rect = open_rects.get((r1, r2, k))
+            if rect is not None and rect[3] == col - 1:
+                rect[3] = col
+            else:
+                rect = [r1, col, r2, col, k]
+                rects.append(rect)
+                open_rects[(r1, r2, k)] = rect
+    return [(r1, c1, r2, c2, k) for r1, c1, r2, c2, k in rects]
+
+
+def range_addr(r1: int, c1: int, r2: int, c2: int) -> str:
+    a = idx_to_addr(r1, c1)
+    return a if (r1, c1) == (r2, c2) else f"{a}:{idx_to_addr(r2, c2)}"
+
+
+def format_declarations(sheet: Sheet) -> List[str]:
+    """
+    Hoist number formats into ``[META] fmt=<range> <tag>`` lines.
+
+    Each non-empty, non-header cell is mapped to its short type tag
+    (``format_tag``). Runs of equal tags down a column, bridging empty cells,
+    are merged into rectangles across adjacent columns. "General" cells break
+    runs but get no declaration.
+    """
+    def key(c: Cell) -> Optional[Hashable]:
+        if c.fmt == "header" or c.dtype == "empty" or c.value is None:
+            return None
+        return format_tag(c.fmt) or ""
+
+    view = Sheet(sheet.name, sheet.nrows, sheet.ncols,
+                 [c for c in sheet.cells if key(c) is not None])
+    rects = merge_rectangles(column_runs(view, key, contiguous=False))
+    rects.sort(key=lambda r: (r[1], r[0]))
+    return [f"[META] fmt={range_addr(r1, c1, r2, c2)} {tag}" for r1, c1, r2, c2, tag in rects if tag]
+
+
+@profiling.staged("to_range_markdown")
+def to_range_markdown(sheet: Sheet, include_format: bool = True, compact_formats: bool = False) -> str:
+    """
+    Range-merged variant of ``to_markdown``.
+
+    Contiguous cells sharing a rendered value (and format, if
+    ``include_format``) are emitted once as a rectangular range, e.g.
+    ``B2:B400='Yes'`` or ``B2:D2=0::0.00``. Empty cells are omitted. Each
+    line lists the entries that start on one row, so rows that are fully
+    covered by ranges from above produce no line. Use
+    ``gridwise.encode.post.expand_ranges`` to turn ranges back into
+    per-cell entries. Merged blocks are written as one range entry each.
+
+    With ``compact_formats=True`` values are rendered with ``compact_value``
+    and number formats are hoisted into ``format_declarations`` lines instead
+    of being repeated on every entry (only ``::header`` stays inline).
+    """
+    render = compact_value if compact_formats else render_value
+
+    def key(c: Cell) -> Optional[Hashable]:
+        if c.dtype == "empty" or c.value is None:
+            return None
+        fmt = c.fmt if include_format else None
+        if compact_formats and fmt != "header":
+            fmt = None
+        return (render(c.value), fmt)
+
+    # merged blocks are emitted as their own rectangle and never joined with neighbours
+    merged_rects: List[Tuple[int, int, int, int, Hashable]] = []
+    view = sheet
+    if sheet.merged_regions:
+        index = sheet.region_index()
+        cells = []
+        for c in sheet.cells:
+            region = index.region_at(c.row, c.col)
+            if region is None:
+                cells.append(c)
+            elif (region[0], region[1]) == (c.row, c.col) and key(c) is not None:
+                merged_rects.append((region[0], region[1], region[2], region[3], key(c)))
+        view = Sheet(sheet.name, sheet.nrows, sheet.ncols, cells)
+
+    rects = merge_rectangles(column_runs(view, key)) + merged_rects
+    rects.sort(key=lambda r: (r[0], r[1]))
+
+    lines = preamble(sheet)
+    if compact_formats and include_format:
+        lines.extend(format_declarations(sheet))
+    row_entries: List[str] = []
+    cur_row = -1
+    for r1, c1, r2, c2, (val, fmt) in rects:  # type: ignore[misc]
+        if r1 != cur_row and row_entries:
+            lines.append(" | ".join(row_entries))
+            row_entries = []
+        cur_row = r1
+        entry = f"{range_addr(r1, c1, r2, c2)}={val}"
+        if fmt:
+            entry += f"::{fmt}"
+        row_entries.append(entry)
+    if row_entries:
+        lines.append(" | ".join(row_entries))
+    return "\n".join(lines)
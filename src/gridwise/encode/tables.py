@@ -0,0 +1,111 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from gridwise import profiling
+from gridwise.core.model import Sheet, BestEncodeResult, is_blank
+from gridwise.core.regions import Region, detect_table_regions
+from gridwise.encode.best import best_encode
+from gridwise.encode.ranges import range_addr
+
+
+def table_subsheet(sheet: Sheet, region: Region, mark_header: bool = True) -> Sheet:
+    """
+    Cut ``region`` out of ``sheet`` as a sheet of its own.
+
+    Cells keep their original addresses, so encoded text still points into
+    the source sheet. With ``mark_header=True`` the region's first row is
+    tagged ``::header`` when all of its cells are text, giving each table its
+    own header anchor.
+    """
+    r1, c1, r2, c2 = region
+    cells = [c for c in sheet.cells if r1 <= c.row <= r2 and c1 <= c.col <= c2]
+    if mark_header:
+        first = [c for c in cells if c.row == r1 and not is_blank(c)]
+        if first and all(c.dtype == "text" for c in first):
+            cells = [replace(c, fmt="header") if c.row == r1 and c.dtype == "text" and not is_blank(c) else c
+                     for c in cells]
+    merged = [m for m in sheet.merged_regions or () if r1 <= m[0] <= r2 and c1 <= m[1] <= c2] or None
+    return Sheet(
+        name=f"{sheet.name}!{range_addr(r1, c1, r2, c2)}",
+        nrows=r2 + 1,
+        ncols=c2 + 1,
+        cells=cells,
+        merged_regions=merged,
+        frozen=sheet.frozen,
+        sparse=sheet.sparse,
+    )
+
+
+def _encode_one(args: Tuple[Sheet, Dict]) -> BestEncodeResult:
+    sub, kwargs = args
+    return best_encode(sub, skip_blank_rows=True, **kwargs)
+
+
+def encode_tables(
+    sheet: Sheet,
+    *,
+    max_workers: Optional[int] = None,
+    min_cells: int = 2,
+    mark_header: bool = True,
+    **best_encode_kwargs,
+) -> BestEncodeResult:
+    """
+    Encode each independent table on a sheet separately.
+
+    Tables are found with ``detect_table_regions``; each one is encoded with
+    ``best_encode`` as its own sub-sheet, so it gets its own header anchor,
+    column dictionaries and aggregation stats instead of sharing them with
+    unrelated data. Tables are encoded in a process pool of ``max_workers``
+    (``max_workers=1`` or a single table runs inline).
+
+    The results are stitched in reading order: chunk ids are renumbered
+    across tables and every chunk carries ``"table"`` (index) and
+    ``"region"`` (e.g. ``"A1:D20"``) keys; ``save_chunks_jsonl`` keeps them.
+    Each table's DICT block stays in its own chunk, and
+    ``expand_chunks_with_dict`` resolves codes per table.
+
+    Remaining keyword arguments are passed to ``best_encode``.
+    """
+    regions = detect_table_regions(sheet, min_cells=min_cells)
+    if not regions:
+        regions = [(0, 0, max(sheet.nrows - 1, 0), max(sheet.ncols - 1, 0))]
+    jobs = [(table_subsheet(sheet, reg, mark_header), best_encode_kwargs) for reg in regions]
+
+    if max_workers == 1 or len(jobs) == 1:
+        results = [_encode_one(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as ex:
+            results = list(ex.map(_encode_one, jobs))
+        # worker processes profile on their own; fold their timings into ours
+        for res in results:
+            profiling.merge(res.meta.get("timings", {}))
+
+    chunks: List[Dict] = []
+    tables: List[Dict] = []
+    for i, (reg, res) in enumerate(zip(regions, results)):
+        addr = range_addr(*reg)
+        for ch in res.chunks:
+            chunks.append({**ch, "id": len(chunks), "sheet": sheet.name, "table": i, "region": addr})
+        tables.append({
+            "table": i,
+            "region": addr,
+            "kind": res.kind,
+            "tokens_vanilla": res.tokens_vanilla,
+            "tokens_compressed": res.tokens_compressed,
+            "chunks": len(res.chunks),
+            "meta": res.meta,
+        })
+
+    any_compressed = any(r.tokens_compressed is not None for r in results)
+    return BestEncodeResult(
+        text="\n\n".join(r.text for r in results),
+        kind="tables",
+        tokens_vanilla=sum(r.tokens_vanilla for r in results),
+        tokens_compressed=sum(
+            r.tokens_compressed if r.tokens_compressed is not None else r.tokens_vanilla for r in results
+        ) if any_compressed else None,
+        chunks=chunks,
+        meta={"tables": tables},
+    )
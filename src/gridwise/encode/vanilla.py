@@ -1,34 +1,87 @@
 from __future__ import annotations
-from typing import List
+from typing import Any, List
 from gridwise.core.model import Sheet, Cell
+from gridwise import profiling
 
-def to_markdown(sheet: Sheet, include_format: bool = True) -> str:
+def render_value(value: Any) -> str:
+    if isinstance(value, str):
+        return repr(value)
+    return "NaN" if (isinstance(value, float) and value != value) else repr(value)
+
+def preamble(sheet: Sheet) -> List[str]:
     lines: List[str] = [f"# Sheet: {sheet.name} ({sheet.nrows}x{sheet.ncols})"]
     if sheet.frozen:
         fr, fc = sheet.frozen
         lines.append(f"[META] frozen_rows={fr} frozen_cols={fc}")
-    if sheet.merged_regions:
-        for (r1, c1, r2, c2) in sheet.merged_regions:
-            lines.append(f"[META] merged={r1},{c1},{r2},{c2}")
+    return lines
+
+def cell_ref(sheet: Sheet, c: Cell) -> str:
+    """Cell address, or the full range (``A1:C1``) for the top-left cell of a merged block."""
+    region = sheet.region_at(c.row, c.col)
+    if region and (region[0], region[1]) == (c.row, c.col):
+        from gridwise.core.utils import idx_to_addr
+        return f"{c.address}:{idx_to_addr(region[2], region[3])}"
+    return c.address
+
+@profiling.staged("to_markdown")
+def to_markdown(
+    sheet: Sheet,
+    include_format: bool = True,
+    skip_blank_rows: bool = False,
+    compact_formats: bool = False,
+) -> str:
+    """
+    Serialize a sheet as one ``ADDR=value[::fmt]`` line per row.
+
+    A merged block is written once, at its top-left cell, as a range entry
+    (``A1:C1='Q3 Report'``); the cells it covers are not rendered.
+
+    With ``compact_formats=True`` values are rendered in compact form (ISO
+    dates instead of ``datetime.datetime(...)`` reprs, unwrapped NumPy
+    scalars), and number formats are declared once per range as
+    ``[META] fmt=B2:B500 cur`` lines with short type tags instead of being
+    appended to every cell. Only ``::header`` stays inline.
+
+    A sparse sheet (``Sheet.sparse``) is rendered from its row offsets and
+    its blank rows are always skipped; blank columns never produce entries.
+    """
+    render = render_value
+    inline_fmt = include_format
+    lines = preamble(sheet)
+    if compact_formats:
+        from gridwise.core.formats import compact_value
+        from gridwise.encode.ranges import format_declarations
+        render = compact_value
+        inline_fmt = False
+        if include_format:
+            lines.extend(format_declarations(sheet))
 
-    rows: List[List[Cell]] = [[] for _ in range(sheet.nrows)]
-    for c in sheet.cells:
-        if 0 <= c.row < sheet.nrows:
-            rows[c.row].append(c)
+    merged = bool(sheet.merged_regions)
+    if sheet.sparse:
+        # cells are already non-empty and row-sorted; blank rows are skipped
+        offsets = sheet.row_offsets()
+        cells = sheet.cells
+        row_iter = (cells[offsets[r] : offsets[r + 1]] for r in range(sheet.nrows) if offsets[r] < offsets[r + 1])
+    else:
+        rows: List[List[Cell]] = [[] for _ in range(sheet.nrows)]
+        for c in sheet.cells:
+            if 0 <= c.row < sheet.nrows:
+                rows[c.row].append(c)
+        row_iter = (sorted(row, key=lambda c: c.col) for row in rows)
 
-    for r in range(sheet.nrows):
-        row = sorted(rows[r], key=lambda c: c.col)
+    skip_blank_rows = skip_blank_rows or sheet.sparse
+    for row in row_iter:
+        if merged:
+            row = [c for c in row if not sheet.region_index().is_covered(c.row, c.col)]
         if not row:
-            lines.append("")
+            if not skip_blank_rows:
+                lines.append("")
             continue
         md_row = []
         for c in row:
-            if isinstance(c.value, str):
-                val = repr(c.value)
-            else:
-                val = "NaN" if (isinstance(c.value, float) and c.value != c.value) else repr(c.value)
-            base = f"{c.address}={val}"
-            if include_format and c.fmt:
+            addr = cell_ref(sheet, c) if merged else c.address
+            base = f"{addr}={render(c.value)}"
+            if c.fmt and (inline_fmt or (include_format and c.fmt == "header")):
                 base += f"::{c.fmt}"
             md_row.append(base)
         lines.append(" | ".join(md_row))
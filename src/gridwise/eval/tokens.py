@@ -1,7 +1,45 @@
-def count_tokens(text: str) -> int:
+from typing import List
+from functools import lru_cache
+
+from gridwise import profiling
+
+
+@lru_cache(maxsize=None)
+def _encoding():
+    # loaded once per process; None (tiktoken missing or unusable) is cached too
     try:
-        import tiktoken  
-        enc = tiktoken.encoding_for_model("gpt-4")
-        return len(enc.encode(text))
+        import tiktoken
+        return tiktoken.encoding_for_model("gpt-4")
     except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    profiling.count("tokenizer_calls")
+    with profiling.stage("tokenize") as st:
+        st.text_in(text)
+        enc = _encoding()
+        if enc is not None:
+            try:
+                return len(enc.encode(text))
+            except Exception:
+                pass
         return max(1, len(text) // 4)
+
+
+def count_tokens_many(texts: List[str]) -> List[int]:
+    """``count_tokens`` for each of ``texts``, as one profiling stage instead of one per text."""
+    profiling.count("tokenizer_calls", len(texts))
+    with profiling.stage("tokenize") as st:
+        enc = _encoding()
+        out: List[int] = []
+        for text in texts:
+            st.text_in(text)
+            n = None
+            if enc is not None:
+                try:
+                    n = len(enc.encode(text))
+                except Exception:
+                    pass
+            out.append(max(1, len(text) // 4) if n is None else n)
+        return out
@@ -1,4 +1,23 @@
-from .loaders import from_dataframe, from_csv, from_xlsx
-from .xlsx_loader import from_xlsx_rich
+import importlib
+
+# loaded on first use: the loaders pull in pandas, the rich xlsx loader openpyxl
+_LAZY = {
+    "from_dataframe": ".loaders",
+    "from_csv": ".loaders",
+    "from_xlsx": ".loaders",
+    "from_xlsx_rich": ".xlsx_loader",
+}
 
 __all__ = ["from_dataframe", "from_csv", "from_xlsx", "from_xlsx_rich"]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
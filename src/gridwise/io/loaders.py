@@ -1,31 +1,54 @@
 from __future__ import annotations
+import os
 import pandas as pd
-from typing import List
+import numpy as np
+from typing import List, Optional, Sequence
+from gridwise import profiling
+from gridwise.core.dtypes import TypeInference, infer_column
 from gridwise.core.model import Sheet, Cell
-from gridwise.core.utils import idx_to_addr, infer_dtype
+from gridwise.core.utils import idx_to_addr
 
-def from_dataframe(df: pd.DataFrame, name: str = "Sheet1") -> Sheet:
-    cells: List[Cell] = []
-    df_reset = df.reset_index(drop=True)
-    df_reset.columns = [str(c) for c in df_reset.columns]
-    nrows, ncols = df_reset.shape
-    # header
-    for j, col in enumerate(df_reset.columns):
-        addr = idx_to_addr(0, j)
-        cells.append(Cell(row=0, col=j, address=addr, value=col, dtype="text", fmt="header"))
-    # data
-    for i in range(nrows):
-        for j in range(ncols):
-            val = df_reset.iat[i, j]
-            addr = idx_to_addr(i + 1, j)
-            cells.append(Cell(row=i + 1, col=j, address=addr, value=val, dtype=infer_dtype(val)))
-    return Sheet(name=name, nrows=nrows + 1, ncols=ncols, cells=cells)
+def _column_values(col: pd.Series) -> Sequence:
+    """The values of ``col`` as ``DataFrame.iat`` returns them (NumPy scalars for NumPy numeric dtypes)."""
+    if isinstance(col.dtype, np.dtype):
+        return col.to_numpy() if col.dtype.kind in "biufc" else col.to_numpy(dtype=object)
+    return list(col.array)
 
-def from_csv(path: str, name: str | None = None, **read_csv_kwargs) -> Sheet:
-    df = pd.read_csv(path, **read_csv_kwargs)
-    return from_dataframe(df, name=name or (path.split("/")[-1].split(".")[0]))
+def from_dataframe(df: pd.DataFrame, name: str = "Sheet1", types: Optional[TypeInference] = None) -> Sheet:
+    """
+    Lay ``df`` out as a sheet: the column names as a header row, then the
+    values. Cell dtypes are inferred a column at a time (``infer_column``);
+    ``types`` configures the date detection.
+    """
+    with profiling.stage("from_dataframe") as st:
+        cells: List[Cell] = []
+        df_reset = df.reset_index(drop=True)
+        df_reset.columns = [str(c) for c in df_reset.columns]
+        nrows, ncols = df_reset.shape
+        # header
+        for j, col in enumerate(df_reset.columns):
+            addr = idx_to_addr(0, j)
+            cells.append(Cell(row=0, col=j, address=addr, value=col, dtype="text", fmt="header"))
+        # data
+        columns = [df_reset.iloc[:, j] for j in range(ncols)]
+        values = [_column_values(col) for col in columns]
+        labels = [infer_column(col, types) for col in columns]
+        for i in range(nrows):
+            for j in range(ncols):
+                addr = idx_to_addr(i + 1, j)
+                cells.append(Cell(row=i + 1, col=j, address=addr, value=values[j][i], dtype=labels[j][i]))
+        st.add(lines_in=nrows, cells=len(cells))
+        return Sheet(name=name, nrows=nrows + 1, ncols=ncols, cells=cells)
 
-def from_xlsx(path: str, sheet_name: str | None = None) -> Sheet:
-    df = pd.read_excel(path, sheet_name=sheet_name or 0, engine="openpyxl")
-    name = sheet_name if isinstance(sheet_name, str) else "Sheet1"
-    return from_dataframe(df, name=name)
+def from_csv(path: str, name: str | None = None, types: Optional[TypeInference] = None, **read_csv_kwargs) -> Sheet:
+    with profiling.stage("load_csv", bytes_in=os.path.getsize(path)):
+        with profiling.stage("read_csv"):
+            df = pd.read_csv(path, **read_csv_kwargs)
+        return from_dataframe(df, name=name or (path.split("/")[-1].split(".")[0]), types=types)
+
+def from_xlsx(path: str, sheet_name: str | None = None, types: Optional[TypeInference] = None) -> Sheet:
+    with profiling.stage("load_xlsx", bytes_in=os.path.getsize(path)):
+        with profiling.stage("read_excel"):
+            df = pd.read_excel(path, sheet_name=sheet_name or 0, engine="openpyxl")
+        name = sheet_name if isinstance(sheet_name, str) else "Sheet1"
+        return from_dataframe(df, name=name, types=types)
@@ -1,53 +1,131 @@
 from __future__ import annotations
-from typing import List, Tuple, Optional
+import os
+from typing import Any, Iterator, List, Tuple, Optional
 from openpyxl import load_workbook
+from gridwise import profiling
 from gridwise.core.model import Sheet, Cell
-from gridwise.core.utils import idx_to_addr, infer_dtype
-
-def from_xlsx_rich(path: str, sheet_name: str | None = None) -> Sheet:
-    wb = load_workbook(filename=path, data_only=True, read_only=False)
-    ws = wb[sheet_name] if sheet_name else wb.active
-
-    max_row = ws.max_row or 0
-    max_col = ws.max_column or 0
-    nrows = max_row
-    ncols = max_col
-
-    merged_regions: List[Tuple[int, int, int, int]] = []
-    for mr in ws.merged_cells.ranges:
-        r1, c1, r2, c2 = mr.min_row - 1, mr.min_col - 1, mr.max_row - 1, mr.max_col - 1
-        merged_regions.append((r1, c1, r2, c2))
-
-    frozen_rows = 0
-    frozen_cols = 0
-    if ws.freeze_panes:
-        fr = ws.freeze_panes
-        frozen_rows = (fr.row or 1) - 1 if fr.row else 0
-        frozen_cols = (fr.col_idx or 1) - 1 if getattr(fr, "col_idx", None) else 0
-
-    cells: List[Cell] = []
-    header_row_index: Optional[int] = None
-    for i in range(nrows):
-        if any((ws.cell(row=i + 1, column=j + 1).value not in (None, "")) for j in range(ncols)):
-            header_row_index = i
-            break
-
-    for i in range(nrows):
-        for j in range(ncols):
-            xl = ws.cell(row=i + 1, column=j + 1)
-            val = xl.value
-            nfs = xl.number_format if xl.number_format else None
-            addr = idx_to_addr(i, j)
-            fmt = "header" if (header_row_index is not None and i == header_row_index) else nfs
-            cells.append(
-                Cell(row=i, col=j, address=addr, value=val, dtype=infer_dtype(val), fmt=fmt)
-            )
-
-    return Sheet(
-        name=ws.title,
-        nrows=nrows,
-        ncols=ncols,
-        cells=cells,
-        merged_regions=merged_regions or None,
-        frozen=(frozen_rows, frozen_cols) if (frozen_rows or frozen_cols) else None,
-    )
+from gridwise.core.regions import RegionIndex
+from gridwise.core.dtypes import TypeInference, infer_column
+from gridwise.core.utils import idx_to_addr
+
+def _cell_store(ws) -> Optional[dict]:
+    """
+    openpyxl's ``{(row, col): cell}`` map of the cells a worksheet stores.
+    It is private, so it is only used when it has the expected shape;
+    otherwise None.
+    """
+    stored = getattr(ws, "_cells", None)
+    if not isinstance(stored, dict):
+        return None
+    for key, xl in stored.items():
+        ok = isinstance(key, tuple) and len(key) == 2 and (getattr(xl, "row", None), getattr(xl, "column", None)) == key
+        return stored if ok else None
+    return stored
+
+def _stored_cells(ws) -> Iterator[Tuple[int, int, Any]]:
+    """
+    (row, col, cell) for the cells ``ws`` actually stores, zero-based and in
+    row-major order. Unlike ``ws.cell``/``iter_rows`` this does not visit (or
+    create) every coordinate of the used range, which stray formatting can
+    stretch to ``A1:XFD50000`` around a few thousand values. Without a
+    recognizable cell map (``_cell_store``) it falls back to ``iter_rows``
+    over the used range.
+    """
+    stored = _cell_store(ws)
+    if stored is None:
+        for row in ws.iter_rows(min_row=ws.min_row, max_row=ws.max_row, min_col=ws.min_column,
+                                max_col=ws.max_column, values_only=False):
+            for xl in row:
+                yield xl.row - 1, xl.column - 1, xl
+        return
+    for r, c in sorted(stored):
+        yield r - 1, c - 1, stored[(r, c)]
+
+def from_xlsx_rich(
+    path: str,
+    sheet_name: str | None = None,
+    types: Optional[TypeInference] = None,
+    sparse: bool = False,
+) -> Sheet:
+    """
+    Load a worksheet with its merged regions, frozen panes and number formats.
+
+    By default every coordinate of the used range becomes a ``Cell``. With
+    ``sparse=True`` only cells holding a value are read and kept, sorted by
+    (row, col), and the sheet's size is the data's bounding box rather than
+    the used range; see ``Sheet.sparse``.
+    """
+    with profiling.stage("load_xlsx_rich", bytes_in=os.path.getsize(path)) as st:
+        wb = load_workbook(filename=path, data_only=True, read_only=False)
+        ws = wb[sheet_name] if sheet_name else wb.active
+
+        max_row = ws.max_row or 0
+        max_col = ws.max_column or 0
+        nrows = max_row
+        ncols = max_col
+
+        merged_regions: List[Tuple[int, int, int, int]] = []
+        for mr in ws.merged_cells.ranges:
+            r1, c1, r2, c2 = mr.min_row - 1, mr.min_col - 1, mr.max_row - 1, mr.max_col - 1
+            merged_regions.append((r1, c1, r2, c2))
+
+        frozen_rows = 0
+        frozen_cols = 0
+        if ws.freeze_panes:
+            fr = ws.freeze_panes
+            frozen_rows = (fr.row or 1) - 1 if fr.row else 0
+            frozen_cols = (fr.col_idx or 1) - 1 if getattr(fr, "col_idx", None) else 0
+
+        # merged blocks keep only their top-left cell; covered coordinates resolve
+        # to it through Sheet.region_at / Sheet.resolve
+        regions = RegionIndex(merged_regions)
+        entries: List[Tuple[int, int, object, Optional[str]]] = []
+        header_row_index: Optional[int] = None
+        if sparse:
+            for i, j, xl in _stored_cells(ws):
+                val = xl.value
+                if val is None or val == "" or (regions.regions and regions.is_covered(i, j)):
+                    continue
+                if header_row_index is None:
+                    header_row_index = i
+                fmt = "header" if i == header_row_index else (xl.number_format or None)
+                entries.append((i, j, val, fmt))
+            # the data's extent, not the used range
+            nrows = max([e[0] for e in entries[-1:]] + [r2 for _, _, r2, _ in merged_regions], default=-1) + 1
+            ncols = max([e[1] for e in entries] + [c2 for _, _, _, c2 in merged_regions], default=-1) + 1
+        else:
+            for i in range(nrows):
+                if any((ws.cell(row=i + 1, column=j + 1).value not in (None, "")) for j in range(ncols)):
+                    header_row_index = i
+                    break
+
+            for i in range(nrows):
+                for j in range(ncols):
+                    if regions.regions and regions.is_covered(i, j):
+                        continue
+                    xl = ws.cell(row=i + 1, column=j + 1)
+                    val = xl.value
+                    nfs = xl.number_format if xl.number_format else None
+                    fmt = "header" if (header_row_index is not None and i == header_row_index) else nfs
+                    entries.append((i, j, val, fmt))
+
+        # dtypes are inferred per column once all values are read
+        col_values: List[list] = [[] for _ in range(ncols)]
+        for _, j, val, _ in entries:
+            col_values[j].append(val)
+        labels = [iter(infer_column(vals, types)) for vals in col_values]
+        cells: List[Cell] = [
+            Cell(row=i, col=j, address=idx_to_addr(i, j), value=val, dtype=next(labels[j]), fmt=fmt)
+            for i, j, val, fmt in entries
+        ]
+
+        st.add(cells=len(cells), lines_in=nrows)
+        return Sheet(
+            name=ws.title,
+            nrows=nrows,
+            ncols=ncols,
+            cells=cells,
+            merged_regions=merged_regions or None,
+            frozen=(frozen_rows, frozen_cols) if (frozen_rows or frozen_cols) else None,
+            sparse=sparse,
+        )
@@ -0,0 +1,258 @@
+from __future__ import annotations
+import functools, json, time, warnings
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# counters a stage can report besides wall time and call count
+COUNTERS = ("bytes_in", "bytes_out", "lines_in", "lines_out", "cells", "tokenizer_calls")
+
+Hook = Callable[[Dict], None]
+
+_current: ContextVar[Optional["Profiler"]] = ContextVar("gridwise_profiler", default=None)
+_hooks: List[Hook] = []
+
+
+def _text_size(text: str) -> tuple:
+    # isascii() is O(1) on CPython, so ASCII text is never re-encoded just to be measured
+    nbytes = len(text) if text.isascii() else len(text.encode("utf-8"))
+    return nbytes, (text.count("\n") + 1 if text else 0)
+
+
+class Stage:
+    """
+    One running stage. Counters are added with ``add`` or, for text, with
+    ``text_in`` / ``text_out`` (UTF-8 bytes and lines; only measured while
+    something is listening).
+    """
+
+    __slots__ = ("name", "path", "counters", "_t0")
+
+    def __init__(self, name: str, path: str) -> None:
+        self.name = name
+        self.path = path
+        self.counters: Dict[str, int] = {}
+        self._t0 = 0.0
+
+    def add(self, **counters: int) -> None:
+        c = self.counters
+        for k, v in counters.items():
+            c[k] = c.get(k, 0) + int(v)
+
+    def text_in(self, text: str) -> None:
+        b, n = _text_size(text)
+        self.add(bytes_in=b, lines_in=n)
+
+    def text_out(self, text: str) -> None:
+        b, n = _text_size(text)
+        self.add(bytes_out=b, lines_out=n)
+
+
+class _NullStage:
+    """Returned by ``stage`` when nothing is listening; every call is a no-op."""
+
+    __slots__ = ()
+    name = path = ""
+    counters: Dict[str, int] = {}
+
+    def add(self, **counters: int) -> None:
+        pass
+
+    def text_in(self, text: str) -> None:
+        pass
+
+    def text_out(self, text: str) -> None:
+        pass
+
+
+_NULL = _NullStage()
+
+
+class Profiler:
+    """
+    Collects per-stage wall time and counters.
+
+    Stages are keyed by their nesting path (``best_encode/compress/anchors``)
+    and aggregated over repeated calls. Activate with ``profile()``; the
+    library code reports through ``stage()`` and ``count()``.
+    """
+
+    def __init__(self, on_stage: Optional[Hook] = None, parent: Optional["Profiler"] = None) -> None:
+        self.on_stage = on_stage
+        self.parent = parent
+        self.stats: Dict[str, Dict] = {}
+        self._stack: List[Stage] = []
+
+    def _record(self, path: str, seconds: float, counters: Dict[str, int], calls: int = 1) -> None:
+        st = self.stats.get(path)
+        if st is None:
+            st = self.stats[path] = {"calls": 0, "seconds": 0.0}
+        st["calls"] += calls
+        st["seconds"] += seconds
+        for k, v in counters.items():
+            st[k] = st.get(k, 0) + v
+
+    def report(self) -> Dict[str, Dict]:
+        """``{path: {"calls", "seconds", <counters>...}}`` in first-entered order."""
+        return {p: dict(st, seconds=round(st["seconds"], 6)) for p, st in self.stats.items()}
+
+
+@contextmanager
+def profile(on_stage: Optional[Hook] = None) -> Iterator[Profiler]:
+    """
+    Profile the enclosed code. ``on_stage`` is called with an event dict for
+    every finished stage (see ``add_hook``).
+
+    Profiles nest: when one is already active, the inner profiler's stats are
+    also merged into the outer one under the outer's current stage, so e.g.
+    ``best_encode`` can report its own ``meta["timings"]`` while a CLI-level
+    ``--profile`` still sees everything.
+    """
+    outer = _current.get()
+    prof = Profiler(on_stage, parent=outer)
+    token = _current.set(prof)
+    try:
+        yield prof
+    finally:
+        _current.reset(token)
+        if outer is not None:
+            _merge(outer, prof.stats)
+
+
+def _merge(prof: Profiler, report: Dict[str, Dict]) -> None:
+    prefix = prof._stack[-1].path + "/" if prof._stack else ""
+    for path, st in report.items():
+        counters = {k: v for k, v in st.items() if k not in ("calls", "seconds")}
+        prof._record(prefix + path, st["seconds"], counters, calls=st["calls"])
+
+
+def merge(report: Dict[str, Dict]) -> None:
+    """
+    Add a ``Profiler.report()`` produced elsewhere (e.g. ``meta["timings"]``
+    returned from a worker process) to the active profiler, under its
+    current stage. No-op without an active profiler.
+    """
+    prof = _current.get()
+    if prof is not None:
+        _merge(prof, report)
+
+
+def add_hook(hook: Hook) -> Hook:
+    """
+    Register a process-wide callback, e.g. a metrics exporter. It receives
+    ``{"stage", "path", "seconds", <counters>...}`` after every stage, whether
+    or not a profiler is active. Returns ``hook`` for use with ``remove_hook``.
+    """
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook: Hook) -> None:
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def _emit(prof: Optional[Profiler], event: Dict) -> None:
+    targets = list(_hooks)
+    if prof is not None and prof.on_stage is not None:
+        targets.append(prof.on_stage)
+    for hook in targets:
+        try:
+            hook(event)
+        except Exception as e:  # a broken exporter must not break encoding
+            warnings.warn(f"gridwise profiling hook failed: {e!r}", RuntimeWarning)
+
+
+@contextmanager
+def stage(name: str, **counters: int) -> Iterator[Stage]:
+    """
+    Time the enclosed block as stage ``name`` and yield a ``Stage`` to add
+    counters to. Costs one context-variable lookup when no profiler is active
+    and no hook is registered.
+    """
+    prof = _current.get()
+    if prof is None and not _hooks:
+        yield _NULL  # type: ignore[misc]
+        return
+    parent = prof._stack[-1].path + "/" if prof is not None and prof._stack else ""
+    st = Stage(name, parent + name)
+    if counters:
+        st.add(**counters)
+    if prof is not None:
+        prof._stack.append(st)
+        prof.stats.setdefault(st.path, {"calls": 0, "seconds": 0.0})  # report parents first
+    st._t0 = time.perf_counter()
+    try:
+        yield st
+    finally:
+        seconds = time.perf_counter() - st._t0
+        if prof is not None:
+            prof._stack.pop()
+            prof._record(st.path, seconds, st.counters)
+        _emit(prof, {"stage": name, "path": st.path, "seconds": seconds, **st.counters})
+
+
+def staged(name: str) -> Callable:
+    """
+    Decorator running a function as stage ``name``. A ``str`` first argument
+    is measured as input text, a sheet (anything with ``.cells``) as cells
+    processed, and a ``str`` result (or the first item of a tuple result, as
+    returned by the ``apply_*`` compressor stages, or a result dict's
+    ``"content"``) as output text.
+    """
+
+    def wrap(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def inner(*args: Any, **kwargs: Any) -> Any:
+            if _current.get() is None and not _hooks:
+                return fn(*args, **kwargs)
+            with stage(name) as st:
+                first = args[0] if args else None
+                if isinstance(first, str):
+                    st.text_in(first)
+                elif getattr(first, "cells", None) is not None:
+                    st.add(cells=len(first.cells))
+                out = fn(*args, **kwargs)
+                text = out[0] if isinstance(out, tuple) and out else out
+                if isinstance(text, dict):
+                    text = text.get("content")
+                if isinstance(text, str):
+                    st.text_out(text)
+                return out
+
+        return inner
+
+    return wrap
+
+
+def count(counter: str, n: int = 1) -> None:
+    """Add ``n`` to ``counter`` on every open stage, including those of enclosing profilers."""
+    prof = _current.get()
+    while prof is not None:
+        for st in prof._stack:
+            st.add(**{counter: n})
+        prof = prof.parent
+
+
+def format_report(report: Dict[str, Dict], fmt: str = "table") -> str:
+    """Render ``Profiler.report()`` as an indented text table or as JSON."""
+    if fmt == "json":
+        return json.dumps(report, indent=2)
+    roots = [st["seconds"] for p, st in report.items() if "/" not in p]
+    total = sum(roots) or 1.0
+    cols = ["calls", "seconds", "%"] + list(COUNTERS)
+    rows = [["stage"] + cols]
+    for path, st in report.items():
+        depth = path.count("/")
+        row = ["  " * depth + path.rsplit("/", 1)[-1], str(st["calls"]),
+               f"{st['seconds']:.4f}", f"{100 * st['seconds'] / total:.1f}"]
+        row += [str(st[k]) if k in st else "" for k in COUNTERS]
+        rows.append(row)
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+    lines = []
+    for n, r in enumerate(rows):
+        cells = [r[0].ljust(widths[0])] + [c.rjust(w) for c, w in zip(r[1:], widths[1:])]
+        lines.append("  ".join(cells).rstrip())
+        if n == 0:
+            lines.append("-" * len(lines[0]))
+    return "\n".join(lines)
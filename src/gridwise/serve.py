@@ -0,0 +1,288 @@
+from __future__ import annotations
+import asyncio, json, sys, time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from gridwise.store import (
+    ChunkStore, bm25_score_batch, build_csr, build_inverted_index, csr_path, load_chunks_jsonl, load_csr,
+    load_index,
+)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class _Snapshot:
+    """
+    One loaded generation of the index and chunks; replaced as a whole on reload.
+
+    Requests hold it between ``acquire`` and ``release``. A replaced
+    snapshot is ``retire``d and closed when its last user releases it, so
+    a memory-mapped ``ChunkStore`` is never unmapped under a running search.
+    The counts are only touched on the event loop thread.
+    """
+
+    def __init__(self, index: Dict, chunks: Union[List[Dict], ChunkStore], mtimes: Tuple, generation: int) -> None:
+        self.index = index
+        self.chunks = chunks
+        self.mtimes = mtimes
+        self.generation = generation
+        self.loaded_at = time.time()
+        self.by_id: Optional[Dict] = None if isinstance(chunks, ChunkStore) else {ch["id"]: ch for ch in chunks}
+        self.users = 0
+        self.retired = False
+
+    def chunk(self, chunk_id: str) -> Optional[Dict]:
+        keys = [chunk_id]
+        if chunk_id.lstrip("-").isdigit():
+            keys.insert(0, int(chunk_id))
+        for k in keys:
+            ch = self.chunks.get(k) if self.by_id is None else self.by_id.get(k)
+            if ch is not None:
+                return ch
+        return None
+
+    def acquire(self) -> _Snapshot:
+        self.users += 1
+        return self
+
+    def release(self) -> None:
+        self.users -= 1
+        if self.retired and self.users == 0:
+            self.close()
+
+    def retire(self) -> None:
+        """Close now if unused, otherwise when the last user releases it."""
+        self.retired = True
+        if self.users == 0:
+            self.close()
+
+    def close(self) -> None:
+        if isinstance(self.chunks, ChunkStore):
+            self.chunks.close()
+
+
+class _Counters:
+    """Request counters plus a window of recent latencies for QPS and percentiles."""
+
+    def __init__(self, window: int = 4096) -> None:
+        self.started = time.time()
+        self.requests: Dict[str, int] = {}
+        self.errors = 0
+        self._recent: deque = deque(maxlen=window)  # (finished_at, seconds)
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        if not ok:
+            self.errors += 1
+        self._recent.append((time.monotonic(), seconds))
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+        last_min = [s for t, s in self._recent if now - t <= 60.0]
+        lat = np.array([s for _, s in self._recent]) * 1000
+        span = min(60.0, now - self._recent[0][0]) if self._recent else 0.0
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": dict(self.requests),
+            "errors": self.errors,
+            "qps_1m": round(len(last_min) / span, 1) if span > 0 else 0.0,
+            "latency_ms": {
+                "p50": round(float(np.percentile(lat, 50)), 3),
+                "p99": round(float(np.percentile(lat, 99)), 3),
+                "max": round(float(lat.max()), 3),
+            } if len(lat) else None,
+        }
+
+
+class SearchServer:
+    """
+    Read-only HTTP/JSON query server over one encoded chunk collection.
+
+    The index and chunks are shared by all requests, and where they are
+    memory-mapped also by every server process on the machine: chunks come
+    from a ``ChunkStore`` (see ``save_chunk_store``) when ``<chunks>.idx``
+    exists, and the BM25 postings from the CSR arrays ``save_index`` writes
+    next to ``index_path`` (``load_csr``). Otherwise each process reads the
+    chunks from JSONL, and unpickles the index and builds its CSR arrays, or
+    without ``index_path`` builds the index from the chunks.
+    Searches run ``bm25_score_batch`` on CSR postings; single queries are
+    scored on the event loop, batches (``POST /search``) in a worker thread so
+    other connections keep being served.
+
+    The files are polled every ``reload_interval`` seconds; when their
+    modification times change, a new snapshot is loaded in the background
+    and swapped in with a single assignment, so each request sees either the
+    old or the new generation. The old one is closed once the requests
+    still using it have finished. Publish rebuilt files with an atomic rename.
+    A failed reload keeps serving the old snapshot.
+
+    Endpoints: ``GET /search?q=...&k=5``, ``POST /search`` with
+    ``{"queries": [...], "k": 5}``, ``GET /chunk/{id}``, ``GET /stats``.
+    """
+
+    def __init__(self, chunks_path: str, index_path: Optional[str] = None, reload_interval: float = 2.0) -> None:
+        self.chunks_path = chunks_path
+        self.index_path = index_path
+        self.reload_interval = reload_interval
+        self.counters = _Counters()
+        self.reloads = 0
+        self.reload_errors = 0
+        self.snapshot = self._load(0)
+
+    def _mtimes(self) -> Tuple:
+        paths = [self.chunks_path, f"{self.chunks_path}.idx"]
+        if self.index_path:
+            paths += [self.index_path, f"{csr_path(self.index_path)}/meta.json"]
+        return tuple(Path(p).stat().st_mtime_ns if Path(p).exists() else None for p in paths)
+
+    def _load(self, generation: int) -> _Snapshot:
+        mtimes = self._mtimes()
+        if Path(f"{self.chunks_path}.idx").exists():
+            chunks: Union[List[Dict], ChunkStore] = ChunkStore(self.chunks_path)
+        else:
+            chunks = load_chunks_jsonl(self.chunks_path)
+        if self.index_path and Path(csr_path(self.index_path), "meta.json").exists():
+            index = load_csr(csr_path(self.index_path))
+        else:
+            index = load_index(self.index_path) if self.index_path else build_inverted_index(chunks)
+            build_csr(index)
+        return _Snapshot(index, chunks, mtimes, generation)
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                if self._mtimes() == self.snapshot.mtimes:
+                    continue
+                new = await loop.run_in_executor(None, self._load, self.snapshot.generation + 1)
+            except Exception as e:  # partial writes, bad pickle, ...: keep the old snapshot
+                self.reload_errors += 1
+                print(f"gridwise serve: reload failed: {e}", file=sys.stderr)
+                continue
+            if self._mtimes() != new.mtimes:
+                # files were still being replaced while loading: retry on the next tick
+                new.close()
+                continue
+            old, self.snapshot = self.snapshot, new
+            self.reloads += 1
+            old.retire()
+
+    async def _search(self, snap: _Snapshot, queries: List[str], k: int) -> List[List[Dict]]:
+        if len(queries) <= 1:
+            # one query is sub-millisecond on CSR postings; a thread hop would cost more
+            return bm25_score_batch(queries, snap.index, topk=k, chunks=snap.chunks)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: bm25_score_batch(queries, snap.index, topk=k, chunks=snap.chunks)
+        )
+
+    async def _route(self, method: str, target: str, body: bytes) -> Tuple[int, Dict, str]:
+        # the snapshot is read once and held until the response is built, even across a reload
+        snap = self.snapshot.acquire()
+        try:
+            return await self._respond(snap, method, target, body)
+        finally:
+            snap.release()
+
+    async def _respond(self, snap: _Snapshot, method: str, target: str, body: bytes) -> Tuple[int, Dict, str]:
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        if path == "/search":
+            if method == "GET":
+                qs = parse_qs(url.query)
+                q = qs.get("q", [""])[0]
+                k = int(qs.get("k", ["5"])[0])
+                res = await self._search(snap, [q], k)
+                return 200, {"query": q, "results": res[0], "generation": snap.generation}, "search"
+            if method == "POST":
+                req = json.loads(body or b"{}")
+                queries = req.get("queries") or ([req["q"]] if "q" in req else [])
+                res = await self._search(snap, [str(q) for q in queries], int(req.get("k", 5)))
+                return 200, {"results": res, "generation": snap.generation}, "search"
+            return 405, {"error": "use GET or POST"}, "search"
+        if path.startswith("/chunk/"):
+            if method != "GET":
+                return 405, {"error": "use GET"}, "chunk"
+            ch = snap.chunk(unquote(path[len("/chunk/"):]))
+            if ch is None:
+                return 404, {"error": "no such chunk"}, "chunk"
+            return 200, ch, "chunk"
+        if path == "/stats":
+            stats = self.counters.snapshot()
+            stats.update({
+                "generation": snap.generation,
+                "loaded_at": snap.loaded_at,
+                "chunks": len(snap.chunks),
+                "reloads": self.reloads,
+                "reload_errors": self.reload_errors,
+            })
+            return 200, stats, "stats"
+        return 404, {"error": f"unknown path {path}"}, "other"
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for ln in lines[1:]:
+                    if ":" in ln:
+                        name, value = ln.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                n = int(headers.get("content-length", "0") or 0)
+                body = await reader.readexactly(n) if n else b""
+
+                t0 = time.perf_counter()
+                try:
+                    status, payload, endpoint = await self._route(method, target, body)
+                except (ValueError, KeyError) as e:
+                    status, payload, endpoint = 400, {"error": str(e)}, "other"
+                except Exception as e:
+                    status, payload, endpoint = 500, {"error": repr(e)}, "other"
+                self.counters.record(endpoint, time.perf_counter() - t0, status < 400)
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+        watcher = asyncio.create_task(self._watch())
+        addr = server.sockets[0].getsockname()
+        print(f"gridwise serve: {len(self.snapshot.chunks)} chunks on http://{addr[0]}:{addr[1]}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            self.snapshot.retire()
+
+
+def run(chunks_path: str, index_path: Optional[str] = None, host: str = "127.0.0.1",
+        port: int = 8765, reload_interval: float = 2.0) -> None:
+    """Start a ``SearchServer`` and block until interrupted."""
+    srv = SearchServer(chunks_path, index_path=index_path, reload_interval=reload_interval)
+    try:
+        asyncio.run(srv.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -1,8 +1,13 @@
 from __future__ import annotations
-import json, math, re, pickle
+import json, math, os, re, pickle, shutil
+import lzma, mmap, struct, zlib
+from bisect import bisect_left, bisect_right
 from pathlib import Path
-from typing import List, Dict
-from collections import Counter
+from typing import Any, Iterator, List, Dict, Iterable, Optional, Tuple, Union
+from collections import Counter, OrderedDict
+import numpy as np
+
+from gridwise import profiling
 
 _CODE_RE = re.compile(r"@C\{[A-Z]+\}t\d+")
 _WORD_RE = re.compile(r"\w+", re.UNICODE)
@@ -18,7 +23,9 @@ def save_chunks_jsonl(chunks: List[Dict], out_path: str) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
     with p.open("w", encoding="utf-8") as f:
         for ch in chunks:
-            f.write(json.dumps({"id": ch["id"], "content": ch["content"]}, ensure_ascii=False) + "\n")
+            # id and content first; extra metadata keys (table, region, ...) are kept
+            rec = {"id": ch["id"], "content": ch["content"], **ch}
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
 
 def load_chunks_jsonl(path: str) -> List[Dict]:
     chunks: List[Dict] = []
@@ -27,10 +34,190 @@ def load_chunks_jsonl(path: str) -> List[Dict]:
             obj = json.loads(line)
             # basic schema assert
             if "id" in obj and "content" in obj:
-                chunks.append({"id": obj["id"], "content": obj["content"]})
+                chunks.append(obj)
     return chunks
 
-def build_inverted_index(chunks: List[Dict]) -> Dict:
+# chunk store sidecar: header, then one fixed-size record per chunk, sorted by id
+_STORE_MAGIC = b"GWCS"
+_STORE_VERSION = 1
+_STORE_HEADER = struct.Struct("<4sBBxxQ")  # magic, version, codec, count
+_STORE_RECORD = np.dtype([
+    ("id", "<i8"),          # chunk id
+    ("offset", "<u8"),      # block offset in the data file
+    ("length", "<u4"),      # block length in the data file
+    ("inner", "<u4"),       # record offset inside the (decompressed) block
+    ("inner_len", "<u4"),   # record length
+])
+_CODECS = {None: 0, "zlib": 1, "lzma": 2}
+
+def _compress(codec: Optional[str], data: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    if codec == "lzma":
+        return lzma.compress(data)
+    return data
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == 1:
+        return zlib.decompress(data)
+    if codec == 2:
+        return lzma.decompress(data)
+    return data
+
+def save_chunk_store(
+    chunks: Iterable[Dict],
+    path: str,
+    compression: Optional[str] = None,
+    block_size: int = 64,
+) -> None:
+    """
+    Write chunks to a random-access store: a data file at `path` plus a
+    binary `<path>.idx` sidecar mapping each chunk id to its byte range.
+
+    Uncompressed, the data file is plain JSONL (readable by
+    `load_chunks_jsonl`). With `compression="zlib"` or `"lzma"`, every
+    `block_size` records are compressed together; the sidecar then points at
+    the block and at the record inside it. Chunk ids must be integers.
+    Open the result with `ChunkStore`.
+    """
+    if compression not in _CODECS:
+        raise ValueError(f"compression must be one of {sorted(c for c in _CODECS if c)} or None")
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    records: List[Tuple[int, int, int, int, int]] = []
+    with p.open("wb") as f:
+        block: List[bytes] = []
+        block_ids: List[int] = []
+
+        def flush() -> None:
+            if not block:
+                return
+            offset = f.tell()
+            data = _compress(compression, b"".join(block))
+            f.write(data)
+            inner = 0
+            for cid, rec in zip(block_ids, block):
+                records.append((cid, offset, len(data), inner, len(rec)) if compression
+                               else (cid, offset + inner, len(rec), 0, len(rec)))
+                inner += len(rec)
+            block.clear()
+            block_ids.clear()
+
+        for ch in chunks:
+            rec = {"id": ch["id"], "content": ch["content"], **ch}
+            block.append((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+            block_ids.append(int(ch["id"]))
+            # uncompressed records are addressed individually; blocks only batch the writes
+            if len(block) >= (block_size if compression else 1024):
+                flush()
+        flush()
+
+    index = np.array(records, dtype=_STORE_RECORD)
+    index.sort(order="id")
+    with open(f"{path}.idx", "wb") as f:
+        f.write(_STORE_HEADER.pack(_STORE_MAGIC, _STORE_VERSION, _CODECS[compression], len(index)))
+        f.write(index.tobytes())
+
+class ChunkStore:
+    """
+    Read-only, random-access view of a store written by `save_chunk_store`.
+
+    The sidecar is loaded as one NumPy record array (ids sorted, so lookup is
+    a binary search) and the data file is memory-mapped: fetching a chunk
+    reads only its own bytes, or its block for compressed stores. The most
+    recently used `cache_blocks` decompressed blocks are kept.
+
+    Supports `store[id]`, `get(id)`, `get_many(ids)`, `id in store`,
+    `len(store)` and iteration over all chunks in the order they were saved.
+    """
+
+    def __init__(self, path: str, cache_blocks: int = 16) -> None:
+        self.path = path
+        with open(f"{path}.idx", "rb") as f:
+            magic, version, codec, count = _STORE_HEADER.unpack(f.read(_STORE_HEADER.size))
+            if magic != _STORE_MAGIC:
+                raise ValueError(f"{path}.idx is not a gridwise chunk store index")
+            if version != _STORE_VERSION:
+                raise ValueError(f"{path}.idx has chunk store version {version}; this gridwise reads version {_STORE_VERSION}")
+            self.index = np.frombuffer(f.read(count * _STORE_RECORD.itemsize), dtype=_STORE_RECORD)
+        self.codec = codec
+        self._ids = self.index["id"]
+        self._file = open(path, "rb")
+        size = Path(path).stat().st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._cache: "OrderedDict[int, bytes]" = OrderedDict()
+        self._cache_blocks = cache_blocks
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _pos(self, chunk_id: Any) -> int:
+        i = int(np.searchsorted(self._ids, chunk_id))
+        if i == len(self._ids) or self._ids[i] != chunk_id:
+            return -1
+        return i
+
+    def __contains__(self, chunk_id: Any) -> bool:
+        return self._pos(chunk_id) >= 0
+
+    def _block(self, offset: int, length: int) -> bytes:
+        data = self._cache.get(offset)
+        if data is not None:
+            self._cache.move_to_end(offset)
+            return data
+        data = _decompress(self.codec, self._mm[offset : offset + length])
+        self._cache[offset] = data
+        if len(self._cache) > self._cache_blocks:
+            self._cache.popitem(last=False)
+        return data
+
+    def _read(self, i: int) -> Dict:
+        rec = self.index[i]
+        offset, length = int(rec["offset"]), int(rec["length"])
+        if self.codec == 0:
+            raw = self._mm[offset : offset + length]
+        else:
+            inner = int(rec["inner"])
+            raw = self._block(offset, length)[inner : inner + int(rec["inner_len"])]
+        return json.loads(raw)
+
+    def get(self, chunk_id: Any, default: Optional[Dict] = None) -> Optional[Dict]:
+        i = self._pos(chunk_id)
+        return self._read(i) if i >= 0 else default
+
+    def __getitem__(self, chunk_id: Any) -> Dict:
+        i = self._pos(chunk_id)
+        if i < 0:
+            raise KeyError(chunk_id)
+        return self._read(i)
+
+    def get_many(self, ids: Iterable[Any]) -> List[Dict]:
+        """Fetch several chunks in the given order (missing ids are skipped), reading in file order."""
+        pos = [p for p in (self._pos(i) for i in ids) if p >= 0]
+        got = {p: self._read(p) for p in sorted(set(pos), key=lambda p: int(self.index[p]["offset"]))}
+        return [got[p] for p in pos]
+
+    def ids(self) -> List[int]:
+        return self._ids.tolist()
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in np.lexsort((self.index["inner"], self.index["offset"])):
+            yield self._read(int(i))
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> "ChunkStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+@profiling.staged("bm25_index")
+def build_inverted_index(chunks: Iterable[Dict]) -> Dict:
     df: Dict[str, int] = {}
     postings: Dict[str, Dict[int, int]] = {}
     for ch in chunks:
@@ -42,9 +229,115 @@ def build_inverted_index(chunks: List[Dict]) -> Dict:
             df[t] = df.get(t, 0) + 1
     return {"df": df, "N": len(chunks), "postings": postings}
 
+@profiling.staged("bm25_index_update")
+def update_inverted_index(index: Dict, chunks: Iterable[Dict], remove_ids: Iterable = ()) -> Dict:
+    """
+    Update an index from `build_inverted_index` in place: drop the postings
+    of `remove_ids` and of any chunk in `chunks` that is already indexed,
+    then add `chunks`. Gives the same postings as rebuilding from the new
+    chunk set. The cached CSR arrays (`build_csr`) are discarded.
+    """
+    chunks = list(chunks)
+    drop = set(remove_ids) | {ch["id"] for ch in chunks}
+    df, postings = index["df"], index["postings"]
+    if drop:
+        removed = set()
+        for t in list(postings):
+            plist = postings[t]
+            hit = [d for d in drop if d in plist] if len(drop) < len(plist) else [d for d in plist if d in drop]
+            if not hit:
+                continue
+            for d in hit:
+                del plist[d]
+                removed.add(d)
+            df[t] -= len(hit)
+            if not plist:
+                del postings[t], df[t]
+        index["N"] -= len(removed)
+    for ch in chunks:
+        doc_id = ch["id"]
+        for t, tf in Counter(_tokenize(ch["content"])).items():
+            postings.setdefault(t, {})[doc_id] = tf
+            df[t] = df.get(t, 0) + 1
+    index["N"] += len(chunks)
+    index.pop("csr", None)
+    return index
+
+def build_range_index(chunks: List[Dict]) -> Dict:
+    """
+    Index chunk metadata (``sheet``, ``row_start``/``row_end``, ``cols``) for
+    row-range and column lookups with ``lookup_chunks``.
+
+    Per sheet, chunks are sorted by first row, with a running maximum of last
+    rows, so a range query is two binary searches plus a scan of the hits.
+    Chunks without row metadata (e.g. DICT blocks) are not indexed.
+    """
+    spans: Dict[Optional[str], List[Tuple[int, int, int]]] = {}
+    cols: Dict[str, List[int]] = {}
+    for ch in chunks:
+        if ch.get("row_start") is None:
+            continue
+        spans.setdefault(ch.get("sheet"), []).append((ch["row_start"], ch["row_end"], ch["id"]))
+        for c in ch.get("cols") or ():
+            cols.setdefault(c, []).append(ch["id"])
+
+    sheets: Dict[Optional[str], Dict[str, List[int]]] = {}
+    for name, items in spans.items():
+        items.sort()
+        max_end: List[int] = []
+        m = -1
+        for _, end, _ in items:
+            m = max(m, end)
+            max_end.append(m)
+        sheets[name] = {
+            "starts": [a for a, _, _ in items],
+            "ends": [b for _, b, _ in items],
+            "ids": [i for _, _, i in items],
+            "max_end": max_end,
+        }
+    return {"sheets": sheets, "cols": cols}
+
+def lookup_chunks(
+    range_index: Dict,
+    rows: Optional[Tuple[int, int]] = None,
+    cols: Optional[Iterable[str]] = None,
+    sheet: Optional[str] = None,
+) -> List:
+    """
+    Ids of chunks overlapping the 1-based row range ``rows=(first, last)``
+    and containing any of ``cols`` (column letters), optionally limited to
+    one ``sheet``. Either filter may be omitted. The result can be passed to
+    ``bm25_score(..., allowed_ids=...)``.
+    """
+    names = [sheet] if sheet is not None else list(range_index["sheets"])
+    hits: List = []
+    for name in names:
+        ix = range_index["sheets"].get(name)
+        if ix is None:
+            continue
+        if rows is None:
+            hits.extend(ix["ids"])
+            continue
+        r1, r2 = rows
+        # chunks starting after r2 cannot overlap; before `lo` every chunk ends above r1
+        hi = bisect_right(ix["starts"], r2)
+        lo = bisect_left(ix["max_end"], r1, 0, hi)
+        hits.extend(ix["ids"][i] for i in range(lo, hi) if ix["ends"][i] >= r1)
+    if cols is not None:
+        with_cols = set()
+        for c in cols:
+            with_cols.update(range_index["cols"].get(c.upper(), ()))
+        hits = [i for i in hits if i in with_cols]
+    return hits
+
 def save_index(index: Dict, path: str) -> None:
+    """
+    Pickle ``index`` to ``path`` and write its CSR arrays next to it
+    (``csr_path(path)``, see ``save_csr``) for memory-mapped serving.
+    """
+    save_csr(index, csr_path(path))
     with open(path, "wb") as f:
-        pickle.dump(index, f)
+        pickle.dump({k: v for k, v in index.items() if k != "csr"}, f)
 
 def load_index(path: str) -> Dict:
     with open(path, "rb") as f:
@@ -62,9 +355,40 @@ def save_to_txt(path: str, text: str, encoding: str = "utf-8") -> None:
     with open(path, "w", encoding=encoding) as f:
         f.write(text)
 
-def bm25_score(query: str, chunks: List[Dict], index: Dict, k1: float = 1.5, b: float = 0.75, topk: int = 5) -> List[Dict]:
+def _fetch(chunks: Union[List[Dict], "ChunkStore"], ids: List) -> Dict:
+    """Look up only the given chunk ids, without indexing the whole collection."""
+    if isinstance(chunks, ChunkStore):
+        return {ch["id"]: ch for ch in chunks.get_many(ids)}
+    out: Dict = {}
+    for did in ids:
+        # common case: ids are list positions
+        if isinstance(did, int) and 0 <= did < len(chunks) and chunks[did]["id"] == did:
+            out[did] = chunks[did]
+    missing = [did for did in ids if did not in out]
+    if missing:
+        want = set(missing)
+        out.update((ch["id"], ch) for ch in chunks if ch["id"] in want)
+    return out
+
+@profiling.staged("bm25")
+def bm25_score(
+    query: str,
+    chunks: Union[List[Dict], ChunkStore],
+    index: Dict,
+    k1: float = 1.5,
+    b: float = 0.75,
+    topk: int = 5,
+    allowed_ids: Optional[Iterable] = None,
+) -> List[Dict]:
+    """
+    Rank chunks against `query` with BM25. If `allowed_ids` is given (e.g.
+    from `lookup_chunks`), only those chunks are scored and returned.
+    `chunks` may be a list or a `ChunkStore`; only the top-k winners are
+    fetched from it.
+    """
     if not query.strip():
         return []
+    allowed = set(allowed_ids) if allowed_ids is not None else None
 
     N = index["N"]
     df = index["df"]
@@ -85,11 +409,237 @@ def bm25_score(query: str, chunks: List[Dict], index: Dict, k1: float = 1.5, b:
             continue
         idf = math.log(1 + (N - ft + 0.5) / (ft + 0.5))
         for doc_id, tf in postings[t].items():
+            if allowed is not None and doc_id not in allowed:
+                continue
             dl = doc_len.get(doc_id, 1)
             denom = tf + k1 * (1 - b + b * (dl / avgdl))
             s = idf * (tf * (k1 + 1)) / denom
             scores[doc_id] = scores.get(doc_id, 0.0) + s
 
     ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:topk]
-    by_id = {ch["id"]: ch for ch in chunks}
+    by_id = _fetch(chunks, [did for did, _ in ranked])
     return [{"id": did, "score": sc, "content": by_id[did]["content"]} for did, sc in ranked if did in by_id]
+
+def build_csr(index: Dict) -> Dict:
+    """
+    Convert an inverted index from `build_inverted_index` into CSR arrays for
+    `bm25_score_batch`: `indptr`/`docs`/`tf` hold each term's postings as a
+    slice, documents are numbered by position (`doc_ids`), and `doc_len`
+    holds per-document lengths. The result is cached on the index under
+    `"csr"`; `save_index` writes it next to the pickle (`save_csr`).
+    """
+    csr = index.get("csr")
+    if csr is not None:
+        return csr
+    doc_pos: Dict = {}
+    terms: Dict[str, int] = {}
+    indptr = [0]
+    docs: List[int] = []
+    tfs: List[int] = []
+    for t, plist in index["postings"].items():
+        terms[t] = len(terms)
+        for d, tf in plist.items():
+            docs.append(doc_pos.setdefault(d, len(doc_pos)))
+            tfs.append(tf)
+        indptr.append(len(docs))
+    docs_a = np.asarray(docs, dtype=np.int64)
+    tf_a = np.asarray(tfs, dtype=np.float64)
+    csr = {
+        "terms": terms,
+        "indptr": np.asarray(indptr, dtype=np.int64),
+        "docs": docs_a,
+        "tf": tf_a,
+        "doc_ids": list(doc_pos),
+        "doc_len": np.bincount(docs_a, weights=tf_a, minlength=len(doc_pos)),
+    }
+    index["csr"] = csr
+    return csr
+
+_CSR_VERSION = 1
+
+def csr_path(index_path: str) -> str:
+    """Directory holding the CSR arrays that `save_index` writes for the index at `index_path`."""
+    return f"{index_path}.csr"
+
+class _TermTable:
+    """
+    Term -> CSR row lookup over terms sorted by their UTF-8 bytes, stored as
+    one byte buffer plus offsets so both can be memory-mapped.
+    """
+
+    def __init__(self, term_bytes: np.ndarray, term_offsets: np.ndarray) -> None:
+        self.term_bytes = term_bytes
+        self.term_offsets = term_offsets
+
+    def __len__(self) -> int:
+        return len(self.term_offsets) - 1
+
+    def _term(self, row: int) -> bytes:
+        return self.term_bytes[self.term_offsets[row] : self.term_offsets[row + 1]].tobytes()
+
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self) and self._term(lo) == key else default
+
+def save_csr(index: Dict, directory: str) -> None:
+    """
+    Write the CSR arrays of `index` (`build_csr`) under `directory` as
+    `.npy` files for `load_csr`, with terms re-sorted for `_TermTable`.
+    The files go to a new directory that then replaces the old one, so
+    processes that mapped the old files keep reading them unchanged.
+    """
+    csr = build_csr(index)
+    terms = sorted(csr["terms"], key=lambda t: t.encode("utf-8"))
+    encoded = [t.encode("utf-8") for t in terms]
+    rows = np.fromiter((csr["terms"][t] for t in terms), dtype=np.int64, count=len(terms))
+    indptr = csr["indptr"]
+    lengths = indptr[rows + 1] - indptr[rows]
+    new_indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    # positions of each row's postings in the old arrays, in the new row order
+    take = np.repeat(indptr[rows] - new_indptr[:-1], lengths) + np.arange(new_indptr[-1])
+    arrays = {
+        "indptr": new_indptr,
+        "docs": csr["docs"][take],
+        "tf": csr["tf"][take],
+        "doc_len": csr["doc_len"],
+        "term_offsets": np.concatenate(([0], np.cumsum([len(e) for e in encoded]))).astype(np.int64),
+        "term_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    }
+    int_ids = all(isinstance(d, (int, np.integer)) and not isinstance(d, bool) for d in csr["doc_ids"])
+    if int_ids:
+        arrays["doc_ids"] = np.asarray(csr["doc_ids"], dtype=np.int64)
+
+    d = Path(directory)
+    tmp = d.with_name(f"{d.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", arr)
+    meta = {"version": _CSR_VERSION, "N": index["N"]}
+    if not int_ids:
+        meta["doc_ids"] = list(csr["doc_ids"])
+    (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    old = d.with_name(f"{d.name}.old-{os.getpid()}")
+    if d.exists():
+        d.rename(old)
+    tmp.rename(d)
+    shutil.rmtree(old, ignore_errors=True)
+
+def load_csr(directory: str) -> Dict:
+    """
+    Open CSR arrays written by `save_csr` as an index for `bm25_score_batch`.
+    The arrays are memory-mapped read-only, so processes serving the same
+    index share their pages.
+    """
+    d = Path(directory)
+    meta = json.loads((d / "meta.json").read_text(encoding="utf-8"))
+    if meta.get("version") != _CSR_VERSION:
+        raise ValueError(f"{directory}: unsupported CSR version {meta.get('version')}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(d / f"{name}.npy", mmap_mode="r")
+
+    csr = {
+        "terms": _TermTable(load("term_bytes"), load("term_offsets")),
+        "indptr": load("indptr"),
+        "docs": load("docs"),
+        "tf": load("tf"),
+        "doc_ids": meta["doc_ids"] if "doc_ids" in meta else load("doc_ids"),
+        "doc_len": load("doc_len"),
+    }
+    return {"N": meta["N"], "csr": csr}
+
+@profiling.staged("bm25_batch")
+def bm25_score_batch(
+    queries: List[str],
+    index: Dict,
+    topk: int = 5,
+    k1: float = 1.5,
+    b: float = 0.75,
+    chunks: Optional[Union[List[Dict], ChunkStore]] = None,
+    batch_size: int = 256,
+) -> List[List[Dict]]:
+    """
+    Score many queries against one index; returns, per query, the same
+    ranking as `bm25_score` (scores, order and tie-breaking).
+
+    Postings are CSR arrays (`build_csr`) and the length normalization is
+    computed once per call for every document. Each distinct query term's
+    contributions are computed once per batch; all (query, document)
+    contributions are then summed in one `np.bincount`, which adds them in
+    query-term order, so the floating-point sums equal the single-query
+    ones. Top-k per query uses `argpartition`, then orders the candidates by
+    score and first appearance, like the stable sort in `bm25_score`.
+
+    Results are `{"id", "score"}` dicts, plus `"content"` when `chunks` is
+    given. Queries are processed `batch_size` at a time to bound memory.
+    """
+    csr = build_csr(index)
+    N = index["N"]
+    n_docs = len(csr["doc_ids"])
+    if n_docs == 0 or topk <= 0:
+        return [[] for _ in queries]
+    doc_len = csr["doc_len"]
+    avgdl = float(doc_len.sum()) / n_docs
+    norm = k1 * (1 - b + b * (doc_len / avgdl))
+    indptr, docs, tf = csr["indptr"], csr["docs"], csr["tf"]
+
+    results: List[List[Dict]] = []
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start : start + batch_size]
+        contrib: Dict[int, np.ndarray] = {}
+        keys: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+        for qi, q in enumerate(batch):
+            if not q.strip():
+                continue
+            for t in _tokenize(q):
+                row = csr["terms"].get(t)
+                if row is None:
+                    continue
+                sl = slice(indptr[row], indptr[row + 1])
+                w = contrib.get(row)
+                if w is None:
+                    ft = int(indptr[row + 1] - indptr[row])  # document frequency
+                    idf = math.log(1 + (N - ft + 0.5) / (ft + 0.5))
+                    w = contrib[row] = idf * (tf[sl] * (k1 + 1)) / (tf[sl] + norm[docs[sl]])
+                keys.append(docs[sl] + qi * n_docs)
+                weights.append(w)
+
+        ranked: List[List[Tuple[int, float]]] = [[] for _ in batch]
+        if keys:
+            all_keys = np.concatenate(keys)
+            uniq, first, inv = np.unique(all_keys, return_index=True, return_inverse=True)
+            sums = np.bincount(inv, weights=np.concatenate(weights), minlength=len(uniq))
+            bounds = np.searchsorted(uniq, np.arange(len(batch) + 1) * n_docs)
+            for qi in range(len(batch)):
+                a, z = bounds[qi], bounds[qi + 1]
+                if a == z:
+                    continue
+                sc, fs = sums[a:z], first[a:z]
+                cand = np.arange(z - a)
+                if len(cand) > topk:
+                    kth = sc[np.argpartition(-sc, topk - 1)[topk - 1]]
+                    cand = np.flatnonzero(sc >= kth)  # keep ties with the k-th score
+                order = cand[np.lexsort((fs[cand], -sc[cand]))][:topk]
+                ranked[qi] = [(int(uniq[a + i] - qi * n_docs), float(sc[i])) for i in order]
+
+        doc_ids = csr["doc_ids"]
+        for hits in ranked:
+            pos = [p for p, _ in hits]
+            ids = doc_ids[pos].tolist() if isinstance(doc_ids, np.ndarray) else [doc_ids[p] for p in pos]
+            if chunks is None:
+                results.append([{"id": did, "score": s} for did, (_, s) in zip(ids, hits)])
+                continue
+            by_id = _fetch(chunks, ids)
+            results.append([{"id": did, "score": s, "content": by_id[did]["content"]}
+                            for did, (_, s) in zip(ids, hits) if did in by_id])
+    return results
+
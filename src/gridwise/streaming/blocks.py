@@ -0,0 +1,245 @@
+from __future__ import annotations
+import io, re
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+_QUOTE = ord('"')
+_NL = ord("\n")
+
+# how many earlier line ends to try when a block does not parse
+MAX_RECUTS = 64
+
+
+def _record_ends(data: bytes) -> np.ndarray:
+    """Positions of the newlines in ``data`` preceded by an even number of ``"``."""
+    arr = np.frombuffer(data, dtype=np.uint8)
+    nl = np.flatnonzero(arr == _NL)
+    if not len(nl):
+        return nl
+    quotes = np.cumsum(arr == _QUOTE, dtype=np.int64)
+    return nl[(quotes[nl] & 1) == 0]
+
+
+def record_boundary(data: bytes, last: bool = True) -> int:
+    """
+    Offset just past a newline that ends a CSV record in ``data`` (which must
+    start at a record boundary): the last such newline with ``last=True``,
+    the first otherwise; -1 if there is none.
+
+    A newline ends a record when an even number of ``"`` precede it, i.e. it
+    is not inside a quoted field (an escaped ``""`` adds two and keeps the
+    parity), so records with embedded newlines are never split.
+
+    Only the parity is counted, not where the quotes are. A stray ``"``
+    inside an unquoted field (``5" pipe``), which the CSV parser keeps as a
+    literal character, flips the parity for the rest of ``data``: newlines
+    after it are taken to be quoted and the ones inside a real quoted field
+    to be record ends. ``iter_frames`` detects the resulting split record
+    when the block fails to parse and cuts it again at a plain line end.
+    """
+    ends = _record_ends(data)
+    if not len(ends):
+        return -1
+    return int(ends[-1 if last else 0]) + 1
+
+
+def read_header(path: str, usecols: Optional[List[str]] = None) -> Tuple[List[str], List[str], int]:
+    """
+    Parse the header record of ``path``.
+
+    Returns ``(names, columns, data_start)``: all column names as pandas
+    reads them (duplicates get ``.1`` suffixes), the selected columns in file
+    order, and the byte offset of the first data record.
+    """
+    size = 1 << 16
+    with open(path, "rb") as f:
+        while True:
+            f.seek(0)
+            head = f.read(size)
+            end = record_boundary(head, last=False)
+            if end >= 0 or len(head) < size:
+                break
+            size *= 4
+    if end < 0:
+        end = len(head)
+    if not head[:end].strip():
+        raise ValueError("CSV appears empty or unreadable.")
+    names = [str(c) for c in pd.read_csv(io.BytesIO(head[:end]), nrows=0).columns]
+    if usecols is None:
+        columns = names
+    else:
+        missing = [c for c in usecols if c not in names]
+        if missing:
+            raise ValueError(f"usecols not found in the header: {missing}")
+        wanted = set(usecols)
+        columns = [c for c in names if c in wanted]
+    return names, columns, end
+
+
+def iter_blocks(
+    path: str,
+    start: int,
+    block_bytes: int = 16 << 20,
+    stop: Optional[int] = None,
+    partial: bool = True,
+) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yield ``(start, end, data)`` for consecutive runs of whole CSV records
+    from byte ``start`` to ``stop`` (default: the end of the file), each
+    about ``block_bytes`` long (longer when a single record is bigger).
+    With ``partial=False`` a last record that is not newline-terminated
+    (e.g. one still being appended) is left out.
+
+    Block boundaries depend only on ``start`` and ``block_bytes``, so
+    reading again from any yielded ``end`` reproduces the remaining blocks
+    exactly; this is what makes checkpoints resumable.
+
+    Boundaries come from ``record_boundary``, so a stray quote can end a
+    block inside a quoted field; use ``iter_frames`` to have such blocks
+    detected and cut again. When a stray quote leaves no record end at all
+    in the rest of the file, the block grows to the end of the file.
+    """
+    with open(path, "rb") as f:
+        pos = start
+        while True:
+            data = _read_block(f, pos, block_bytes, stop, partial)
+            if not data:
+                return
+            yield pos, pos + len(data), data
+            pos += len(data)
+
+
+def iter_frames(
+    path: str,
+    start: int,
+    names: List[str],
+    columns: List[str],
+    block_bytes: int = 16 << 20,
+    stop: Optional[int] = None,
+    partial: bool = True,
+) -> Iterator[Tuple[int, int, pd.DataFrame]]:
+    """
+    ``iter_blocks`` with each block parsed by ``parse_block``: yields
+    ``(start, end, frame)``.
+
+    A block that fails to parse (typically because a stray quote moved its
+    boundary into a quoted field, see ``record_boundary``) is cut again at
+    the latest plain line end, ignoring quotes, that gives a block which
+    parses; up to ``MAX_RECUTS`` line ends are tried before the error is
+    raised. The next block starts at the new cut. Like the block
+    boundaries, the cuts depend only on the data, so resuming from any
+    yielded ``end`` gives the same frames.
+    """
+    with open(path, "rb") as f:
+        pos = start
+        while True:
+            data = _read_block(f, pos, block_bytes, stop, partial)
+            if not data:
+                return
+            try:
+                df = parse_block(data, names, columns)
+            except pd.errors.ParserError:
+                data, df = _reparse_at_lines(data, names, columns)
+            yield pos, pos + len(data), df
+            pos += len(data)
+
+
+def _read_block(f, pos: int, block_bytes: int, stop: Optional[int], partial: bool) -> bytes:
+    """The block of whole records starting at ``pos``; empty at the end."""
+    # every block is read afresh from its own start (the partial record
+    # at the end of the previous read is read again), so blocks are a
+    # function of their start offset alone
+    size = block_bytes
+    while True:
+        f.seek(pos)
+        want = size if stop is None else max(0, min(size, stop - pos))
+        data = f.read(want)
+        if len(data) < size:  # reached EOF: the rest is the last block
+            cut = len(data) if partial else max(0, record_boundary(data))
+            break
+        cut = record_boundary(data)
+        if cut > 0:
+            break
+        size *= 2  # a single record longer than the block
+    return data[:cut]
+
+
+def _reparse_at_lines(data: bytes, names: List[str], columns: List[str]) -> Tuple[bytes, pd.DataFrame]:
+    """Shorten an unparsable block to the latest line end that parses."""
+    nl = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == _NL) + 1
+    for cut in nl[nl < len(data)][::-1][:MAX_RECUTS]:
+        try:
+            return data[:cut], parse_block(data[:cut], names, columns)
+        except pd.errors.ParserError:
+            continue
+    # nothing shorter parses either: report the block's own error
+    return data, parse_block(data, names, columns)
+
+
+def block_bytes_for_rows(path: str, start: int, rows: int, sample_bytes: int = 1 << 20) -> int:
+    """
+    Block size in bytes holding about ``rows`` records, from the mean record
+    length in the first ``sample_bytes`` after ``start``. Converts the
+    row-count ``chunksize`` of earlier versions to a ``block_bytes``.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        sample = f.read(sample_bytes)
+    ends = _record_ends(sample)
+    if len(ends):
+        per_row = (int(ends[-1]) + 1) / len(ends)
+    elif sample:
+        per_row = len(sample)  # a single record, longer than the sample or unterminated
+    else:
+        return 16 << 20
+    return max(1, int(rows * per_row))
+
+
+def parse_block(data: bytes, names: List[str], columns: List[str]) -> pd.DataFrame:
+    """Parse a block of data records (no header) into a frame with ``columns``."""
+    if not data.strip():
+        return pd.DataFrame(columns=columns)
+    usecols = None if len(columns) == len(names) else columns
+    df = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=usecols)
+    return df.reset_index(drop=True)
+
+
+def where_expr(where: Union[str, Sequence[str], None]) -> Optional[str]:
+    """Combine one or more ``DataFrame.query`` expressions with ``and``; None if there are none."""
+    if where is None:
+        return None
+    parts = [where] if isinstance(where, str) else list(where)
+    parts = [p.strip() for p in parts if p and p.strip()]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else " and ".join(f"({p})" for p in parts)
+
+
+def where_columns(expr: str, names: List[str]) -> List[str]:
+    """
+    Columns of ``names`` that ``expr`` may refer to, in file order: plain
+    identifiers and backquoted names. Matching is textual, so a column whose
+    name also appears in a string literal is read needlessly but harmlessly.
+    """
+    quoted = set(re.findall(r"`([^`]+)`", expr))
+    idents = set(re.findall(r"[A-Za-z_][A-Za-z0-9_]*", re.sub(r"`[^`]+`", " ", expr)))
+    return [c for c in names if c in quoted or c in idents]
+
+
+def filter_block(df: pd.DataFrame, expr: Optional[str], columns: List[str]) -> pd.DataFrame:
+    """
+    Keep the rows of a parsed block matching ``expr`` (``DataFrame.query``
+    syntax, evaluated vectorized) and project to ``columns``. The index
+    keeps each row's position in the block, so filtered rows keep their
+    original row numbers.
+    """
+    if expr is not None and len(df):
+        mask = df.eval(expr)
+        if not isinstance(mask, pd.Series) or not pd.api.types.is_bool_dtype(mask):
+            raise ValueError(f"where expression must evaluate to a boolean mask: {expr!r}")
+        df = df[mask.fillna(False).astype(bool)]
+    if list(df.columns) != columns:
+        df = df[columns]
+    return df
@@ -1,12 +1,24 @@
 from __future__ import annotations
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
-from collections import Counter, defaultdict
-import json
+from collections import Counter, defaultdict, deque
+import copy, hashlib, json, os, pickle, time, warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+from gridwise import profiling
+from gridwise.core.dtypes import string_counts
 from gridwise.core.utils import idx_to_addr
 from gridwise.eval.tokens import count_tokens
+from gridwise.encode.compressor.online_aggregate import OnlineAggregator
+from gridwise.encode.compressor.dedup import RowDeduper, sampled_max_block
+from gridwise.encode.chunking import ChunkAnnotator
+from gridwise.store import build_inverted_index, load_chunks_jsonl, load_index, save_index, update_inverted_index
+from gridwise.streaming.blocks import block_bytes_for_rows, filter_block, iter_frames, read_header, where_columns, where_expr
+from gridwise.streaming.pipeline import ChunkWriter, Prefetcher, col_letters, render_rows
+
+CHECKPOINT_VERSION = 4
 
 def _render_value(v) -> str:
     import math
@@ -26,84 +38,440 @@ def _render_value(v) -> str:
         return "NaN"
     return repr(v)
 
-def _lines_to_token_count(lines: List[str]) -> int:
-    return count_tokens("\n".join(lines))
+def checkpoint_path(out_jsonl: str) -> str:
+    """Where ``stream_encode_csv_to_jsonl`` keeps its checkpoint for ``out_jsonl``."""
+    return f"{out_jsonl}.ckpt"
+
+
+def _save_checkpoint(path: str, state: Dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def state_path(out_jsonl: str) -> str:
+    """Where ``stream_encode_csv_to_jsonl(..., incremental=True)`` keeps its state for ``out_jsonl``."""
+    return f"{out_jsonl}.state"
+
+
+def _prefix_id(path: Path, end: int) -> Dict:
+    """Identify the first ``end`` bytes of ``path`` (None if the file is shorter) by their ends."""
+    if path.stat().st_size < end:
+        return {"path": str(path.resolve()), "end": end, "digest": None}
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(min(end, 1 << 16)))
+        f.seek(max(0, end - (1 << 16)))
+        h.update(f.read(end - f.tell()))
+    return {"path": str(path.resolve()), "end": end, "digest": h.hexdigest()}
+
+
+def _source_id(path: Path) -> Dict:
+    st = path.stat()
+    return {"path": str(path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _extend_dictionaries(
+    col_dicts: Dict[int, Dict[str, str]],
+    rev_dicts: Dict[int, Dict[str, str]],
+    per_col_freq: Dict[int, Counter],
+) -> None:
+    """
+    Give every string counted in ``per_col_freq`` that has no code yet the
+    next free code of its column, most frequent first (ties lexical, so the
+    result is deterministic). Existing codes are never renumbered.
+    """
+    for j, freq in per_col_freq.items():
+        mapping = col_dicts.get(j, {})
+        vocab = [v for v in freq if v not in mapping]
+
+        # OPTIONAL: skip short strings (e.g., len < 3)
+        SKIP_IF_SHORTER_THAN = 3  # set to None to disable
+        if SKIP_IF_SHORTER_THAN is not None:
+            vocab = [v for v in vocab if len(v[1:-1]) >= SKIP_IF_SHORTER_THAN]
+
+        # order by frequency desc, then lexical to be deterministic
+        vocab.sort(key=lambda v: (-freq[v], v))
+        if not vocab:
+            continue
+        rev = rev_dicts.setdefault(j, {})
+        for v in vocab:
+            code = f"@C{{{col_letters(j)}}}t{len(mapping) + 1}"
+            mapping[v] = code
+            rev[code] = v
+        col_dicts[j] = mapping
+
+
+def _read_chunks(path: str, start: int) -> List[Dict]:
+    """Chunk records of a JSONL file from byte ``start`` on."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class _Progress:
+    """Rows/s and ETA for one pass, reported after every block."""
+
+    def __init__(self, callback: Optional[Callable[[Dict], None]], pass_no: int, start: int, total: int, rows: int) -> None:
+        self.callback = callback
+        self.pass_no = pass_no
+        self.start = start
+        self.total = total
+        self.rows0 = rows
+        self.t0 = time.perf_counter()
+
+    def __call__(self, offset: int, rows: int) -> None:
+        if self.callback is None:
+            return
+        elapsed = time.perf_counter() - self.t0
+        done = offset - self.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        self.callback({
+            "pass": self.pass_no,
+            "offset": offset,
+            "total": self.total,
+            "fraction": offset / self.total if self.total else 1.0,
+            "rows": rows,
+            "rows_per_s": (rows - self.rows0) / elapsed if elapsed > 0 else 0.0,
+            "elapsed_s": elapsed,
+            "eta_s": (self.total - offset) / rate if rate > 0 else None,
+        })
+
+
+class _Pass2:
+    """
+    Pass-2 packing state: the chunk buffer and its token count, aggregator,
+    deduper and chunk annotator. Everything but the writer is picklable,
+    which is what a checkpoint stores.
+
+    The buffer size is the sum of per-line token counts plus one token per
+    line break, so each line is tokenized once (by the render workers)
+    instead of re-tokenizing the whole buffer on every line.
+    """
+
+    def __init__(self, max_tokens: int, overlap_tokens: int, annotate: ChunkAnnotator,
+                 agg: Optional[OnlineAggregator], deduper: Optional[RowDeduper]) -> None:
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.annotate = annotate
+        self.agg = agg
+        self.deduper = deduper
+        self.chunk_id = 0
+        self.buffer_lines: List[str] = []
+        self.buffer_tokens = 0
+        self.lines_out = 0
+        self.writer: Optional[ChunkWriter] = None
+        self._counts: Dict[str, int] = {}  # token counts of recently rendered lines
+        self._counts_prev: Dict[str, int] = {}
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        state.update(writer=None, _counts={}, _counts_prev={})
+        return state
+
+    def add_counts(self, lines: List[str], counts: List[int]) -> None:
+        self._counts.update(zip(lines, counts))
+
+    def next_block(self) -> None:
+        # rows held back by the deduper/aggregator may come out a block later;
+        # anything older is recounted (the counts are the same either way)
+        self._counts_prev, self._counts = self._counts, {}
+
+    def _tokens(self, line: str) -> int:
+        t = self._counts.pop(line, None)
+        if t is None:
+            t = self._counts_prev.pop(line, None)
+        return count_tokens(line) if t is None else t
+
+    def flush(self) -> None:
+        if self.buffer_lines:
+            self.writer.put(self.chunk_id, self.buffer_lines)
+            self.chunk_id += 1
+        self.buffer_lines = []
+        self.buffer_tokens = 0
+
+    def emit(self, line: str) -> None:
+        self.buffer_lines.append(line)
+        self.lines_out += 1
+        self.buffer_tokens += self._tokens(line) + (len(self.buffer_lines) > 1)
+        if self.buffer_tokens > self.max_tokens:
+            if self.overlap_tokens > 0:
+                tail = "\n".join(self.buffer_lines)[-self.overlap_tokens * 4 :]
+                self.flush()
+                self.buffer_lines = [tail]
+                self.buffer_tokens = count_tokens(tail)
+            else:
+                self.flush()
+
+    def feed(self, line: str) -> None:
+        agg = self.agg
+        if agg is None:
+            self.emit(line)
+        elif line.startswith("[REPEAT"):
+            for ln in agg.finish():
+                self.emit(ln)
+            self.emit(line)
+        else:
+            for ln in agg.push(line):
+                self.emit(ln)
 
-def _flush_chunk(chunks_fh, chunk_id: int, lines: List[str]) -> int:
-    if not lines:
-        return chunk_id
-    chunks_fh.write(json.dumps({"id": chunk_id, "content": "\n".join(lines)}, ensure_ascii=False) + "\n")
-    return chunk_id + 1
+    def push_row(self, line: str) -> None:
+        if self.deduper is None:
+            self.feed(line)
+        else:
+            for ln in self.deduper.push(line):
+                self.feed(ln)
+
+    def finish(self) -> None:
+        if self.deduper is not None:
+            for ln in self.deduper.finish():
+                self.feed(ln)
+        if self.agg is not None:
+            for ln in self.agg.finish():
+                self.emit(ln)
+        self.flush()
 
-def _col_letters(col_index: int) -> str:
-    res = ""
-    c = col_index + 1
-    while c > 0:
-        c, rem = divmod(c - 1, 26)
-        res = chr(65 + rem) + res
-    return res
 
 def stream_encode_csv_to_jsonl(
     path: str,
     out_jsonl: Optional[str] = None,
     *,
     usecols: Optional[List[str]] = None,
-    chunksize: int = 100_000,
+    where: Union[str, Sequence[str], None] = None,
+    block_bytes: int = 16 << 20,
     max_tokens_per_chunk: int = 4_000,
     overlap_tokens: int = 200,
     build_dictionary: bool = True,
     include_format: bool = True,
     sheet_name: Optional[str] = None,
     output_mode: str = "compressed",  # "compressed" | "expanded"
+    aggregate: bool = False,
+    sample_head: int = 5,
+    sample_tail: int = 5,
+    sample_every: int = 50,
+    z_outlier: float = 3.0,
+    dedup: bool = False,
+    dedup_max_block: int = 4,
+    checkpoint_interval: Optional[float] = 60.0,
+    resume: bool = False,
+    progress: Optional[Callable[[Dict], None]] = None,
+    workers: int = 2,
+    batch_rows: int = 2_000,
+    read_ahead: int = 2,
+    render_ahead: int = 8,
+    write_depth: int = 64,
+    write_buffer: int = 4 << 20,
+    incremental: bool = False,
+    index_path: Optional[str] = None,
+    chunksize: Optional[int] = None,
 ) -> Tuple[str, Optional[str]]:
+    """
+    Encode a large CSV into JSONL chunks in two passes with bounded memory.
+
+    Pass 1 counts per-column string frequencies to build the dictionaries;
+    pass 2 renders rows, packs them into chunks and appends a DICT chunk.
+    Each record carries the ``ChunkAnnotator`` metadata (sheet, row span,
+    columns, header context) next to ``id`` and ``content``. The CSV is read
+    in blocks of about ``block_bytes`` whole records (see ``iter_blocks``).
+    ``chunksize`` (rows per block) is deprecated: it is converted to
+    ``block_bytes`` from the mean record length at the start of the file
+    and overrides it.
+
+    ``where`` is a ``DataFrame.query`` expression, or a list of them that
+    must all hold, e.g. ``"Region == 'EMEA' and Date >= '2024'"``. It is
+    evaluated vectorized on each parsed block before pass-1 counting and
+    before rendering, so excluded rows add neither dictionary entries nor
+    tokens. Columns it refers to are read even when ``usecols`` leaves them
+    out. Kept rows keep their original CSV row numbers in their addresses.
+
+    With ``aggregate=True`` the data rows are sampled and summarized the way
+    ``apply_aggregation`` does, using an ``OnlineAggregator`` so the whole
+    span never has to be held in memory: head/tail/every-Nth rows and
+    outliers are kept, followed by an ``[AGG ...]`` stats line.
+
+    With ``dedup=True`` rendered rows go through a ``RowDeduper`` first, so
+    runs of identical rows and repeating blocks become ``[REPEAT ...]``
+    back-references. Each marker closes the current aggregation span; with
+    ``aggregate=True`` too, blocks are at most ``sample_tail`` rows long so
+    the rows a marker refers to are always kept.
+    Markers may point into an earlier chunk; expand the chunks in order with
+    a shared ``rows`` map (``expand_repeats(content, rows)``).
+
+    Checkpoints: unless ``checkpoint_interval`` is None, the pass-1
+    dictionaries are saved to ``checkpoint_path(out_jsonl)`` when pass 1
+    ends, and the pass-2 state (CSV byte offset, row and chunk counters,
+    output length, pending lines, aggregator and deduper state) after the
+    first block every ``checkpoint_interval`` seconds. The output is fsynced
+    first, so a checkpoint never refers to data that is not on disk. With
+    ``resume=True`` an existing checkpoint for the same CSV and settings is
+    picked up: the output is truncated to its recorded length and encoding
+    continues from the recorded offset, giving the same output as an
+    uninterrupted run. The checkpoint is removed when encoding finishes.
+
+    Incremental mode (``incremental=True``) is for append-only files. Each
+    run saves to ``state_path(out_jsonl)`` the CSV offset and row count
+    reached, the dictionaries, the chunk id and output length before the
+    trailing partial chunk, and the packing state. The next run checks that
+    the CSV still starts with the encoded bytes and that the output is
+    unchanged. It then counts and encodes only the new rows. New strings get
+    the next free codes of their column; existing codes keep their numbers.
+    The output is truncated before the old trailing chunk and DICT chunk,
+    so they are rewritten with the new rows and the extended dictionaries.
+    A final record without a newline is left for the next run. When
+    nothing was appended the run returns without touching the output.
+
+    ``index_path``: also maintain a BM25 inverted index of the chunks there
+    (``save_index``). After an incremental run that updated the same index,
+    only the replaced and new chunks are re-indexed
+    (``update_inverted_index``); otherwise it is rebuilt. The path is
+    returned as the second element, next to the JSONL path.
+
+    ``progress`` is called after every block with ``{"pass", "offset",
+    "total", "fraction", "rows", "rows_per_s", "elapsed_s", "eta_s"}``.
+
+    Pass 2 is a bounded-queue pipeline: a reader thread reads and parses up
+    to ``read_ahead`` blocks ahead; a pool of ``workers`` threads renders
+    and token-counts batches of ``batch_rows`` rows, at most
+    ``render_ahead`` batches in flight; the calling thread dedups,
+    aggregates and packs chunks in order; and a writer thread annotates,
+    serializes and writes them through a ``write_buffer``-byte buffer, with
+    up to ``write_depth`` chunks queued. ``workers=0`` runs every step
+    inline. The output does not depend on any of these settings.
+    """
     src = Path(path)
     if out_jsonl is None:
         out_jsonl = str(src.with_suffix("")) + ".gridwise.jsonl"
     jsonl_path = Path(out_jsonl)
+    ckpt_path = checkpoint_path(str(jsonl_path))
+    inc_path = state_path(str(jsonl_path))
+    total = src.stat().st_size
 
-    per_col_freq: Dict[int, Counter] = defaultdict(Counter)
-    col_names: Optional[List[str]] = None
-    reader1 = pd.read_csv(path, usecols=usecols, chunksize=chunksize)
-    for df in reader1:
-        df = df.reset_index(drop=True)
-        if col_names is None:
-            col_names = [str(c) for c in df.columns]
-        for j, col in enumerate(col_names):
-            sv = df[col].dropna()
-            if sv.dtype == "object":
-                for s in sv:
-                    if isinstance(s, str):
-                        per_col_freq[j][repr(s)] += 1
-    if col_names is None:
-        raise ValueError("CSV appears empty or unreadable.")
-
-    col_dicts: Dict[int, Dict[str, str]] = {}
-    rev_dicts: Dict[int, Dict[str, str]] = {}
-
-    if build_dictionary and output_mode == "compressed":
-        for j, freq in per_col_freq.items():
-        # take ALL distinct strings (keys of freq)
-            vocab = list(freq.keys())
+    names, col_names, data_start = read_header(path, usecols)
+    if chunksize is not None:
+        warnings.warn("chunksize is deprecated; pass block_bytes instead", DeprecationWarning, stacklevel=2)
+        block_bytes = block_bytes_for_rows(path, data_start, chunksize)
 
-        # OPTIONAL: skip short strings (e.g., len < 3)
-            SKIP_IF_SHORTER_THAN = 3  # set to None to disable
-            if SKIP_IF_SHORTER_THAN is not None:
-                vocab = [v for v in vocab if len(v[1:-1]) >= SKIP_IF_SHORTER_THAN]
+    params = {
+        "usecols": usecols, "where": where_expr(where), "block_bytes": block_bytes, "max_tokens_per_chunk": max_tokens_per_chunk,
+        "overlap_tokens": overlap_tokens, "build_dictionary": build_dictionary,
+        "include_format": include_format, "sheet_name": sheet_name, "output_mode": output_mode,
+        "aggregate": aggregate, "sample_head": sample_head, "sample_tail": sample_tail,
+        "sample_every": sample_every, "z_outlier": z_outlier, "dedup": dedup,
+        "dedup_max_block": dedup_max_block, "incremental": incremental,
+    }
+
+    def source_id(stop: Optional[int]) -> Dict:
+        # a growing log changes size and mtime, so incremental runs identify the consumed prefix instead
+        return _prefix_id(src, stop) if incremental else _source_id(src)
+
+    ckpt: Optional[Dict] = None
+    if resume and os.path.exists(ckpt_path):
+        with open(ckpt_path, "rb") as f:
+            ckpt = pickle.load(f)
+        if (ckpt.get("version") != CHECKPOINT_VERSION or ckpt["params"] != params
+                or ckpt["source"] != source_id(ckpt["stop"])):
+            raise ValueError(f"{ckpt_path} was written for a different CSV or different settings; remove it to start over")
+    elif os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
+
+    prev: Optional[Dict] = None
+    if not incremental:
+        if os.path.exists(inc_path):
+            os.remove(inc_path)  # the output is rewritten from scratch
+    elif ckpt is None and os.path.exists(inc_path):
+        with open(inc_path, "rb") as f:
+            prev = pickle.load(f)
+        if prev.get("version") != CHECKPOINT_VERSION or prev["params"] != params:
+            raise ValueError(f"{inc_path} was written with different settings; remove it to re-encode from scratch")
+        if prev["source"] != source_id(prev["offset"]):
+            raise ValueError(f"{path} no longer starts with the rows encoded last time; remove {inc_path} to re-encode from scratch")
+        if not jsonl_path.exists() or jsonl_path.stat().st_size != prev["out_size"]:
+            raise ValueError(f"{jsonl_path} changed since the last incremental run; remove {inc_path} to re-encode from scratch")
+        if total == prev["offset"]:
+            return str(jsonl_path), prev["index"]
+
+    # incremental runs read up to the size seen now (the file may keep growing) and
+    # leave a last record without its newline for the next run
+    stop = ckpt["stop"] if ckpt is not None else (total if incremental else None)
+    partial = not incremental
 
-            # order by frequency desc, then lexical to be deterministic
-            vocab.sort(key=lambda v: (-freq[v], v))
-            if vocab:
-                mapping = {v: f"@C{{{_col_letters(j)}}}t{i+1}" for i, v in enumerate(vocab)}
-                col_dicts[j] = mapping
-                rev_dicts[j] = {code: sval for sval, code in mapping.items()}
+    expr = where_expr(where)
+    # read the projected columns plus whatever the filter refers to
+    needed = set(col_names) | set(where_columns(expr, names) if expr else ())
+    read_cols = [c for c in names if c in needed]
+
+    def load(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+        """Filter and project a parsed block; also returns its row count before filtering."""
+        return filter_block(df, expr, col_names), df.shape[0]
+
+    if ckpt is None:
+        start = data_start if prev is None else prev["offset"]
+        per_col_freq: Dict[int, Counter] = defaultdict(Counter)
+        report = _Progress(progress, 1, start, total, 0)
+        rows = 0
+        with profiling.stage("stream_pass1", bytes_in=total - start) as st1:
+            for _, end, block in iter_frames(path, start, names, read_cols, block_bytes, stop, partial):
+                df, n = load(block)
+                st1.add(lines_in=n, cells=df.size)
+                rows += n
+                for j, col in enumerate(col_names):
+                    # str and object columns alike (pandas 3 reads strings as "str")
+                    freq = per_col_freq[j]
+                    for s, k in string_counts(df[col]).items():
+                        freq[repr(s)] += k
+                report(end, rows)
+
+        col_dicts: Dict[int, Dict[str, str]] = {} if prev is None else prev["col_dicts"]
+        rev_dicts: Dict[int, Dict[str, str]] = {} if prev is None else prev["rev_dicts"]
+        if build_dictionary and output_mode == "compressed":
+            _extend_dictionaries(col_dicts, rev_dicts, per_col_freq)
+        del per_col_freq
+    else:
+        col_dicts, rev_dicts = ckpt["col_dicts"], ckpt["rev_dicts"]
 
     # PASS 2: render + chunk
     jsonl_path.parent.mkdir(parents=True, exist_ok=True)
-    chunk_id = 0
-    buffer_lines: List[str] = []
+    sheet_title = sheet_name or src.stem
 
-    with jsonl_path.open("w", encoding="utf-8") as out_f:
-        sheet_title = sheet_name or src.stem
+    if ckpt is not None:
+        replaced = ckpt["replaced"]
+    elif prev is not None:
+        replaced = {"first_id": prev["state"].chunk_id, "out_offset": prev["out_offset"],
+                    "chunks": prev["chunks"], "index": prev["index"]}
+    else:
+        replaced = {"first_id": 0, "out_offset": 0, "chunks": 0, "index": None}
+
+    def save(offset: int, row_base: int, st: _Pass2) -> None:
+        if checkpoint_interval is None:
+            return
+        out_offset = st.writer.sync()
+        _save_checkpoint(ckpt_path, {
+            "version": CHECKPOINT_VERSION,
+            "source": source_id(stop),
+            "stop": stop,
+            "params": params,
+            "col_dicts": col_dicts,
+            "rev_dicts": rev_dicts,
+            "offset": offset,
+            "row_base": row_base,
+            "out_offset": out_offset,
+            "state": st,
+            "replaced": replaced,
+        })
+
+    if ckpt is None and prev is None:
+        state = _Pass2(
+            max_tokens_per_chunk,
+            overlap_tokens,
+            ChunkAnnotator(sheet_title),
+            OnlineAggregator(sample_head, sample_tail, sample_every, z_outlier) if aggregate else None,
+            # sampling may drop arbitrary earlier rows, so only reference the sampled tail above
+            RowDeduper(sampled_max_block(dedup_max_block, sample_tail) if aggregate else dedup_max_block,
+                       far_refs=not aggregate) if dedup else None,
+        )
         header_lines = [f"# Sheet: {sheet_title} (unknownx{len(col_names)})"]
         header_row = []
         for j, col in enumerate(col_names):
@@ -113,49 +481,116 @@ def stream_encode_csv_to_jsonl(
                 cell += "::header"
             header_row.append(cell)
         header_lines.append("[ANCHOR]" + " | ".join(header_row))
-        buffer_lines.extend(header_lines)
-
-        reader2 = pd.read_csv(path, usecols=usecols, chunksize=chunksize)
-        row_base = 0
-        for df in reader2:
-            df = df.reset_index(drop=True)
-            for i in range(df.shape[0]):
-                cells = []
-                for j, col in enumerate(col_names):
-                    val = df.iat[i, j]
-                    addr = idx_to_addr(row_base + 1 + i, j)
-                    s = _render_value(val)
-                    if output_mode == "compressed":
-                        if build_dictionary and j in col_dicts and isinstance(val, str):
-                            code = col_dicts[j].get(repr(val))
-                            if code:
-                                s = code
-                    cells.append(f"{addr}={s}")
-                buffer_lines.append(" | ".join(cells))
-
-                if _lines_to_token_count(buffer_lines) > max_tokens_per_chunk:
-                    if overlap_tokens > 0:
-                        content = "\n".join(buffer_lines)
-                        out_f.write(json.dumps({"id": chunk_id, "content": content}, ensure_ascii=False) + "\n")
-                        chunk_id += 1
-                        tail = content[-overlap_tokens * 4 :]
-                        buffer_lines = [tail]
-                    else:
-                        chunk_id = _flush_chunk(out_f, chunk_id, buffer_lines)
-                        buffer_lines = []
-            row_base += df.shape[0]
-
-        if buffer_lines:
-            chunk_id = _flush_chunk(out_f, chunk_id, buffer_lines)
-            buffer_lines = []
-
-        if output_mode == "compressed" and rev_dicts:
-            dict_lines = ["[DICT-BEGIN]"]
-            for j in sorted(rev_dicts.keys()):
-                dict_lines.append(f"[COL {_col_letters(j)}]")
-                for code, sval in rev_dicts[j].items():
-                    dict_lines.append(f"{code}={sval}")
-            dict_lines.append("[DICT-END]")
-            _ = _flush_chunk(out_f, chunk_id, dict_lines)
-
-    return str(jsonl_path), (None)
+        state.buffer_lines.extend(header_lines)
+        state.buffer_tokens = sum(count_tokens(ln) for ln in header_lines) + len(header_lines) - 1
+        offset, row_base = data_start, 0
+        mode = "wb"
+    else:
+        # continue from a checkpoint, or after the last incremental run: drop
+        # what was written after that state (the trailing chunk and DICT)
+        resumed = ckpt if ckpt is not None else prev
+        state, offset, row_base = resumed["state"], resumed["offset"], resumed["row_base"]
+        with jsonl_path.open("r+b") as f:
+            f.truncate(resumed["out_offset"])
+        mode = "ab"
+
+    threaded = workers > 0
+    render_dicts = col_dicts if build_dictionary and output_mode == "compressed" else {}
+    blocks = ((end, *load(df)) for _, end, df in iter_frames(path, offset, names, read_cols, block_bytes, stop, partial))
+    reader = Prefetcher(blocks, depth=read_ahead) if threaded else None
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gridwise-render") if threaded else None
+    state.writer = ChunkWriter(
+        str(jsonl_path), mode, state.annotate, threaded=threaded, depth=write_depth, buffer_bytes=write_buffer
+    )
+
+    def rendered() -> Iterator[Tuple[Optional[Tuple[List[str], List[int]]], Optional[int], int]]:
+        """(lines, counts) per row batch in order, with the block end and row count after a block's last batch."""
+        base = row_base
+        pending: deque = deque()
+        for end, df, n in (reader if reader is not None else blocks):
+            kept = df.shape[0]
+            starts = list(range(0, kept, batch_rows)) or [0]
+            for i0 in starts:
+                i1 = min(kept, i0 + batch_rows)
+                last = i0 == starts[-1]
+                args = (df, i0, i1, base, render_dicts, _render_value)
+                job = pool.submit(render_rows, *args) if pool is not None else render_rows(*args)
+                pending.append((job, end if last else None, base + n))
+                while len(pending) > render_ahead:
+                    job, e, b = pending.popleft()
+                    yield (job.result() if pool is not None else job), e, b
+            base += n
+        while pending:
+            job, e, b = pending.popleft()
+            yield (job.result() if pool is not None else job), e, b
+
+    report = _Progress(progress, 2, offset, total, row_base)
+    try:
+        with profiling.stage("stream_pass2") as st2:
+            if ckpt is None:
+                save(offset, row_base, state)
+            last_save = time.monotonic()
+            for (lines, counts), end, base_after in rendered():
+                state.add_counts(lines, counts)
+                for line in lines:
+                    state.push_row(line)
+                st2.add(lines_in=len(lines), cells=len(lines) * len(col_names))
+                if end is None:
+                    continue
+                state.next_block()
+                offset, row_base = end, base_after
+                report(end, row_base)
+                if checkpoint_interval is not None and time.monotonic() - last_save >= checkpoint_interval:
+                    save(end, row_base, state)
+                    last_save = time.monotonic()
+
+            if incremental:
+                # the state before the trailing chunk is flushed: the next run continues from here
+                tail = {"offset": offset, "row_base": row_base, "out_offset": state.writer.sync(),
+                        "state": copy.deepcopy(state)}
+            state.finish()
+
+            if output_mode == "compressed" and rev_dicts:
+                dict_lines = ["[DICT-BEGIN]"]
+                for j in sorted(rev_dicts.keys()):
+                    dict_lines.append(f"[COL {col_letters(j)}]")
+                    for code, sval in rev_dicts[j].items():
+                        dict_lines.append(f"{code}={sval}")
+                dict_lines.append("[DICT-END]")
+                state.writer.put(state.chunk_id, dict_lines)
+                state.chunk_id += 1
+            out_size = state.writer.sync()
+            st2.add(lines_out=state.lines_out, bytes_out=out_size)
+    finally:
+        if reader is not None:
+            reader.close()
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        state.writer.close()
+
+    if index_path is not None:
+        if replaced["index"] == index_path and os.path.exists(index_path):
+            index = update_inverted_index(
+                load_index(index_path),
+                _read_chunks(str(jsonl_path), replaced["out_offset"]),
+                remove_ids=range(replaced["first_id"], replaced["chunks"]),
+            )
+        else:
+            index = build_inverted_index(load_chunks_jsonl(str(jsonl_path)))
+        save_index(index, index_path)
+
+    if incremental:
+        _save_checkpoint(inc_path, {
+            "version": CHECKPOINT_VERSION,
+            "source": source_id(tail["offset"]),
+            "params": params,
+            "col_dicts": col_dicts,
+            "rev_dicts": rev_dicts,
+            "chunks": state.chunk_id,
+            "out_size": out_size,
+            "index": index_path,
+            **tail,
+        })
+    if os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
+    return str(jsonl_path), index_path
@@ -0,0 +1,170 @@
+from __future__ import annotations
+import json, os, queue, threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from gridwise.encode.chunking import ChunkAnnotator
+from gridwise.eval.tokens import count_tokens
+
+_DONE = object()
+
+
+def col_letters(col_index: int) -> str:
+    res = ""
+    c = col_index + 1
+    while c > 0:
+        c, rem = divmod(c - 1, 26)
+        res = chr(65 + rem) + res
+    return res
+
+
+def render_rows(
+    df: pd.DataFrame,
+    i0: int,
+    i1: int,
+    row_base: int,
+    col_dicts: Dict[int, Dict[str, str]],
+    render_value: Callable[[Any], str],
+) -> Tuple[List[str], List[int]]:
+    """
+    Render rows ``i0:i1`` of a parsed block as ``ADDR=value`` lines and
+    count each line's tokens. The row with index label ``k`` (its position
+    in the block before any filtering) becomes spreadsheet row
+    ``row_base + k + 2``; row 1 is the header. Columns are rendered one at a time from
+    object arrays, so values are plain Python scalars. String values found
+    in ``col_dicts[j]`` are replaced by their dictionary code.
+    """
+    rows = [str(row_base + int(k) + 2) for k in df.index[i0:i1]]
+    columns: List[List[str]] = []
+    for j in range(df.shape[1]):
+        letters = col_letters(j)
+        mapping = col_dicts.get(j)
+        vals = df.iloc[i0:i1, j].to_numpy(dtype=object)
+        out = []
+        for r, v in zip(rows, vals):
+            code = mapping.get(repr(v)) if mapping is not None and isinstance(v, str) else None
+            out.append(f"{letters}{r}={code or render_value(v)}")
+        columns.append(out)
+    lines = [" | ".join(parts) for parts in zip(*columns)]
+    return lines, [count_tokens(ln) for ln in lines]
+
+
+class Prefetcher:
+    """
+    Runs ``source`` (an iterator) on a background thread, keeping up to
+    ``depth`` items ready in a bounded queue. Iterate it to consume; errors
+    raised by the source are re-raised in the consumer. ``close`` stops the
+    thread early.
+    """
+
+    def __init__(self, source: Iterator, depth: int = 2) -> None:
+        self._q: queue.Queue = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(source,), name="gridwise-reader", daemon=True)
+        self._thread.start()
+
+    def _put(self, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, source: Iterator) -> None:
+        try:
+            for item in source:
+                if not self._put((item, None)):
+                    return
+        except BaseException as e:  # handed to the consumer
+            self._put((_DONE, e))
+            return
+        self._put((_DONE, None))
+
+    def __iter__(self) -> Iterator:
+        while True:
+            item, err = self._q.get()
+            if item is _DONE:
+                if err is not None:
+                    raise err
+                return
+            yield item
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class ChunkWriter:
+    """
+    Serializes chunks to JSONL in submission order. Each chunk is annotated
+    (``ChunkAnnotator``), dumped and written through a ``buffer_bytes``
+    buffer; with ``threaded=True`` this happens on a writer thread fed by a
+    queue of ``depth`` chunks, otherwise inline.
+
+    ``sync`` waits for everything submitted, flushes and fsyncs, and returns
+    the file length, which is what checkpoints record.
+    """
+
+    def __init__(self, path: str, mode: str, annotate: Optional[ChunkAnnotator],
+                 threaded: bool = True, depth: int = 64, buffer_bytes: int = 4 << 20) -> None:
+        self.annotate = annotate
+        self._f = open(path, mode, buffering=buffer_bytes)
+        self._error: Optional[BaseException] = None
+        self._q: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        if threaded:
+            self._q = queue.Queue(maxsize=max(1, depth))
+            self._thread = threading.Thread(target=self._run, name="gridwise-writer", daemon=True)
+            self._thread.start()
+
+    def _write(self, chunk_id: int, lines: List[str]) -> None:
+        content = "\n".join(lines)
+        rec = {"id": chunk_id, "content": content}
+        if self.annotate is not None:
+            rec.update(self.annotate(content))
+        self._f.write((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def _run(self) -> None:
+        assert self._q is not None
+        while True:
+            item = self._q.get()
+            try:
+                if item is _DONE:
+                    return
+                if self._error is None:
+                    self._write(*item)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._q.task_done()
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def put(self, chunk_id: int, lines: List[str]) -> None:
+        if self._q is None:
+            self._write(chunk_id, lines)
+            return
+        self._check()
+        self._q.put((chunk_id, list(lines)))
+
+    def sync(self) -> int:
+        if self._q is not None:
+            self._q.join()
+            self._check()
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        return self._f.tell()
+
+    def close(self) -> None:
+        try:
+            if self._q is not None and self._thread is not None:
+                self._q.put(_DONE)
+                self._thread.join()
+                self._check()
+        finally:
+            self._f.close()
@@ -0,0 +1,217 @@
+from __future__ import annotations
+import json, zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from gridwise.store import ChunkStore, _fetch, _tokenize, bm25_score
+
+_PRIME = np.uint64(1099511628211)
+_SALT = np.uint64(0x9E3779B97F4A7C15)
+_M1 = np.uint64(0xFF51AFD7ED558CCD)
+_M2 = np.uint64(0xC4CEB9FE1A85EC53)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    # murmur3 64-bit finalizer: spreads polynomial hashes over all bits
+    h = h ^ (h >> np.uint64(33))
+    h = h * _M1
+    h = h ^ (h >> np.uint64(33))
+    h = h * _M2
+    return h ^ (h >> np.uint64(33))
+
+
+def _ngram_hashes(codes: np.ndarray, n: int) -> np.ndarray:
+    """Polynomial rolling hash of every length-``n`` window, computed column-wise in n vector steps."""
+    m = len(codes) - n + 1
+    if m <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    h = np.full(m, np.uint64(n), dtype=np.uint64) * _SALT
+    for j in range(n):
+        h = h * _PRIME + codes[j : j + m]
+    return h
+
+
+def hash_vector(text: str, dim: int = 4096, ngrams: Tuple[int, int] = (3, 5), words: bool = True) -> np.ndarray:
+    """
+    Feature-hashed vector of ``text``: character n-grams (lengths
+    ``ngrams[0]..ngrams[1]``, over lowercased text) plus, with ``words=True``,
+    whole tokens as produced by the BM25 tokenizer (so dictionary codes like
+    ``@C{B}t3`` are features too). Each feature lands in one of ``dim``
+    buckets with a hash-derived sign; counts are damped with ``log1p`` and
+    the vector is L2-normalized, so dot products are cosine similarities.
+    """
+    codes = np.frombuffer(text.lower().encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    parts = [_ngram_hashes(codes, n) for n in range(ngrams[0], ngrams[1] + 1)]
+    if words:
+        toks = _tokenize(text)
+        if toks:
+            parts.append(np.fromiter((zlib.crc32(t.encode("utf-8")) for t in toks), dtype=np.uint64, count=len(toks)) + _SALT)
+    h = _mix(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.uint64)
+    buckets = (h & np.uint64(dim - 1)).astype(np.int64)
+    signs = np.where(h >> np.uint64(63), -1.0, 1.0)
+    v = np.bincount(buckets, weights=signs, minlength=dim)
+    v = np.sign(v) * np.log1p(np.abs(v))
+    norm = np.linalg.norm(v)
+    return (v / norm if norm > 0 else v).astype(np.float32)
+
+
+def hash_vectors(texts: Sequence[str], dim: int = 4096, ngrams: Tuple[int, int] = (3, 5), words: bool = True) -> np.ndarray:
+    """Stack ``hash_vector`` rows into a float32 ``(len(texts), dim)`` matrix."""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, t in enumerate(texts):
+        out[i] = hash_vector(t, dim, ngrams, words)
+    return out
+
+
+class VectorIndex:
+    """
+    Brute-force cosine retrieval over hashed n-gram vectors.
+
+    The vectors live in ``<path>.f32``, a raw row-major float32 matrix that
+    is memory-mapped for search, next to ``<path>.json`` with the settings
+    and chunk ids. ``add`` appends batches to the end of the matrix, so an
+    index can be built incrementally and reopened (constructing one on an
+    existing path loads its ids, so row ``i`` stays chunk ``ids[i]``); nothing is held in memory
+    beyond the current batch. ``search`` is one matrix-vector product plus
+    ``argpartition``.
+    """
+
+    def __init__(self, path: str, dim: int = 4096, ngrams: Tuple[int, int] = (3, 5), words: bool = True) -> None:
+        if dim & (dim - 1):
+            raise ValueError("dim must be a power of two")
+        self.path = path
+        self.dim = dim
+        self.ngrams = (int(ngrams[0]), int(ngrams[1]))
+        self.words = words
+        self.ids: List = []
+        self._mm: Optional[np.ndarray] = None
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        """Pick up the ids of an index already at ``path`` so ``add`` appends after its rows."""
+        meta_path = Path(f"{self.path}.json")
+        vec_path = Path(f"{self.path}.f32")
+        rows = vec_path.stat().st_size // (4 * self.dim) if vec_path.exists() else 0
+        if not meta_path.exists():
+            if rows:
+                raise ValueError(f"{vec_path} has vectors but no {meta_path}; remove it or rebuild the index")
+            return
+        meta = json.loads(meta_path.read_text())
+        settings = (meta["dim"], tuple(meta["ngrams"]), meta["words"])
+        if settings != (self.dim, self.ngrams, self.words):
+            raise ValueError(f"{self.path} was built with dim/ngrams/words={settings}; open it with VectorIndex.open")
+        if rows != len(meta["ids"]):
+            raise ValueError(f"{vec_path} holds {rows} vectors but {meta_path} lists {len(meta['ids'])} ids")
+        self.ids = meta["ids"]
+
+    @classmethod
+    def open(cls, path: str) -> "VectorIndex":
+        """Reopen the index at ``path`` with the settings it was built with."""
+        meta = json.loads(Path(f"{path}.json").read_text())
+        return cls(path, dim=meta["dim"], ngrams=tuple(meta["ngrams"]), words=meta["words"])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _save_meta(self) -> None:
+        meta = {"dim": self.dim, "ngrams": list(self.ngrams), "words": self.words, "ids": self.ids}
+        tmp = Path(f"{self.path}.json.tmp")
+        tmp.write_text(json.dumps(meta))
+        tmp.replace(f"{self.path}.json")
+
+    def add(self, chunks: Iterable[Dict], batch_size: int = 1024) -> int:
+        """Vectorize ``chunks`` in batches and append them; returns the number added."""
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        added = 0
+        batch: List[Dict] = []
+        with open(f"{self.path}.f32", "ab") as f:
+            def flush() -> None:
+                nonlocal added
+                vecs = hash_vectors([ch["content"] for ch in batch], self.dim, self.ngrams, self.words)
+                f.write(vecs.tobytes())
+                self.ids.extend(ch["id"] for ch in batch)
+                added += len(batch)
+                batch.clear()
+
+            for ch in chunks:
+                batch.append(ch)
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        self._save_meta()
+        self._mm = None
+        return added
+
+    def matrix(self) -> np.ndarray:
+        if self._mm is None:
+            if not self.ids:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            self._mm = np.memmap(f"{self.path}.f32", dtype=np.float32, mode="r", shape=(len(self.ids), self.dim))
+        return self._mm
+
+    def search(self, query: str, topk: int = 5) -> List[Dict]:
+        """Top-``topk`` ``{"id", "score"}`` by cosine similarity."""
+        return self.search_batch([query], topk)[0]
+
+    def search_batch(self, queries: Sequence[str], topk: int = 5, block_rows: int = 65536) -> List[List[Dict]]:
+        """Score several queries with one matrix product per block of ``block_rows`` vectors."""
+        mat = self.matrix()
+        if not len(queries) or not len(mat) or topk <= 0:
+            return [[] for _ in queries]
+        q = hash_vectors(queries, self.dim, self.ngrams, self.words)
+        best_s = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_i = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(mat), block_rows):
+            sc = q @ np.asarray(mat[start : start + block_rows]).T
+            idx = np.broadcast_to(np.arange(start, start + sc.shape[1]), sc.shape)
+            sc = np.concatenate([best_s, sc], axis=1)
+            idx = np.concatenate([best_i, idx], axis=1)
+            if sc.shape[1] > topk:
+                part = np.argpartition(-sc, topk - 1, axis=1)[:, :topk]
+                sc = np.take_along_axis(sc, part, axis=1)
+                idx = np.take_along_axis(idx, part, axis=1)
+            best_s, best_i = sc, idx
+        out: List[List[Dict]] = []
+        for s_row, i_row in zip(best_s, best_i):
+            order = np.lexsort((i_row, -s_row))
+            out.append([{"id": self.ids[int(i_row[o])], "score": float(s_row[o])} for o in order])
+        return out
+
+
+def rrf_fuse(rankings: Sequence[Sequence[Dict]], k: int = 60, topk: int = 5) -> List[Dict]:
+    """
+    Reciprocal-rank fusion: each document scores ``sum(1 / (k + rank))``
+    over the rankings it appears in (rank starting at 1). Returns
+    ``{"id", "score"}`` dicts, best first.
+    """
+    scores: Dict = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            scores[hit["id"]] = scores.get(hit["id"], 0.0) + 1.0 / (k + rank)
+    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:topk]
+    return [{"id": did, "score": sc} for did, sc in ranked]
+
+
+def hybrid_search(
+    query: str,
+    chunks: Union[List[Dict], ChunkStore],
+    bm25_index: Dict,
+    vectors: VectorIndex,
+    topk: int = 5,
+    depth: int = 50,
+    k: int = 60,
+) -> List[Dict]:
+    """
+    Fuse ``bm25_score`` and ``VectorIndex.search`` (each taken ``depth``
+    deep) with ``rrf_fuse``; returns ``{"id", "score", "content"}``.
+    """
+    lexical = bm25_score(query, chunks, bm25_index, topk=depth)
+    dense = vectors.search(query, topk=depth)
+    fused = rrf_fuse([lexical, dense], k=k, topk=topk)
+    content = {h["id"]: h["content"] for h in lexical}
+    missing = [h["id"] for h in fused if h["id"] not in content]
+    if missing:
+        content.update((did, ch["content"]) for did, ch in _fetch(chunks, missing).items())
+    return [{**h, "content": content[h["id"]]} for h in fused if h["id"] in content]
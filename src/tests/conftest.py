@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# the package lives in src/ and is not necessarily installed
+SRC = Path(__file__).resolve().parents[1]
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
@@ -0,0 +1,104 @@
+import re
+
+import numpy as np
+
+from gridwise.encode.compressor.aggregate import apply_aggregation
+from gridwise.encode.compressor.online_aggregate import KLLSketch, OnlineAggregator, RunningStats
+
+
+def _span(values, start=2):
+    return [f"A{r}='item' | B{r}={v:g}" for r, v in enumerate(values, start=start)]
+
+
+def _stats(agg_line, col):
+    m = re.search(rf"{col}:count=(\d+),min=([^,]+),max=([^,]+),mean=([^,]+),p10=([^,]+),p90=([^ \]]+)", agg_line)
+    return [float(x) for x in m.groups()]
+
+
+def test_short_spans_are_unchanged():
+    text = "\n".join(["[ANCHOR]A1='name' | B1='qty'"] + _span(range(10)))
+    out, _ = apply_aggregation(text, sample_head=5, sample_tail=5)
+    assert out == text
+
+
+def test_sampling_stats_and_outliers():
+    rng = np.random.default_rng(0)
+    values = np.round(rng.normal(100, 5, 500), 2)
+    values[250] = 1000.0
+    lines = _span(values)
+    out, meta = apply_aggregation("\n".join(["[ANCHOR]A1='name' | B1='qty'"] + lines),
+                                  sample_head=5, sample_tail=5, sample_every=50)
+    kept = out.splitlines()
+    assert kept[0].startswith("[ANCHOR]") and kept[-1].startswith("[AGG span=500 ")
+    body = kept[1:-1]
+    want = sorted(set(range(5)) | set(range(495, 500)) | set(range(5, 495, 50)) | {250})
+    assert body == [lines[i] for i in want]
+    assert f"kept={len(want)}" in kept[-1]
+
+    count, lo, hi, mean, p10, p90 = _stats(kept[-1], "B")
+    assert count == 500 and lo == float(f"{values.min():.4g}") and hi == float(f"{values.max():.4g}")
+    assert mean == float(f"{values.mean():.4g}")
+    ranked = np.sort(values)
+    assert p10 == float(f"{ranked[round(0.1 * 499)]:.4g}") and p90 == float(f"{ranked[round(0.9 * 499)]:.4g}")
+    assert meta["sample_every"] == 50
+
+
+def test_text_columns_are_not_summarized():
+    lines = [f"A{r}='x{r}' | B{r}='note'" for r in range(2, 100)]
+    out, _ = apply_aggregation("\n".join(lines))
+    assert "[AGG" not in out
+
+
+def _online(lines, **kw):
+    agg = OnlineAggregator(**kw)
+    out = [x for ln in lines for x in agg.push(ln)]
+    return out + agg.finish()
+
+
+def test_online_matches_batch_without_outliers():
+    values = np.round(np.random.default_rng(1).uniform(10, 20, 150), 2)
+    lines = _span(values)
+    batch, _ = apply_aggregation("\n".join(lines), sample_head=5, sample_tail=5, sample_every=20)
+    assert _online(lines, sample_head=5, sample_tail=5, sample_every=20) == batch.splitlines()
+
+
+def test_online_keeps_outliers_and_bounds_memory():
+    rng = np.random.default_rng(2)
+    values = np.round(rng.normal(0, 1, 20_000), 3)
+    values[[3_000, 12_000]] = [40.0, -40.0]
+    lines = _span(values)
+    agg = OnlineAggregator(sample_head=5, sample_tail=5, sample_every=1_000, sketch_k=200)
+    out = [x for ln in lines for x in agg.push(ln)]
+    assert len(agg._ring) <= 5 and sum(map(len, agg.sketches["B"].compactors)) < 2_000
+    out += agg.finish()
+    assert lines[3_000] in out and lines[12_000] in out
+    count, lo, hi, mean, p10, p90 = _stats(out[-1], "B")
+    assert count == 20_000 and lo == -40 and hi == 40
+    assert abs(mean - values.mean()) < 1e-3
+    assert abs(p10 - np.quantile(values, 0.1)) < 0.1 and abs(p90 - np.quantile(values, 0.9)) < 0.1
+
+
+def test_kll_and_running_stats():
+    rng = np.random.default_rng(3)
+    xs = rng.uniform(0, 1, 50_000)
+    sk, st = KLLSketch(k=200), RunningStats()
+    for x in xs:
+        sk.push(x)
+        st.push(x)
+    assert st.n == 50_000 and abs(st.mean - xs.mean()) < 1e-9 and abs(st.stdev - xs.std()) < 1e-9
+    for q in (0.1, 0.5, 0.9):
+        assert abs(sk.quantile(q) - q) < 0.03
+    small = KLLSketch(k=200)
+    for x in xs[:101]:
+        small.push(x)
+    assert small.quantile(0.5) == np.sort(xs[:101])[50]
+
+
+def test_a_column_repeated_within_a_line_counts_every_value():
+    lines = [f"A{r}={r} | B{r}=1 | A{r}={2 * r}" for r in range(2, 40)]
+    out, _ = apply_aggregation("\n".join(lines))
+    values = np.sort([v for r in range(2, 40) for v in (r, 2 * r)])
+    count, lo, hi, mean, p10, p90 = _stats(out.splitlines()[-1], "A")
+    assert (count, lo, hi) == (76, 2, 78) and mean == float(f"{values.mean():.4g}")
+    assert p10 == values[round(0.1 * 75)] and p90 == values[round(0.9 * 75)]
+    assert _online(lines)[-1] == out.splitlines()[-1]
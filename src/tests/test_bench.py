@@ -0,0 +1,52 @@
+import argparse
+
+from gridwise.bench import suite
+from gridwise.bench.suite import compare, run_suite
+from gridwise.bench.synth import synth_frame, synth_sheet
+
+
+def test_synth_is_reproducible():
+    a = synth_frame("narrow", 600, seed=3)
+    b = synth_frame("narrow", 600, seed=3)
+    assert a.equals(b)
+    assert not a.equals(synth_frame("narrow", 600, seed=4))
+    assert synth_sheet("merged_report", 600).merged_regions
+
+
+def test_each_case_measures_its_own_sheet():
+    run = run_suite(["narrow", "sparse"], [300, 1200], ["to_markdown", "index_build", "bm25"], memory=False)
+    res = {(r["name"], r["shape"], r["size"]): r for r in run["results"]}
+    # token output grows with the case size; a closure bound to the last case would not
+    for shape in ("narrow", "sparse"):
+        assert res[("to_markdown", shape, 300)]["tokens_out"] < res[("to_markdown", shape, 1200)]["tokens_out"]
+    for (name, shape, size), r in res.items():
+        if name == "bm25":
+            assert r["chunks"] == res[("index_build", shape, size)]["chunks"]
+
+
+def test_compare_flags_token_growth_only():
+    base = {"results": [{"name": "x", "shape": "s", "size": 1, "seconds": 1.0, "peak_mb": None, "tokens_out": 100}]}
+    run = {"results": [{"name": "x", "shape": "s", "size": 1, "seconds": 1.1, "peak_mb": None, "tokens_out": 101}]}
+    rows = {r["metric"]: r for r in compare(run, base)}
+    assert rows["tokens_out"]["regression"]
+    assert not rows["seconds"]["regression"]
+
+
+def test_main_compares_with_the_previous_run_of_its_own_history(tmp_path, monkeypatch):
+    hist = str(tmp_path / "h.json")
+    args = argparse.Namespace(
+        sizes="1", preset="quick", shapes=None, only=None, repeat=1, no_memory=True, seed=0,
+        history=hist, baseline=hist, save_baseline=None, threshold=0.2, fail_on_regression=True,
+    )
+    tokens = iter([100, 100, 150])
+
+    def fake_suite(*a, **kw):
+        r = {"name": "x", "shape": "s", "size": 1, "cells": 1, "seconds": 0.1, "cells_per_s": 10.0,
+             "peak_mb": None, "tokens_out": next(tokens)}
+        return {"results": [r]}
+
+    monkeypatch.setattr(suite, "run_suite", fake_suite)
+    assert suite.main(args) == 0  # first run: no baseline yet
+    assert suite.main(args) == 0
+    assert suite.main(args) == 1  # 150 tokens against the previous run's 100
+    assert len(suite.load_history(hist)) == 3
@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+
+from gridwise.store import (
+    ChunkStore, bm25_score, bm25_score_batch, build_inverted_index, csr_path, load_csr, load_index, save_chunk_store,
+    save_index,
+)
+
+
+def _collection(seed=0, n=400):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(150)] + ["@C{A}t1", "@C{B}t2"]
+    chunks = [{"id": i, "content": " ".join(rng.choice(words) for _ in range(rng.randint(3, 40)))} for i in range(n)]
+    return chunks, words, rng
+
+
+def test_batch_equals_single_queries():
+    chunks, words, rng = _collection()
+    index = build_inverted_index(chunks)
+    queries = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))) for _ in range(120)]
+    queries += ["", "   ", "nothing-matches", queries[0] + " " + queries[0]]
+    for topk in (1, 5, 50):
+        batch = bm25_score_batch(queries, index, topk=topk, chunks=chunks, batch_size=32)
+        assert batch == [bm25_score(q, chunks, index, topk=topk) for q in queries]
+
+
+def test_batch_reads_only_winners_from_a_store(tmp_path):
+    chunks, _, _ = _collection(1, 100)
+    index = build_inverted_index(chunks)
+    path = str(tmp_path / "c.jsonl")
+    save_chunk_store(chunks, path)
+    with ChunkStore(path) as store:
+        got = bm25_score_batch(["w1 w2", "w3"], index, topk=3, chunks=store)
+    assert got == bm25_score_batch(["w1 w2", "w3"], index, topk=3, chunks=chunks)
+    assert [h.keys() for h in bm25_score_batch(["w1"], index)[0]][0] == {"id", "score"}
+    assert bm25_score_batch(["w1"], build_inverted_index([])) == [[]]
+
+
+def test_memory_mapped_csr_matches_the_pickled_index(tmp_path):
+    chunks, words, rng = _collection(2, 300)
+    chunks[5]["content"] += " ärger zürich"  # non-ASCII terms sort by their UTF-8 bytes
+    index = build_inverted_index(chunks)
+    path = str(tmp_path / "ix.pkl")
+    save_index(index, path)
+    mapped = load_csr(csr_path(path))
+    assert isinstance(mapped["csr"]["docs"], np.memmap) and "csr" not in load_index(path)
+    queries = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))) for _ in range(80)]
+    queries += ["zürich", "ärger w1", "nothing-matches", ""]
+    want = bm25_score_batch(queries, build_inverted_index(chunks), topk=7, chunks=chunks)
+    assert bm25_score_batch(queries, mapped, topk=7, chunks=chunks) == want
+
+    # string ids, and re-saving while the old arrays are still mapped
+    named = [{**ch, "id": f"c{ch['id']}"} for ch in chunks[:50]]
+    save_index(build_inverted_index(named), path)
+    assert mapped["csr"]["docs"].sum() >= 0
+    got = bm25_score_batch(["w1 w2"], load_csr(csr_path(path)), topk=3)
+    assert got == bm25_score_batch(["w1 w2"], build_inverted_index(named), topk=3)
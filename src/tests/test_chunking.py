@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from gridwise.encode.best import best_encode
+from gridwise.encode.chunking import ChunkAnnotator
+from gridwise.io.loaders import from_dataframe
+from gridwise.store import build_range_index, lookup_chunks
+
+
+def test_annotator_spans_ranges_and_repeats():
+    ann = ChunkAnnotator()
+    first = ann("# Sheet: sales (40x4)\n[ANCHOR]A1='Region'::header | B1='Units'::header\nA2='EMEA' | B2=3\nA3:A9='APAC' | C3=1")
+    assert first == {"sheet": "sales", "row_start": 1, "row_end": 9, "cols": ["A", "B", "C"],
+                     "context": "A1='Region'::header | B1='Units'::header"}
+    second = ann("A10='EMEA' | B10=4\n[REPEAT of rows 9-10 x 3]\nAA17=1 | B17:D17=0")
+    assert second["sheet"] == "sales" and second["context"] == first["context"]
+    assert (second["row_start"], second["row_end"]) == (10, 17)
+    assert second["cols"] == ["A", "B", "C", "D", "AA"]
+    assert ann("[DICT-BEGIN]\n[COL A]\n@C{A}t1='EMEA'\n[DICT-END]")["row_start"] is None
+
+
+def test_range_lookup_matches_a_scan():
+    rng = np.random.default_rng(0)
+    chunks = []
+    for i in range(300):
+        a = int(rng.integers(1, 5_000))
+        chunks.append({"id": i, "sheet": ["s1", "s2"][i % 2], "row_start": a, "row_end": a + int(rng.integers(0, 300)),
+                       "cols": sorted(rng.choice(list("ABCDE"), 2, replace=False).tolist())})
+    chunks.append({"id": 300, "sheet": "s1", "row_start": None, "row_end": None, "cols": []})
+    ix = build_range_index(chunks)
+    for _ in range(200):
+        r1 = int(rng.integers(1, 5_300))
+        r2 = r1 + int(rng.integers(0, 500))
+        for sheet, cols in ((None, None), ("s1", None), ("s2", ["b", "e"])):
+            want = {ch["id"] for ch in chunks if ch["row_start"] is not None and ch["row_start"] <= r2
+                    and ch["row_end"] >= r1 and (sheet is None or ch["sheet"] == sheet)
+                    and (cols is None or set(ch["cols"]) & {c.upper() for c in cols})}
+            got = lookup_chunks(ix, rows=(r1, r2), cols=cols, sheet=sheet)
+            assert len(got) == len(set(got)) and set(got) == want
+
+
+def test_encoded_chunks_carry_their_spans():
+    df = pd.DataFrame({"region": [f"Region number {i % 7}" for i in range(600)], "units": range(600)})
+    res = best_encode(from_dataframe(df, name="sales"), compress_min_tokens=0, use_aggregation=False,
+                      max_tokens_per_chunk=500, overlap_tokens=0)
+    rows = [ch for ch in res.chunks if ch["row_start"] is not None]
+    assert len(rows) > 3 and all(ch["sheet"] == "sales" for ch in rows)
+    assert rows[0]["row_start"] == 1 and rows[-1]["row_end"] == 601
+    assert all(a["row_end"] < b["row_start"] for a, b in zip(rows, rows[1:]))
+    assert all(ch["context"].startswith("A1='region'::header") for ch in rows)
+    ix = build_range_index(res.chunks)
+    hit = lookup_chunks(ix, rows=(300, 300))
+    assert len(hit) == 1 and "A300=" in next(ch["content"] for ch in res.chunks if ch["id"] == hit[0])
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from gridwise.corpus import CorpusIndex, doc_id, shard_of, split_doc_id
+from gridwise.store import bm25_score, build_inverted_index, save_chunks_jsonl
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(200)]
+    d = tmp_path_factory.mktemp("corpus")
+    sources, flat = [], []
+    for f in range(60):
+        sheet = f"S{f % 3}"
+        chunks = [{"id": i, "sheet": sheet, "content": " ".join(rng.choice(words) for _ in range(rng.randint(5, 60)))}
+                  for i in range(rng.randint(1, 8))]
+        if f % 2:
+            name = str(d / f"{f}.jsonl")
+            save_chunks_jsonl(chunks, name)
+            sources.append(name)
+        else:
+            name = f"dir/file#{f}.xlsx"
+            sources.append((name, chunks))
+        flat += [{"id": doc_id(name, sheet, c["id"]), "content": c["content"]} for c in chunks]
+    return sources, flat, words
+
+
+def _hits(results):
+    return {(h["id"], round(h["score"], 9)) for h in results}
+
+
+def test_ids_and_shards():
+    did = doc_id("a#b.xlsx", "Sheet 1", 7)
+    assert split_doc_id(did) == ("a#b.xlsx", "Sheet 1", "7")
+    assert split_doc_id(doc_id("book.jsonl", "Q#1", 0)) == ("book.jsonl", "Q#1", "0")
+    assert split_doc_id(doc_id("100%23#.xlsx", "%#%", "c#")) == ("100%23#.xlsx", "%#%", "c#")
+    assert shard_of("a.xlsx", 8) == shard_of("a.xlsx", 8) < 8
+
+
+def test_sharded_search_matches_a_single_index(corpus, tmp_path):
+    sources, flat, words = corpus
+    index = build_inverted_index(flat)
+    ci = CorpusIndex.build(sources, n_shards=4, max_workers=1)
+    assert len(ci) == len(flat) and sum(len(s.ids) for s in ci.shards) == len(flat)
+    pooled = CorpusIndex.build(sources, n_shards=4, max_workers=2)
+    assert [s.ids for s in pooled.shards] == [s.ids for s in ci.shards]
+    pooled.close()
+    rng = random.Random(1)
+    queries = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 3))) for _ in range(50)]
+    for q in queries:
+        assert _hits(ci.search(q, topk=1_000)) == _hits(bm25_score(q, flat, index, topk=1_000))
+    top = ci.search(queries[0], topk=3)
+    assert [h["score"] for h in top] == sorted((h["score"] for h in top), reverse=True)
+    assert all(split_doc_id(h["id"]) == (h["file"], h["sheet"], h["chunk"]) for h in top)
+
+    ci.save(str(tmp_path / "ix"), compression="zlib")
+    loaded = CorpusIndex.load(str(tmp_path / "ix"))
+    try:
+        for q in queries[:10]:
+            assert loaded.search(q, topk=5) == ci.search(q, topk=5)
+    finally:
+        loaded.close()
+        ci.close()
+
+
+def test_empty_queries():
+    ci = CorpusIndex.build([("f", [{"id": 0, "sheet": "s", "content": "alpha"}])], n_shards=2, max_workers=1)
+    assert ci.search("") == [] and ci.search("zzz") == []
+    assert ci.search("alpha")[0]["id"] == "f#s#0"
+
+
+def test_sheet_names_with_hashes(tmp_path):
+    ci = CorpusIndex.build([("book.jsonl", [{"id": 0, "sheet": "Q#1", "content": "alpha"}])], n_shards=2, max_workers=1)
+    hit = ci.search("alpha")[0]
+    assert (hit["file"], hit["sheet"], hit["chunk"]) == ("book.jsonl", "Q#1", "0")
+    ci.save(str(tmp_path / "ix"))
+    loaded = CorpusIndex.load(str(tmp_path / "ix"))
+    assert loaded.search("alpha") == ci.search("alpha")
+    loaded.close()
+    ci.close()
+    manifest = tmp_path / "ix" / "manifest.json"
+    manifest.write_text(manifest.read_text().replace('"version": 2', '"version": 1'))
+    with pytest.raises(ValueError, match="version 1"):
+        CorpusIndex.load(str(tmp_path / "ix"))
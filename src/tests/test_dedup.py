@@ -0,0 +1,89 @@
+import pickle
+import re
+
+import pytest
+
+from gridwise.encode.compressor import dedup, encode
+from gridwise.encode.compressor.dedup import RowDeduper, apply_dedup, row_hash
+from gridwise.encode.post import expand_repeats
+
+
+def _row(r, *values):
+    return " | ".join(f"{c}{r}={v}" for c, v in zip("ABC", values))
+
+
+def _sheet():
+    values = [("'x'", 1, 2)] * 40  # rows 2-41: one row repeated
+    values += [("'a'", 1, 1), ("'b'", 2, 2), ("'c'", 3, 3)] * 5  # rows 42-56: a repeating block
+    values += [("'y'", 7, 8), ("'z'", 9, 9), ("'b'", 2, 2)]  # row 59 repeats row 43
+    lines = ["[ANCHOR]A1='k' | B1='u' | C1='v'"]
+    lines += [_row(r, *v) for r, v in enumerate(values, start=2)]
+    return "\n".join(lines)
+
+
+def test_markers_round_trip():
+    text = _sheet()
+    out, meta = apply_dedup(text, max_block=3)
+    assert "[REPEAT of row 2 x 39]" in out
+    assert "[REPEAT of rows 42-44 x 4]" in out
+    assert "[REPEAT of row 43 x 1]" in out
+    assert meta["rows_in"] == 59 and meta["markers"] == 3
+    assert expand_repeats(out) == text
+
+
+def test_hash_collisions_are_verified(monkeypatch):
+    text = _sheet()
+    monkeypatch.setattr(dedup, "row_hash", lambda key: 0)  # every row collides
+    out, _ = apply_dedup(text, max_block=3)
+    assert "[REPEAT of row 2 x 39]" in out and "[REPEAT of rows 42-44 x 4]" in out
+    assert expand_repeats(out) == text
+
+
+def test_hash_is_stable_and_state_pickles():
+    assert row_hash("A=1") == row_hash("A=1") != row_hash("A=2")
+    d = RowDeduper()
+    lines = _sheet().splitlines()
+    out = [x for ln in lines[:30] for x in d.push(ln)]
+    d = pickle.loads(pickle.dumps(d))
+    out += [x for ln in lines[30:] for x in d.push(ln)] + d.finish()
+    assert "\n".join(out) == apply_dedup(_sheet())[0]
+
+
+@pytest.mark.parametrize("far_refs", [True, False])
+def test_expand_across_chunks(far_refs):
+    text = _sheet()
+    out, _ = apply_dedup(text, far_refs=far_refs)
+    lines = out.split("\n")
+    rows = {}
+    parts = [expand_repeats("\n".join(lines[i:i + 5]), rows) for i in range(0, len(lines), 5)]
+    assert "\n".join(parts) == text
+
+
+def _blocky(n_blocks=5):
+    """Distinct rows, a 4-row block repeated ``n_blocks`` more times, one row repeated, then distinct rows."""
+    lines = ["[ANCHOR]A1='k' | B1='v'"]
+    lines += [_row(r, f"'u{r}'", r) for r in range(2, 42)]
+    block = [("'a'", 1), ("'b'", 2), ("'c'", 3), ("'d'", 4)]
+    r = 42
+    for _ in range(n_blocks + 1):
+        for v in block:
+            lines.append(_row(r, *v))
+            r += 1
+    lines += [_row(r + i, "'same'", 0) for i in range(10)]
+    r += 10
+    lines += [_row(r + i, f"'w{i}'", i) for i in range(40)]
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("fit_budget", [False, True])
+def test_dedup_with_aggregation_only_refers_to_kept_rows(fit_budget):
+    text = _blocky()
+    res = encode(text, use_dedup=True, use_aggregation=True, use_inverted_index=False, use_anchors=False,
+                 sample_head=2, sample_tail=2, sample_every=1000, fit_budget=fit_budget, budget_tokens=100_000)
+    out = res["content"]
+    assert "[REPEAT of row" in out
+    for m in re.finditer(r"^\[REPEAT of rows? (\d+)(?:-(\d+))? x \d+\]$", out, re.M):
+        a, b = int(m.group(1)), int(m.group(2) or m.group(1))
+        assert b - a + 1 <= 2
+        assert all(re.search(rf"^A{r}=", out, re.M) for r in range(a, b + 1))
+    assert "[REPEAT" not in expand_repeats(out)
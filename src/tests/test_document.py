@@ -0,0 +1,47 @@
+import pandas as pd
+
+from gridwise.encode.best import best_encode
+from gridwise.encode.document import EncodedDocument
+from gridwise.encode.post import expand_chunks_with_dict, expand_text_with_dict, parse_dict_block
+from gridwise.io.loaders import from_dataframe
+
+
+def _result():
+    df = pd.DataFrame({
+        "region": [["Europe and Middle East", "Asia Pacific region", "North and South America"][i % 3] for i in range(200)],
+        "product": [["Industrial widget kit", "Consumer gadget bundle"][i % 2] for i in range(200)],
+        "units": list(range(200)),
+    })
+    return best_encode(from_dataframe(df, name="sales"), compress_min_tokens=0, use_aggregation=False)
+
+
+def test_document_matches_its_text():
+    res = _result()
+    doc = res.document
+    assert res.kind == "compressed" and doc.dictionary
+    assert doc.text == res.text
+    parsed = EncodedDocument.from_text(res.text)
+    assert parsed.lines == doc.lines
+    assert parsed.dictionary == doc.dictionary
+    assert parsed.anchors == doc.anchors
+    assert dict(parsed.code_counts) == dict(doc.code_counts)
+    assert parse_dict_block(res.text) == doc.dictionary
+
+
+def test_expanded_document_matches_text_expansion():
+    doc = _result().document
+    expanded = doc.expanded()
+    assert "@C{" not in "\n".join(expanded.lines)
+    assert expanded.text == expand_text_with_dict(doc.text, doc.dictionary)
+
+
+def test_chunks_expand_with_their_own_table_dictionary():
+    chunks = [
+        {"id": 0, "table": 0, "content": "A1=@C{A}t1"},
+        {"id": 1, "table": 0, "content": "[DICT-BEGIN]\n[COL A]\n@C{A}t1='north'\n[DICT-END]"},
+        {"id": 2, "table": 1, "content": "D1=@C{A}t1"},
+        {"id": 3, "table": 1, "content": "[DICT-BEGIN]\n[COL A]\n@C{A}t1='south'\n[DICT-END]"},
+    ]
+    out = expand_chunks_with_dict(chunks)
+    assert out[0]["content"] == "A1='north'"
+    assert out[2]["content"] == "D1='south'"
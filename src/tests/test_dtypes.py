@@ -0,0 +1,66 @@
+import datetime as dt
+import decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gridwise.core.dates import MAX_DATE_LEN
+from gridwise.core.dtypes import TypeInference, infer_column, string_counts
+from gridwise.core.utils import infer_dtype
+
+VALUES = [
+    None, float("nan"), np.float32("nan"), pd.NaT, pd.NA, np.datetime64("NaT"),
+    True, np.bool_(False), 3, np.int64(3), 2.5, np.float32(1.5), decimal.Decimal("1.5"),
+    dt.datetime(2024, 1, 1), dt.date(2024, 1, 1), dt.time(9, 30), pd.Timestamp("2024-01-01"),
+    np.datetime64("2024-01-01"), "2024-07-15", "07/15/2024", "15 Jul 2024", "July 15, 2024", "12:30",
+    "A-12", "1-2", "2024", "1,234", "hello", "Meeting notes: July 15, 2024", "", dt.timedelta(days=1),
+    # either side of MAX_DATE_LEN
+    "2024-07-15T12:30:00.00000", "2024-07-15T12:30:00.000000",
+]
+
+
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+def test_scalar_and_column_agree(value):
+    assert infer_dtype(value) == infer_column([value])[0]
+
+
+def test_length_limit_is_shared():
+    assert TypeInference().max_date_len == MAX_DATE_LEN == len("2024-07-15T12:30:00.00000")
+    assert infer_dtype("2024-07-15T12:30:00.00000") == "date"
+    assert infer_dtype("2024-07-15T12:30:00.000000") == "text"
+
+
+def test_labels():
+    labels = dict(zip(map(repr, VALUES), (infer_dtype(v) for v in VALUES)))
+    assert labels["np.int64(3)"] == "number"
+    assert labels["datetime.date(2024, 1, 1)"] == "date"
+    assert labels["'2024-07-15'"] == labels["'July 15, 2024'"] == "date"
+    assert labels["'A-12'"] == labels["'1-2'"] == labels["'2024'"] == "text"
+    assert labels["NaT"] == labels["<NA>"] == "empty"
+
+
+def test_typed_columns_take_dtype_fast_paths():
+    assert list(infer_column(pd.Series([1, None], dtype="Int64"))) == ["number", "empty"]
+    assert list(infer_column(pd.Series([True, None], dtype="boolean"))) == ["bool", "empty"]
+    assert list(infer_column(pd.Series(pd.to_datetime(["2024-01-01", None])))) == ["date", "empty"]
+    cat = pd.Series(["x", "2024-01-01", None], dtype="category")
+    assert list(infer_column(cat)) == ["text", "date", "empty"]
+
+
+def test_date_formats_are_configurable():
+    iso_only = TypeInference(date_formats=("ISO8601",))
+    assert list(infer_column(["2024-01-02", "01/02/2024"], iso_only)) == ["date", "text"]
+
+
+def test_sampling_keeps_labels_exact():
+    days = pd.date_range("2000-01-01", periods=500).strftime("%Y-%m-%d").tolist()
+    values = days + [f"item {i}-x" for i in range(500)]
+    labels = infer_column(values, TypeInference(sample_size=50))
+    assert list(labels) == ["date"] * 500 + ["text"] * 500
+
+
+def test_string_counts_covers_str_and_object_columns():
+    assert string_counts(pd.Series(["a", "b", "a", None])) == {"a": 2, "b": 1}
+    assert string_counts(pd.Series(["a", 3, "a", None], dtype=object)) == {"a": 2}
+    assert string_counts(pd.Series([1, 2])) == {}
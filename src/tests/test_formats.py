@@ -0,0 +1,58 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from gridwise.core.formats import compact_value, format_tag
+from gridwise.core.model import Cell, Sheet
+from gridwise.core.utils import idx_to_addr
+from gridwise.encode.ranges import format_declarations
+from gridwise.encode.vanilla import to_markdown
+
+
+@pytest.mark.parametrize("fmt, tag", [
+    ("General", None), (None, None), ("header", None), ("@", "text"),
+    ("0.00%", "pct"), ('"$"#,##0.00', "cur"), ("[$€-407]#,##0", "cur"), ("0.00E+00", "sci"),
+    ("# ?/?", "frac"), ("#,##0.00", "dec"), ("#,##0", "int"), ("0;[Red]-0", "int"),
+    ("yyyy-mm-dd", "date"), ("d-mmm-yy", "date"), ("h:mm AM/PM", "time"), ("mm:ss", "time"),
+    ("yyyy-mm-dd h:mm", "datetime"), ('"Qty "0', "int"),
+])
+def test_format_tag(fmt, tag):
+    assert format_tag(fmt) == tag
+
+
+@pytest.mark.parametrize("value, text", [
+    (dt.datetime(2024, 7, 15), "2024-07-15"),
+    (dt.datetime(2024, 7, 15, 9, 30), "2024-07-15 09:30"),
+    (dt.datetime(2024, 7, 15, 9, 30, 5), "2024-07-15 09:30:05"),
+    (dt.date(2024, 7, 15), "2024-07-15"),
+    (dt.time(9, 30), "09:30:00"),
+    (np.float64(1.5), "1.5"),
+    (np.int64(3), "3"),
+    (float("nan"), "NaN"),
+    ("Yes", "'Yes'"),
+])
+def test_compact_value(value, text):
+    assert compact_value(value) == text
+
+
+def _priced(n=20):
+    cells = [Cell(0, 0, "A1", "Day", "text", "header"), Cell(0, 1, "B1", "Price", "text", "header"),
+             Cell(0, 2, "C1", "Cost", "text", "header")]
+    for r in range(1, n + 1):
+        day = dt.datetime(2024, 1, r)
+        cells += [Cell(r, 0, idx_to_addr(r, 0), day, "date", "yyyy-mm-dd"),
+                  Cell(r, 1, idx_to_addr(r, 1), 2.5 * r, "number", '"$"#,##0.00'),
+                  Cell(r, 2, idx_to_addr(r, 2), 1.5 * r, "number", "[$€-407]#,##0")]
+    return Sheet("prices", n + 1, 3, cells)
+
+
+def test_formats_are_declared_once_per_rectangle():
+    sheet = _priced()
+    assert format_declarations(sheet) == ["[META] fmt=A2:A21 date", "[META] fmt=B2:C21 cur"]
+    text = to_markdown(sheet, compact_formats=True)
+    lines = text.splitlines()
+    assert lines[1:3] == ["[META] fmt=A2:A21 date", "[META] fmt=B2:C21 cur"]
+    assert lines[4] == "A2=2024-01-01 | B2=2.5 | C2=1.5"
+    assert "::" not in "\n".join(lines[4:])
+    assert len(text) < len(to_markdown(sheet)) / 2
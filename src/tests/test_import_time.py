@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1]
+
+# cumulative import time of gridwise.cli, in microseconds; it is ~15 ms without
+# the heavy dependencies and ~0.8 s with pandas, so this only trips on a regression
+CLI_IMPORT_BUDGET_US = 150_000
+HEAVY = ("pandas", "numpy", "openpyxl", "pyarrow", "tiktoken")
+
+
+def _importtime(*args: str):
+    """Run python -X importtime with ``args``; return {module: cumulative us}."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(SRC), os.environ.get("PYTHONPATH", "")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _, cumulative, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        times[name] = int(cumulative)
+    return times
+
+
+def test_cli_import_within_budget():
+    times = _importtime("-c", "import gridwise.cli")
+    assert times["gridwise.cli"] < CLI_IMPORT_BUDGET_US, times["gridwise.cli"]
+
+
+@pytest.mark.parametrize("args", [
+    ("-c", "import gridwise.cli"),
+    ("-c", "import gridwise.io"),
+    ("-c", "import gridwise.eval.tokens"),
+    ("-m", "gridwise.cli", "--help"),
+])
+def test_no_heavy_imports(args):
+    times = _importtime(*args)
+    loaded = [m for m in HEAVY if m in times]
+    assert not loaded, f"{' '.join(args)} imported {loaded}"
+
+
+def test_tokenizer_loaded_once():
+    from gridwise.eval.tokens import _encoding, count_tokens
+
+    _encoding.cache_clear()
+    for text in ("A1='x'", "B2=3 | C2=4.5", "[DICT-BEGIN]"):
+        assert count_tokens(text) >= 1
+    assert _encoding.cache_info().misses == 1
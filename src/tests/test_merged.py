@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+from openpyxl import Workbook
+
+from gridwise.core.regions import RegionIndex
+from gridwise.encode.ranges import to_range_markdown
+from gridwise.encode.vanilla import to_markdown
+from gridwise.io.xlsx_loader import from_xlsx_rich
+
+
+def _random_regions(seed, n=60, size=40):
+    rng = np.random.default_rng(seed)
+    taken = np.zeros((size, size), dtype=bool)
+    regions = []
+    for _ in range(n):
+        r1, c1 = rng.integers(0, size, 2)
+        r2, c2 = min(size - 1, r1 + rng.integers(0, 4)), min(size - 1, c1 + rng.integers(0, 4))
+        if not taken[r1:r2 + 1, c1:c2 + 1].any():
+            taken[r1:r2 + 1, c1:c2 + 1] = True
+            regions.append((int(r1), int(c1), int(r2), int(c2)))
+    return regions
+
+
+def test_region_index_matches_a_scan():
+    regions = _random_regions(0)
+    index = RegionIndex(regions)
+    assert len(index) == len(regions)
+    for row, col in itertools.product(range(42), range(42)):
+        want = next((r for r in regions if r[0] <= row <= r[2] and r[1] <= col <= r[3]), None)
+        assert index.region_at(row, col) == want
+        assert index.is_covered(row, col) == (want is not None and (want[0], want[1]) != (row, col))
+
+
+def _report(path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "report"
+    ws["A1"] = "Q3 Report"
+    ws.merge_cells("A1:C1")
+    ws.append(["Region", "Units", "Price"])
+    ws["A3"] = "EMEA"
+    ws.merge_cells("A3:A5")
+    for r in range(3, 6):
+        ws.cell(row=r, column=2, value=r * 10)
+        ws.cell(row=r, column=3, value=1.5 * r)
+    wb.save(path)
+
+
+def test_merged_blocks_render_once(tmp_path):
+    path = tmp_path / "report.xlsx"
+    _report(path)
+    sheet = from_xlsx_rich(str(path))
+    assert sorted(sheet.merged_regions) == [(0, 0, 0, 2), (2, 0, 4, 0)]
+    assert sheet.resolve(4, 0) == (2, 0) and sheet.resolve(4, 1) == (4, 1)
+    # covered coordinates hold no cell of their own
+    assert not any(sheet.region_index().is_covered(c.row, c.col) for c in sheet.cells)
+
+    text = to_markdown(sheet, include_format=False)
+    assert "A1:C1='Q3 Report'" in text and "B1=" not in text
+    assert "A3:A5='EMEA' | B3=30" in text and "A4=" not in text
+    ranged = to_range_markdown(sheet, include_format=False)
+    assert "A1:C1='Q3 Report'" in ranged and "A3:A5='EMEA'" in ranged
@@ -0,0 +1,97 @@
+import pandas as pd
+
+from gridwise.encode.best import best_encode
+from gridwise.encode.compressor import planner
+from gridwise.encode.compressor.invert_index import apply_inverted_index
+from gridwise.encode.compressor.planner import LADDER, _escalate, _StageCache, plan_document
+from gridwise.encode.vanilla import to_markdown
+from gridwise.eval.tokens import count_tokens
+from gridwise.io.loaders import from_dataframe
+
+
+def _sheet(n=300):
+    df = pd.DataFrame({
+        "region": [["EMEA", "APAC", "AMER"][i % 3] for i in range(n)],
+        "status": [["Open", "Closed"][i % 2] for i in range(n)],
+        "units": [i % 17 for i in range(n)],
+        "price": [round(1.5 + (i % 11) * 0.25, 2) for i in range(n)],
+    })
+    return from_dataframe(df, name="sales")
+
+
+BASE = {
+    "use_anchors": False, "k_keep_between": 0, "use_inverted_index": False, "dict_min_freq": 5,
+    "dict_encode_all_strings": False, "dict_skip_if_shorter_than": None, "use_aggregation": False,
+    "use_dedup": False, "dedup_max_block": 8, "sample_head": 5, "sample_tail": 5, "sample_every": 50,
+}
+
+
+def test_ladder_only_tightens_caller_settings():
+    settings = dict(BASE)
+    for delta in LADDER:
+        nxt = _escalate(settings, delta)
+        # caller's choices the ladder has no business changing are kept
+        assert nxt["dict_skip_if_shorter_than"] is None
+        assert nxt["dedup_max_block"] == 8
+        assert nxt["dict_min_freq"] <= settings["dict_min_freq"]
+        assert nxt["sample_every"] >= settings["sample_every"]
+        for k in ("use_anchors", "use_inverted_index", "use_dedup", "use_aggregation"):
+            assert nxt[k] or not settings[k]
+        settings = nxt
+    assert settings["dict_min_freq"] == 2
+
+
+def test_plan_document_keeps_dedup_settings():
+    text = to_markdown(_sheet())
+    _, meta = plan_document(text, 1, use_dedup=True, dedup_max_block=2, dict_skip_if_shorter_than=None)
+    assert meta["planner"]["settings"]["dedup_max_block"] == 2
+    assert meta["planner"]["settings"]["dict_skip_if_shorter_than"] is None
+    assert meta["dedup"]["max_block"] == 2
+
+
+
+def test_budget_applies_below_compress_threshold():
+    sheet = _sheet()
+    budget = 1000
+    res = best_encode(sheet, budget_tokens=budget)  # vanilla is well under compress_min_tokens
+    assert res.tokens_vanilla > budget
+    assert res.meta["budget"]["budget_tokens"] == budget
+    if res.meta["budget"]["fits"]:
+        assert count_tokens(res.text) <= budget
+    else:
+        assert res.meta["compression_meta"]["planner"]["fits"] is False
+
+
+def _layered(n=1_200):
+    """A sheet on which every ladder step shrinks or rewrites the output."""
+    df = pd.DataFrame({
+        "region": [["EMEA", "APAC", "AMER"][(i // 40) % 3] for i in range(n)],  # frequent values
+        "batch": [f"batch {i // 3}" for i in range(n)],  # values seen three times
+        "note": [f"note {i}" if i % 9 == 0 else "" for i in range(n)],  # values seen once
+        "units": [(i // 3) % 17 if i < 150 else i % 17 for i in range(n)],  # duplicate rows up top
+    })
+    return from_dataframe(df, name="layers")
+
+
+def test_every_ladder_step_changes_the_output():
+    cache = _StageCache(to_markdown(_layered()))
+    settings, prev = dict(BASE), None
+    for delta in LADDER:
+        settings = _escalate(settings, delta)
+        text = cache.run(settings)[0].text
+        assert text != prev, delta
+        prev = text
+
+
+def test_planner_skips_steps_without_effect(monkeypatch):
+    seen = []
+
+    def spy(text, min_freq, encode_all_strings, skip_if_shorter_than):
+        seen.append((min_freq, encode_all_strings))
+        return apply_inverted_index(text, min_freq=min_freq, encode_all_strings=encode_all_strings,
+                                    skip_if_shorter_than=skip_if_shorter_than)
+
+    monkeypatch.setattr(planner, "apply_inverted_index", spy)
+    _, meta = plan_document(to_markdown(_sheet()), 1)  # encodes every string from the start
+    assert seen and all(s == (3, True) for s in seen)
+    assert not meta["planner"]["fits"]
@@ -0,0 +1,69 @@
+import json
+
+import pandas as pd
+import pytest
+
+from gridwise import profiling
+from gridwise.encode.best import best_encode
+from gridwise.io.loaders import from_dataframe
+
+
+def _sheet():
+    df = pd.DataFrame({"region": [f"Region number {i % 5}" for i in range(300)], "units": range(300)})
+    return from_dataframe(df, name="s")
+
+
+def test_stages_nest_and_count():
+    with profiling.profile() as prof:
+        with profiling.stage("outer", bytes_in=10) as st:
+            st.text_out("a\nb")
+            with profiling.stage("inner"):
+                profiling.count("cells", 3)
+        with profiling.stage("outer"):
+            pass
+    report = prof.report()
+    assert list(report) == ["outer", "outer/inner"]
+    assert report["outer"]["calls"] == 2 and report["outer"]["bytes_in"] == 10
+    assert report["outer"]["bytes_out"] == 3 and report["outer"]["lines_out"] == 2
+    assert report["outer"]["cells"] == 3 and report["outer/inner"]["cells"] == 3
+    assert report["outer"]["seconds"] >= report["outer/inner"]["seconds"]
+    assert json.loads(profiling.format_report(report, "json")) == report
+    table = profiling.format_report(report)
+    assert table.splitlines()[2].startswith("outer") and table.splitlines()[3].startswith("  inner")
+
+
+def test_inactive_stages_record_nothing():
+    with profiling.stage("idle") as st:
+        st.add(cells=5)
+    assert st.counters == {} and st.path == ""
+
+
+def test_encode_reports_its_timings_and_nested_profiles_merge():
+    with profiling.profile() as prof:
+        res = best_encode(_sheet(), compress_min_tokens=0)
+    timings = res.meta["timings"]
+    for path in ("best_encode", "best_encode/compress", "best_encode/compress/anchors", "best_encode/chunk"):
+        assert path in timings and path in prof.report()
+    assert timings["best_encode/compress"]["bytes_in"] > 0
+    assert prof.report()["best_encode/compress"]["calls"] == timings["best_encode/compress"]["calls"]
+
+
+def test_hooks_receive_events_and_failures_only_warn():
+    events = []
+    hook = profiling.add_hook(events.append)
+
+    def broken(event):
+        raise RuntimeError("exporter down")
+
+    profiling.add_hook(broken)
+    try:
+        with pytest.warns(RuntimeWarning, match="exporter down"):
+            with profiling.stage("hooked", lines_in=2):
+                pass
+    finally:
+        profiling.remove_hook(hook)
+        profiling.remove_hook(broken)
+    assert events == [{"stage": "hooked", "path": "hooked", "seconds": events[0]["seconds"], "lines_in": 2}]
+    with profiling.stage("after"):
+        pass
+    assert len(events) == 1
@@ -0,0 +1,58 @@
+import pandas as pd
+
+from gridwise.encode.best import best_encode
+from gridwise.encode.post import expand_ranges, expand_repeats, expand_text_with_dict
+from gridwise.encode.ranges import to_range_markdown
+from gridwise.encode.vanilla import to_markdown
+from gridwise.io.loaders import from_dataframe
+
+
+def _entries(text):
+    """Non-empty cell entries of an encoding, ignoring line layout and the preamble."""
+    return {
+        e for ln in text.splitlines() if not ln.startswith(("#", "["))
+        for e in ln.split(" | ") if e and not e.endswith("=NaN")
+    }
+
+
+def _sheet():
+    n = 60
+    df = pd.DataFrame({
+        "status": ["Yes"] * 40 + ["No"] * 20,
+        "flag": ["Yes"] * 40 + [None] * 20,
+        "qty": [0] * 30 + list(range(30)),
+        "note": ["same"] * n,
+    })
+    return from_dataframe(df, name="r")
+
+
+def test_ranges_expand_to_the_cell_entries():
+    sheet = _sheet()
+    ranged = to_range_markdown(sheet)
+    assert "A2:B41='Yes'" in ranged and "A42:A61='No'" in ranged and "D2:D61='same'" in ranged
+    assert len(ranged) < len(to_markdown(sheet)) / 3
+    assert _entries(expand_ranges(ranged)) == _entries(to_markdown(sheet))
+
+
+def test_ranges_without_formats():
+    sheet = _sheet()
+    without = to_range_markdown(sheet, include_format=False)
+    assert _entries(expand_ranges(without)) == _entries(to_markdown(sheet, include_format=False))
+    # fully covered rows produce no line
+    assert len(without.splitlines()) < sheet.nrows
+
+
+def test_encode_round_trips_through_dictionary_ranges_and_repeats():
+    regions = ["Europe and Middle East", "Asia Pacific region", "North and South America"]
+    df = pd.DataFrame({
+        "region": [regions[i % 3] for i in range(300)],
+        "tier": [["gold", "silver", "bronze"][i % 3] for i in range(300)],
+        "note": ["carried over from last year"] * 300,
+    })
+    sheet = from_dataframe(df, name="r")
+    res = best_encode(sheet, compress_min_tokens=0, use_anchors=False, use_aggregation=False,
+                      merge_ranges=True, use_dedup=True)
+    assert res.kind == "compressed" and "[REPEAT of rows 3-5 x 98]" in res.text and "C2:C301=" in res.text
+    text = expand_repeats(expand_text_with_dict(res.text, res.document.dictionary, expand_ranges_too=True))
+    body = "\n".join(ln for ln in text.splitlines() if not ln.startswith("@C"))
+    assert _entries(body) == _entries(to_markdown(sheet))
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+
+from gridwise.serve import SearchServer
+from gridwise.store import build_inverted_index, save_chunk_store, save_index
+
+
+def _publish(path, chunks):
+    save_chunk_store(chunks, f"{path}.new")
+    os.replace(f"{path}.new.idx", f"{path}.idx")
+    os.replace(f"{path}.new", path)
+
+
+def test_routes(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    save_chunk_store([{"id": i, "content": f"alpha beta{i}"} for i in range(20)], path)
+    srv = SearchServer(path)
+
+    async def run():
+        status, res, _ = await srv._route("GET", "/search?q=beta7&k=2", b"")
+        assert status == 200 and res["results"][0]["id"] == 7
+        status, res, _ = await srv._route("POST", "/search", json.dumps({"queries": ["beta1", "beta2"], "k": 1}).encode())
+        assert [r[0]["id"] for r in res["results"]] == [1, 2]
+        assert (await srv._route("GET", "/chunk/3", b""))[1]["content"] == "alpha beta3"
+        assert (await srv._route("GET", "/chunk/99", b""))[0] == 404
+
+    asyncio.run(run())
+    assert srv.snapshot.users == 0
+
+
+def test_reload_closes_old_snapshot_after_last_user(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    save_chunk_store([{"id": i, "content": f"alpha beta{i}"} for i in range(20)], path)
+    srv = SearchServer(path, reload_interval=0.01)
+
+    async def run():
+        old = srv.snapshot.acquire()  # a request still running on the first generation
+        watcher = asyncio.create_task(srv._watch())
+        _publish(path, [{"id": i, "content": f"gamma delta{i}"} for i in range(10)])
+        for _ in range(500):
+            if srv.snapshot is not old:
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+        assert srv.snapshot.generation == 1 and old.retired
+        # still mapped while in use
+        assert old.chunk("3")["content"] == "alpha beta3"
+        old.release()
+        assert old.chunks._mm is None
+        status, res, _ = await srv._route("GET", "/search?q=delta4&k=1", b"")
+        assert status == 200 and res["generation"] == 1 and res["results"][0]["id"] == 4
+
+    asyncio.run(run())
+
+
+def test_index_arrays_are_memory_mapped_and_reloaded(tmp_path):
+    path, ix = str(tmp_path / "c.jsonl"), str(tmp_path / "c.bm25")
+    chunks = [{"id": i, "content": f"alpha beta{i}"} for i in range(20)]
+    save_chunk_store(chunks, path)
+    save_index(build_inverted_index(chunks), ix)
+    srv = SearchServer(path, index_path=ix, reload_interval=0.01)
+    assert isinstance(srv.snapshot.index["csr"]["docs"], np.memmap)
+
+    async def run():
+        old = srv.snapshot
+        watcher = asyncio.create_task(srv._watch())
+        new = [{"id": i, "content": f"gamma delta{i}"} for i in range(10)]
+        _publish(path, new)
+        save_index(build_inverted_index(new), ix)
+        for _ in range(500):
+            if srv.snapshot is not old and srv.snapshot.mtimes == srv._mtimes():
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+        status, res, _ = await srv._route("GET", "/search?q=delta4&k=1", b"")
+        hit = res["results"][0]
+        assert status == 200 and (hit["id"], hit["content"]) == (4, "gamma delta4")
+
+    asyncio.run(run())
@@ -0,0 +1,43 @@
+from gridwise.core.model import Cell, Sheet
+from gridwise.core.utils import idx_to_addr
+from gridwise.encode.skeleton import extract_skeleton
+from gridwise.encode.vanilla import to_markdown
+
+
+def _cell(r, c, value, dtype, fmt=None):
+    return Cell(r, c, idx_to_addr(r, c), value, dtype, fmt)
+
+
+def _ledger(n=100):
+    """A header row, ``n`` homogeneous data rows and a bold total row, over three columns."""
+    cells = [_cell(0, c, h, "text", "bold") for c, h in enumerate(["Item", "Qty", "Price"])]
+    for r in range(1, n + 1):
+        cells += [_cell(r, 0, f"item {r}", "text"), _cell(r, 1, r, "number"), _cell(r, 2, 2.5 * r, "number", "0.00")]
+    cells += [_cell(n + 1, 0, "Total", "text", "bold"), _cell(n + 1, 2, 123.0, "number", "bold")]
+    return Sheet("ledger", n + 2, 3, cells)
+
+
+def test_skeleton_keeps_boundaries_and_drops_the_interior():
+    sheet = _ledger()
+    skel, meta = extract_skeleton(sheet, k=2)
+    assert meta["anchor_rows"] == [0, 1, 100, 101]
+    assert sorted({c.row for c in skel.cells}) == [0, 1, 2, 3, 98, 99, 100, 101]
+    assert meta["cells_in"] == len(sheet.cells) and meta["cells_out"] == len(skel.cells)
+    # kept cells keep their addresses and values
+    assert set(skel.cells) <= set(sheet.cells)
+    text = to_markdown(skel, skip_blank_rows=True)
+    assert text.splitlines()[-1] == "A102='Total'::bold | C102=123.0::bold"
+    assert "A50=" not in text
+
+
+def test_homogeneous_sheet_keeps_only_its_edges():
+    cells = [_cell(r, c, r * c, "number") for r in range(50) for c in range(3)]
+    skel, meta = extract_skeleton(Sheet("grid", 50, 3, cells), k=1)
+    assert meta["anchor_rows"] == [0, 49]
+    assert sorted({c.row for c in skel.cells}) == [0, 1, 48, 49]
+
+
+def test_large_k_keeps_everything():
+    sheet = _ledger(10)
+    skel, _ = extract_skeleton(sheet, k=100)
+    assert skel.cells == sheet.cells
@@ -0,0 +1,84 @@
+import pytest
+from openpyxl import Workbook
+
+from gridwise.core.model import Cell, Sheet
+from gridwise.core.utils import idx_to_addr
+from gridwise.encode.vanilla import to_markdown
+from gridwise.io import xlsx_loader
+from gridwise.io.xlsx_loader import from_xlsx_rich
+
+
+def _cell(r, c, value, dtype="text", fmt=None):
+    return Cell(r, c, idx_to_addr(r, c), value, dtype, fmt)
+
+
+def _dense():
+    """A 30x8 grid with a few values scattered in it; every other coordinate is an empty cell."""
+    values = {(2, 1): "Title", (2, 4): "notes", (9, 3): 42, (20, 6): "far", (21, 1): ""}
+    cells = []
+    for r in range(30):
+        for c in range(8):
+            v = values.get((r, c))
+            cells.append(_cell(r, c, v, "empty" if v is None else "number" if isinstance(v, int) else "text"))
+    return Sheet("s", 30, 8, cells[::-1])  # not in row order
+
+
+def test_to_sparse_keeps_only_values_in_row_order():
+    dense = _dense()
+    with pytest.raises(ValueError, match="sparse"):
+        dense.row_offsets()
+    sparse = dense.to_sparse()
+    assert sparse.sparse and sparse.to_sparse() is sparse
+    assert [c.address for c in sparse.cells] == ["B3", "E3", "D10", "G21"]
+    assert (sparse.nrows, sparse.ncols) == (21, 7)
+    assert dense.bbox() == sparse.bbox() == (2, 1, 20, 6)
+    assert [c.value for c in sparse.row_cells(2)] == ["Title", "notes"]
+    assert sparse.row_cells(3) == [] and sparse.row_cells(20)[0].value == "far"
+    offsets = sparse.row_offsets()
+    assert len(offsets) == sparse.nrows + 1 and offsets[-1] == len(sparse.cells)
+    assert to_markdown(sparse).splitlines()[1:] == ["B3='Title' | E3='notes'", "D10=42", "G21='far'"]
+    assert Sheet("e", 5, 5, [_cell(1, 1, None, "empty")]).bbox() is None
+
+
+@pytest.mark.parametrize("cell_store", [True, False])
+def test_from_xlsx_rich_sparse(tmp_path, monkeypatch, cell_store):
+    if not cell_store:  # openpyxl without the private cell map: public iter_rows
+        monkeypatch.setattr(xlsx_loader, "_cell_store", lambda ws: None)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "far"
+    ws["B2"] = "Region"
+    ws["C2"] = "Units"
+    ws["B3"] = "EMEA"
+    ws["C3"] = 12
+    ws["F40"] = "footnote"
+    ws["D20"] = ""
+    ws.merge_cells("B45:C45")
+    ws["B45"] = "merged"
+    path = tmp_path / "far.xlsx"
+    wb.save(path)
+
+    dense = from_xlsx_rich(str(path))
+    sparse = from_xlsx_rich(str(path), sparse=True)
+    assert sparse.sparse and not dense.sparse
+    assert [c.address for c in sparse.cells] == ["B2", "C2", "B3", "C3", "F40", "B45"]
+    assert (sparse.nrows, sparse.ncols) == (45, 6)
+    assert sparse.merged_regions == [(44, 1, 44, 2)]
+    assert [c.fmt for c in sparse.row_cells(1)] == ["header", "header"]
+    assert sparse.row_cells(2)[1].dtype == "number"
+    assert sparse.cells == dense.to_sparse().cells
+    text = to_markdown(sparse)
+    assert text.splitlines()[1:] == [
+        "B2='Region'::header | C2='Units'::header",
+        "B3='EMEA'::General | C3=12::General",
+        "F40='footnote'::General",
+        "B45:C45='merged'::General",
+    ]
+
+
+def test_cell_store_feature_check():
+    wb = Workbook()
+    wb.active["C3"] = 1
+    assert xlsx_loader._cell_store(wb.active) is not None
+    wb.active._cells = {"C3": wb.active["C3"]}  # a layout we do not recognize
+    assert xlsx_loader._cell_store(wb.active) is None
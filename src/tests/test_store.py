@@ -0,0 +1,54 @@
+import struct
+
+import pytest
+
+from gridwise.store import ChunkStore, load_chunks_jsonl, save_chunk_store
+
+
+def _chunks(n=300):
+    # ids out of order and with gaps; extra metadata keys are kept
+    return [{"id": (i * 37) % 1000, "content": f"row {i} " + "x" * (i % 50), "table": i % 3} for i in range(n)]
+
+
+@pytest.mark.parametrize("compression", [None, "zlib", "lzma"])
+def test_store_round_trip(tmp_path, compression):
+    chunks = _chunks()
+    path = str(tmp_path / "c.jsonl")
+    save_chunk_store(chunks, path, compression=compression, block_size=16)
+    by_id = {ch["id"]: ch for ch in chunks}
+    with ChunkStore(path, cache_blocks=2) as store:
+        assert len(store) == len(chunks) and store.ids() == sorted(by_id)
+        for cid in (0, 37, 999 % 1000, 185):
+            if cid in by_id:
+                assert store[cid] == by_id[cid] and store.get(cid) == by_id[cid]
+        assert 1 not in store and store.get(1) is None
+        with pytest.raises(KeyError):
+            store[1]
+        wanted = [185, 1, 0, 37, 185]
+        assert store.get_many(wanted) == [by_id[i] for i in wanted if i in by_id]
+        assert sorted(ch["id"] for ch in store) == sorted(by_id)
+        assert list(store) == chunks  # file order
+    if compression is None:
+        assert load_chunks_jsonl(path) == chunks
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / "empty.jsonl")
+    save_chunk_store([], path)
+    with ChunkStore(path) as store:
+        assert len(store) == 0 and list(store) == [] and store.get(0) is None
+
+
+def test_store_rejects_foreign_indexes(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    save_chunk_store(_chunks(5), path)
+    idx = tmp_path / "c.jsonl.idx"
+    data = idx.read_bytes()
+    idx.write_bytes(data[:4] + struct.pack("<B", 9) + data[5:])
+    with pytest.raises(ValueError, match="version 9"):
+        ChunkStore(path)
+    idx.write_bytes(b"NOPE" + data[4:])
+    with pytest.raises(ValueError, match="not a gridwise chunk store"):
+        ChunkStore(path)
+    with pytest.raises(ValueError, match="compression"):
+        save_chunk_store(_chunks(5), path, compression="gzip")
@@ -0,0 +1,217 @@
+import itertools
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gridwise.store import build_inverted_index, load_chunks_jsonl, load_index
+from gridwise.streaming.blocks import iter_blocks, iter_frames, read_header, where_columns, where_expr
+from gridwise.streaming.csv_stream import checkpoint_path, stream_encode_csv_to_jsonl
+from gridwise.streaming.pipeline import Prefetcher
+
+
+class Crash(Exception):
+    pass
+
+
+def _write_csv(path, n=3_000, seed=0):
+    rng = np.random.default_rng(seed)
+    text = np.array(["plain", "with, comma", 'multi\nline "q"', "Product X", "EMEA"])
+    df = pd.DataFrame({
+        "a": rng.choice(text, n),
+        "b": rng.integers(0, 5, n),
+        "c": rng.choice(["North", "South", "Eastern"], n),
+        "d": np.round(rng.normal(0, 1, n), 3),
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+def _contents(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["content"] for line in f]
+
+
+@pytest.mark.parametrize("kw", [{}, {"aggregate": True, "dedup": True}])
+def test_resume_after_crash_matches_uninterrupted_run(tmp_path, kw):
+    csv = tmp_path / "r.csv"
+    _write_csv(csv)
+    full, part = tmp_path / "full.jsonl", tmp_path / "part.jsonl"
+    stream_encode_csv_to_jsonl(str(csv), str(full), block_bytes=8_000, **kw)
+
+    calls = itertools.count()
+
+    def boom(ev):
+        if ev["pass"] == 2 and next(calls) == 5:
+            raise Crash
+
+    with pytest.raises(Crash):
+        stream_encode_csv_to_jsonl(str(csv), str(part), block_bytes=8_000, checkpoint_interval=0, progress=boom, **kw)
+    assert os.path.exists(checkpoint_path(str(part)))
+    events = []
+    stream_encode_csv_to_jsonl(str(csv), str(part), block_bytes=8_000, checkpoint_interval=0, resume=True,
+                               progress=events.append, **kw)
+    assert events[0]["pass"] == 2 and events[0]["offset"] > 0
+    assert part.read_bytes() == full.read_bytes()
+    assert not os.path.exists(checkpoint_path(str(part)))
+
+
+def test_resume_refuses_changed_settings(tmp_path):
+    csv = tmp_path / "r.csv"
+    _write_csv(csv, n=500)
+    out = tmp_path / "out.jsonl"
+
+    def boom(ev):
+        if ev["pass"] == 2 and ev["fraction"] > 0.3:
+            raise Crash
+
+    with pytest.raises(Crash):
+        stream_encode_csv_to_jsonl(str(csv), str(out), block_bytes=4_000, checkpoint_interval=0, progress=boom)
+    with pytest.raises(ValueError, match="different"):
+        stream_encode_csv_to_jsonl(str(csv), str(out), block_bytes=8_000, resume=True)
+
+
+def test_chunksize_is_a_deprecated_alias(tmp_path):
+    csv = tmp_path / "r.csv"
+    _write_csv(csv, n=1_000)
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    stream_encode_csv_to_jsonl(str(csv), str(a))
+    with pytest.warns(DeprecationWarning, match="chunksize"):
+        stream_encode_csv_to_jsonl(str(csv), str(b), chunksize=100)
+    assert a.read_bytes() == b.read_bytes()
+
+
+def test_stray_quote_falls_back_to_line_boundaries(tmp_path):
+    # the stray quote in '5" pipe' flips the quote parity, so the next block
+    # boundary lands inside the quoted two-line field after it
+    rows = ['1,5" pipe,x'] + [f"{i},plain,y" for i in range(2, 40)]
+    rows.append('40,"two\nlines",z')
+    rows += [f"{i},plain,y" for i in range(41, 80)]
+    csv = tmp_path / "q.csv"
+    csv.write_bytes(("id,name,tag\n" + "\n".join(rows) + "\n").encode())
+    want = pd.read_csv(csv)
+
+    names, columns, start = read_header(str(csv))
+    raw = b"".join(data for _, _, data in iter_blocks(str(csv), start, 64))
+    assert raw == csv.read_bytes()[start:]
+    frames = list(iter_frames(str(csv), start, names, columns, 64))
+    assert all(e == s2 for (_, e, _), (s2, _, _) in zip(frames, frames[1:]))
+    got = pd.concat([df for _, _, df in frames], ignore_index=True)
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+    small, big = tmp_path / "small.jsonl", tmp_path / "big.jsonl"
+    stream_encode_csv_to_jsonl(str(csv), str(small), block_bytes=64)
+    stream_encode_csv_to_jsonl(str(csv), str(big))
+    assert _contents(small) == _contents(big)
+
+
+@pytest.mark.parametrize("kw", [{}, {"dedup": True, "aggregate": True}])
+def test_pipeline_settings_do_not_change_the_output(tmp_path, kw):
+    csv = tmp_path / "r.csv"
+    _write_csv(csv, n=2_000)
+    outs = []
+    for i, settings in enumerate([
+        {"workers": 0},
+        {"workers": 2},
+        {"workers": 4, "batch_rows": 7, "read_ahead": 1, "render_ahead": 1, "write_depth": 1, "write_buffer": 64},
+    ]):
+        out = tmp_path / f"o{i}.jsonl"
+        stream_encode_csv_to_jsonl(str(csv), str(out), block_bytes=5_000, max_tokens_per_chunk=800, **settings, **kw)
+        outs.append(out.read_bytes())
+    assert outs[0] == outs[1] == outs[2]
+
+
+def test_prefetcher_reraises_source_errors():
+    def source():
+        yield 1
+        raise RuntimeError("bad block")
+
+    got = []
+    with pytest.raises(RuntimeError, match="bad block"):
+        for item in Prefetcher(source(), depth=1):
+            got.append(item)
+    assert got == [1]
+
+
+def _rows_and_dictionary(path):
+    text = "\n".join(_contents(path))
+    rows = [int(r) for r in re.findall(r"^A(\d+)=", text, re.M)]
+    return rows, re.findall(r"^@C\{A\}t\d+=(.*)$", text, re.M), text
+
+
+def test_where_keeps_original_row_numbers(tmp_path):
+    rng = np.random.default_rng(4)
+    n = 1_500
+    df = pd.DataFrame({
+        "region": rng.choice(["EMEA", "APAC", "AMER"], n),
+        "product": rng.choice([f"Product number {i}" for i in range(12)], n),
+        "units": rng.integers(0, 100, n),
+    })
+    csv = tmp_path / "p.csv"
+    df.to_csv(csv, index=False)
+    want = df.query("region == 'EMEA' and units >= 50")
+    out = tmp_path / "w.jsonl"
+    stream_encode_csv_to_jsonl(str(csv), str(out), usecols=["product"], where=["region == 'EMEA'", "units >= 50"],
+                               block_bytes=4_096)
+    rows, dictionary, text = _rows_and_dictionary(out)
+    assert rows == [i + 2 for i in want.index]
+    # only the kept rows feed the dictionary; filter-only columns are not rendered
+    assert sorted(dictionary) == sorted(repr(v) for v in want["product"].unique())
+    assert "B2=" not in text and "'EMEA'" not in text
+
+
+def test_where_helpers_and_errors(tmp_path):
+    assert where_expr(None) is None and where_expr(["", "  "]) is None
+    assert where_expr("a > 1") == "a > 1"
+    assert where_expr(["a > 1", "b == 'x'"]) == "(a > 1) and (b == 'x')"
+    assert where_columns("`unit price` > 2 and region == 'units'", ["region", "units", "unit price", "other"]) == [
+        "region", "units", "unit price"]
+    csv = tmp_path / "r.csv"
+    _write_csv(csv, n=50)
+    with pytest.raises(ValueError, match="boolean"):
+        stream_encode_csv_to_jsonl(str(csv), str(tmp_path / "o.jsonl"), where="b + 1")
+
+
+def _expanded(path):
+    """Row lines of an output with dictionary codes replaced, and its code table."""
+    contents = _contents(path)
+    text = "\n".join(contents)
+    codes = dict(re.findall(r"^(@C\{[A-Z]+\}t\d+)=(.*)$", text, re.M))
+    body = "\n".join(c for c in contents if not c.startswith("[DICT-BEGIN]"))
+    return re.sub(r"@C\{[A-Z]+\}t\d+", lambda m: codes[m.group(0)], body), codes
+
+
+def test_incremental_appends_match_a_full_run(tmp_path):
+    full_csv = tmp_path / "full.csv"
+    _write_csv(full_csv, n=2_500, seed=5)
+    raw = full_csv.read_bytes()
+    *_, start = read_header(str(full_csv))
+    cuts = [end for _, end, _ in iter_blocks(str(full_csv), start, 12_000)]
+    kw = {"block_bytes": 8_000, "overlap_tokens": 0, "dedup": True}
+    full = tmp_path / "full.jsonl"
+    stream_encode_csv_to_jsonl(str(full_csv), str(full), **kw)
+
+    csv, out, index = tmp_path / "grow.csv", tmp_path / "grow.jsonl", str(tmp_path / "grow.bm25")
+    prev_codes = {}
+    # +9: the last record is still being written and must wait for the next run
+    for end in (cuts[0], cuts[1] + 9, cuts[3], len(raw)):
+        csv.write_bytes(raw[:end])
+        stream_encode_csv_to_jsonl(str(csv), str(out), incremental=True, index_path=index, sheet_name="full", **kw)
+        _, codes = _expanded(out)
+        assert all(codes.get(c) == v for c, v in prev_codes.items())  # existing codes keep their numbers
+        prev_codes = codes
+        rebuilt = build_inverted_index(load_chunks_jsonl(str(out)))
+        got = load_index(index)
+        assert (got["postings"], got["df"], got["N"]) == (rebuilt["postings"], rebuilt["df"], rebuilt["N"])
+    assert _expanded(out)[0] == _expanded(full)[0]
+
+    before = out.read_bytes()
+    stream_encode_csv_to_jsonl(str(csv), str(out), incremental=True, index_path=index, sheet_name="full", **kw)
+    assert out.read_bytes() == before  # nothing appended: nothing rewritten
+
+    csv.write_bytes(b"x" + raw[1:])
+    with pytest.raises(ValueError, match="no longer starts with"):
+        stream_encode_csv_to_jsonl(str(csv), str(out), incremental=True, index_path=index, sheet_name="full", **kw)
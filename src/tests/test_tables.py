@@ -0,0 +1,83 @@
+import re
+
+from gridwise.core.model import Cell, Sheet
+from gridwise.core.regions import detect_table_regions
+from gridwise.core.utils import idx_to_addr
+from gridwise.encode.post import expand_chunks_with_dict
+from gridwise.encode.tables import encode_tables, table_subsheet
+
+
+def _sheet(filled, merged=None, nrows=30, ncols=12):
+    cells = [Cell(r, c, idx_to_addr(r, c), v, "text" if isinstance(v, str) else "number") for (r, c), v in filled.items()]
+    return Sheet("s", nrows, ncols, cells, merged_regions=merged)
+
+
+def _block(r1, c1, r2, c2, value="x"):
+    return {(r, c): value for r in range(r1, r2 + 1) for c in range(c1, c2 + 1)}
+
+
+def test_detect_separate_touching_and_nested_tables():
+    cells = {**_block(0, 0, 4, 2), **_block(0, 4, 2, 5)}  # side by side, a blank column apart
+    cells.update(_block(7, 0, 8, 1))
+    cells[(9, 2)] = "diag"  # touches (8, 1) diagonally: same table
+    cells[(20, 9)] = "lonely"
+    # an L-shaped table whose box wraps a separate small one
+    cells.update(_block(12, 0, 18, 0))
+    cells.update(_block(18, 0, 18, 6))
+    cells.update(_block(14, 3, 15, 4))
+    regions = detect_table_regions(_sheet(cells))
+    assert regions == [(0, 0, 4, 2), (0, 4, 2, 5), (7, 0, 9, 2), (12, 0, 18, 6), (20, 9, 20, 9)]
+    assert (20, 9, 20, 9) not in detect_table_regions(_sheet(cells), min_cells=2)
+
+
+def test_merged_regions_join_tables():
+    cells = {**_block(0, 0, 2, 1), **_block(0, 4, 2, 5)}
+    cells[(3, 0)] = "total"
+    sheet = _sheet(cells, merged=[(3, 0, 3, 5)])
+    assert detect_table_regions(sheet) == [(0, 0, 3, 5)]
+
+
+def test_empty_strings_are_blank():
+    cells = {**_block(0, 0, 2, 2), **_block(4, 0, 6, 2)}
+    cells.update(_block(3, 0, 3, 2, value=""))  # a row of empty strings between them
+    cells[(4, 1)] = ""
+    sheet = _sheet(cells)
+    assert detect_table_regions(sheet) == [(0, 0, 2, 2), (4, 0, 6, 2)]
+    sub = table_subsheet(sheet, (4, 0, 6, 2))
+    assert [c.fmt for c in sub.cells if c.row == 4] == ["header", None, "header"]
+
+
+def _two_tables():
+    cells = {(0, 0): "product", (0, 1): "units"}
+    for r in range(1, 120):
+        cells[(r, 0)] = ["Industrial widget kit", "Consumer gadget bundle"][r % 2]
+        cells[(r, 1)] = r
+    cells.update({(0, 4): "region", (0, 5): "owner"})
+    for r in range(1, 80):
+        cells[(r, 4)] = ["Europe and Middle East", "Asia Pacific region"][r % 2]
+        cells[(r, 5)] = ["Operations team lead", "Regional sales desk"][r % 3 == 0]
+    return _sheet(cells, nrows=120, ncols=6)
+
+
+def test_encode_tables_keeps_per_table_dictionaries():
+    sheet = _two_tables()
+    sub = table_subsheet(sheet, (0, 4, 79, 5))
+    assert sub.name == "s!E1:F80" and {c.col for c in sub.cells} == {4, 5}
+    assert all(c.fmt == "header" for c in sub.cells if c.row == 0)
+
+    res = encode_tables(sheet, max_workers=1, compress_min_tokens=0, use_aggregation=False)
+    assert [t["region"] for t in res.meta["tables"]] == ["A1:B120", "E1:F80"]
+    assert [ch["id"] for ch in res.chunks] == list(range(len(res.chunks)))
+    assert {ch["table"] for ch in res.chunks} == {0, 1}
+    # each table has its own dictionary, holding only its own strings
+    dicts = [ch["content"] for ch in res.chunks if ch["content"].startswith("[DICT-BEGIN]")]
+    assert len(dicts) == 2
+    assert "Industrial widget kit" in dicts[0] and "Asia Pacific region" not in dicts[0]
+    assert "Asia Pacific region" in dicts[1] and "Industrial widget kit" not in dicts[1]
+    expanded = expand_chunks_with_dict(res.chunks)
+    assert not any(re.search(r"@C\{[A-Z]+\}t\d+", ch["content"]) for ch in expanded if "[DICT" not in ch["content"])
+    second = "\n".join(ch["content"] for ch in expanded if ch["table"] == 1)
+    assert "E2='Asia Pacific region'" in second and "Industrial" not in second
+
+    pooled = encode_tables(sheet, max_workers=2, compress_min_tokens=0, use_aggregation=False)
+    assert pooled.text == res.text and pooled.chunks == res.chunks
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from gridwise.store import build_inverted_index
+from gridwise.vector import VectorIndex, hash_vector, hybrid_search, rrf_fuse
+
+CHUNKS = [
+    {"id": 0, "content": "A2='EMEA' | B2='Widget' | C2=120"},
+    {"id": 1, "content": "A3='APAC' | B3='Gadget' | C3=75"},
+    {"id": 2, "content": "A4='AMER' | B4='Sprocket' | C4=19"},
+    {"id": 3, "content": "A5='LATAM' | B5='Gizmo' | C5=42"},
+]
+
+
+def test_hash_vector_is_normalized_and_deterministic():
+    v = hash_vector("Widget sales EMEA", dim=256)
+    assert v.shape == (256,)
+    assert np.isclose(np.linalg.norm(v), 1.0)
+    assert np.array_equal(v, hash_vector("Widget sales EMEA", dim=256))
+
+
+def test_reopened_index_appends_after_existing_rows(tmp_path):
+    path = str(tmp_path / "vec")
+    VectorIndex(path, dim=256).add(CHUNKS[:2])
+    vi = VectorIndex(path, dim=256)  # same path again: ids are loaded
+    assert vi.ids == [0, 1]
+    vi.add(CHUNKS[2:])
+    reopened = VectorIndex.open(path)
+    assert reopened.ids == [0, 1, 2, 3]
+    for ch in CHUNKS:
+        assert reopened.search(ch["content"], topk=1)[0]["id"] == ch["id"]
+
+
+def test_mismatched_settings_are_refused(tmp_path):
+    path = str(tmp_path / "vec")
+    VectorIndex(path, dim=256).add(CHUNKS)
+    with pytest.raises(ValueError):
+        VectorIndex(path, dim=512)
+
+
+def test_rrf_fuse_rewards_agreement():
+    fused = rrf_fuse([[{"id": "a"}, {"id": "b"}], [{"id": "b"}, {"id": "c"}]], k=60, topk=3)
+    assert [h["id"] for h in fused] == ["b", "a", "c"]
+    assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_hybrid_search_returns_content(tmp_path):
+    vi = VectorIndex(str(tmp_path / "vec"), dim=256)
+    vi.add(CHUNKS)
+    hits = hybrid_search("Sprocket AMER", CHUNKS, build_inverted_index(CHUNKS), vi, topk=2)
+    assert hits[0]["id"] == 2
+    assert hits[0]["content"] == CHUNKS[2]["content"]